@@ -0,0 +1,232 @@
+"""Benchmarks of the report decode and DataFrame paths
+
+Runs _dataDescriptor, _readData, _Table.process_response, Reports.get_dataframe and the page loop of
+aanalytics2 getReport against synthetic /reports pages generated by fakeserver.report_page, and records
+wall time, rows/sec and peak memory (tracemalloc) for every combination of rows, metrics and anomaly
+detection. Wall time and memory are measured in separate runs as tracing slows allocations down.
+
+Usage:
+    python -m benchmarks.bench_reports                      # 1k, 100k and 1M rows, 1, 10 and 50 metrics
+    python -m benchmarks.bench_reports --rows 1000 --metrics 1,10 --output baseline.json
+    python -m benchmarks.bench_reports --compare baseline.json --tolerance 0.2
+
+With --compare the process exits with status 1 if a benchmark is slower or uses more memory than
+the baseline by more than the tolerance.
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from marketingcloud import aanalytics2, codec
+from marketingcloud.analytics_reports import Reports, _Table
+from marketingcloud.fakeserver import report_page
+
+PAGE_SIZE = 50000
+# credentials of the Reports instances, the benchmarks never request a token
+CONFIG = {"iss": "XYZ@AdobeOrg", "sub": "XYZ@techacct.adobe.com", "aud": "https://ims-na1.adobelogin.com/c/XYZ",
+          "privateKeyPath": "/path/to/private/key", "clientSecret": "XYZ", "companyId": "benchmark"}
+
+
+def make_payload(n_metrics: int, anomaly: bool, limit: int = PAGE_SIZE) -> dict:
+    return {
+        'rsid': 'benchmark',
+        'globalFilters': [{'type': 'dateRange', 'dateRange': '2019-01-01T00:00:00.000/2019-12-31T00:00:00.000'}],
+        'metricContainer': {
+            'metrics': [{'columnId': str(i), 'id': f'metrics/event{i + 1}', 'filters': []} for i in range(n_metrics)]
+        },
+        'dimension': 'variables/page',
+        'settings': {'limit': limit, 'page': 0, 'includeAnomalyDetection': anomaly}
+    }
+
+
+def make_pages(n_rows: int, n_metrics: int, anomaly: bool) -> list:
+    """Returns the raw json bodies of every page of a report of n_rows items"""
+    payload = make_payload(n_metrics, anomaly)
+    pages = []
+    while True:
+        page = report_page(payload, n_rows)
+        pages.append(json.dumps(page).encode('utf8'))
+        if page['lastPage']:
+            return pages
+        payload['settings']['page'] += 1
+
+
+class _Response:
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        self.status_code = 200
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _FakeAnalytics:
+    def __init__(self, pages: list) -> None:
+        self.pages = pages
+
+    def reports(self, payload: dict) -> _Response:
+        return _Response(self.pages[payload['settings']['page']])
+
+
+def _reports_client(pages: list) -> Reports:
+    reports = Reports(CONFIG)
+    reports.analytics_client = _FakeAnalytics(pages)
+    return reports
+
+
+def _aanalytics2_client(pages: list, projection: bool = False) -> aanalytics2.Client:
+    client = aanalytics2.Client(companyid='benchmark')
+
+    def post_data(endpoint, data=None, projection=False, anomaly=False, **kwargs):
+        page = codec.decode(_Response(pages[data['settings']['page']]))
+        return codec.project_report(page, anomaly=anomaly) if projection else page
+
+    client._postData = post_data
+    return client
+
+
+def bench_data_descriptor(pages, n_metrics, anomaly):
+    payload = make_payload(n_metrics, anomaly)
+    return lambda: aanalytics2._dataDescriptor(payload)
+
+
+def bench_read_data(pages, n_metrics, anomaly):
+    rows = [row for page in pages for row in json.loads(page)['rows']]
+    cols = ['variables/page'] + [f'metrics/event{i + 1}' for i in range(n_metrics)]
+    return lambda: aanalytics2._readData(rows, anomaly=anomaly, cols=cols)
+
+
+def bench_table_process_response(pages, n_metrics, anomaly):
+    chunks = [json.loads(page) for page in pages]
+    payload = make_payload(n_metrics, anomaly)
+
+    def run():
+        table = _Table(1, None)
+        table.process_payload(payload)
+        for chunk in chunks:
+            table.process_response(chunk)
+        return table
+    return run
+
+
+def bench_get_dataframe(pages, n_metrics, anomaly):
+    def run():
+        return _reports_client(pages).get_dataframe(make_payload(n_metrics, anomaly))
+    return run
+
+
+def bench_get_report(pages, n_metrics, anomaly):
+    def run():
+        return _aanalytics2_client(pages).getReport(make_payload(n_metrics, anomaly), n_result='inf')
+    return run
+
+
+def bench_get_report_projection(pages, n_metrics, anomaly):
+    def run():
+        return _aanalytics2_client(pages).getReport(make_payload(n_metrics, anomaly), n_result='inf',
+                                                    projection=True)
+    return run
+
+
+BENCHMARKS = {
+    '_dataDescriptor': bench_data_descriptor,
+    '_readData': bench_read_data,
+    '_Table.process_response': bench_table_process_response,
+    'Reports.get_dataframe': bench_get_dataframe,
+    'getReport': bench_get_report,
+    'getReport[projection]': bench_get_report_projection,
+}
+
+
+def measure(run, repeat: int) -> dict:
+    """Returns the best wall time of ``repeat`` runs and the peak memory of one traced run"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'wall_time': min(timings), 'peak_memory': peak}
+
+
+def run_suite(rows: list, metrics: list, anomalies: list, names: list, repeat: int) -> list:
+    results = []
+    for n_rows in rows:
+        for n_metrics in metrics:
+            for anomaly in anomalies:
+                pages = make_pages(n_rows, n_metrics, anomaly)
+                for name in names:
+                    stats = measure(BENCHMARKS[name](pages, n_metrics, anomaly), repeat)
+                    result = {
+                        'benchmark': name,
+                        'rows': n_rows,
+                        'metrics': n_metrics,
+                        'anomaly': anomaly,
+                        'wall_time': stats['wall_time'],
+                        'rows_per_sec': n_rows / stats['wall_time'] if stats['wall_time'] else float('inf'),
+                        'peak_memory': stats['peak_memory']
+                    }
+                    results.append(result)
+                    print(f"{name:<26} rows={n_rows:<8} metrics={n_metrics:<3} anomaly={str(anomaly):<5} "
+                          f"time={result['wall_time']:9.4f}s rows/s={result['rows_per_sec']:12.0f} "
+                          f"peak={result['peak_memory'] / 2 ** 20:9.1f}MiB", flush=True)
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Returns a description of every result that regressed against the baseline"""
+    def key(result):
+        return result['benchmark'], result['rows'], result['metrics'], result['anomaly']
+    reference = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = reference.get(key(result))
+        if not base:
+            continue
+        for field in ('wall_time', 'peak_memory'):
+            if base[field] and result[field] > base[field] * (1 + tolerance):
+                regressions.append(f'{key(result)} {field}: {base[field]:.6g} -> {result[field]:.6g}')
+    return regressions
+
+
+def _int_list(value: str) -> list:
+    return [int(item) for item in value.split(',')]
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=_int_list, default=[1000, 100000, 1000000])
+    parser.add_argument('--metrics', type=_int_list, default=[1, 10, 50])
+    parser.add_argument('--anomaly', choices=('off', 'on', 'both'), default='both')
+    parser.add_argument('--benchmarks', type=lambda value: value.split(','), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the results as json to this file')
+    parser.add_argument('--compare', help='baseline json written by --output')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+    anomalies = {'off': [False], 'on': [True], 'both': [False, True]}[args.anomaly]
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+    results = run_suite(args.rows, args.metrics, anomalies, args.benchmarks, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(results, fd, indent=2)
+    if args.compare:
+        with open(args.compare) as fd:
+            regressions = compare(results, json.load(fd), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
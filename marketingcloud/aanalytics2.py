@@ -9,21 +9,37 @@ from collections import defaultdict as _defaultdict
 from concurrent import futures as _futures
 from copy import deepcopy as _deepcopy
 from typing import Union, IO
+from functools import wraps as _wraps
+from threading import Lock as _Lock
 ## Non standard libraries
 import pandas as _pd
+import numpy as _np
 import requests as _requests
 import jwt as _jwt
 from pathlib import Path
+from .hooks import Hooks as _Hooks, endpoint_path as _endpoint_path, page_number as _page_number, body_size as _body_size
+from . import metrics as _metrics
+from .profiler import Profiler as _Profiler
+from .quota import QUOTAS as _QUOTAS, current_priority as _current_priority
+from .transport import Transport as _Transport, RequestsTransport as _RequestsTransport
+from . import codec as _codec
+from . import estimate as _estimate
+from . import shards as _shards
+from .items import ItemDictionary as _ItemDictionary
+from .singleflight import SingleFlight as _SingleFlight, request_key as _request_key
+from . import dtypes as _dtypes
+from . import rollup as _rollup
+from . import calculated as _calculated
+from . import segments as _segments
 
 
 ### Set up default values
-_org_id, _api_key, _tech_id, _pathToKey, _secret,_companyid = "","","","","",""
 _TokenEndpoint = "https://ims-na1.adobelogin.com/ims/exchange/jwt"
 _orga_admin ={'_org_admin','_deployment_admin','_support_admin'}
 _cwd = Path.as_posix(Path.cwd())
-_date_limit = 0
-_token = ''
-_header = {}
+hooks = _metrics.instrument(_Hooks()) ## lifecycle hooks of the module client, see hooks.Hooks
+_transport = _RequestsTransport() ## HTTP transport shared by clients created without one, see setTransport
+_retryStatus = (429,500,502,503,504) ## answers sent again up to maxRetries times, see Client
 
 def createConfigFile(verbose : object = False)->None:
     """
@@ -41,168 +57,10 @@ def createConfigFile(verbose : object = False)->None:
     if verbose:
         print(' file created at this location : '+_cwd + '/config_admin.json')
 
-
-def importConfigFile(file : str)-> None:
-    """
-    This function will read the 'config_admin.json' to retrieve the information to be used by this module. 
-    """
-    global _org_id
-    global _api_key
-    global _tech_id
-    global _pathToKey
-    global _secret
-    global _endpoint
-    with open(file, 'r') as file:
-        f = _json.load(file)
-        _org_id = f['org_id']
-        _api_key = f['api_key']
-        _tech_id = f['tech_id']
-        _secret = f['secret']
-        _pathToKey = f['pathToKey']
-
 #### Launch API Endpoint
+_host = 'https://analytics.adobe.io'
 _endpoint = 'https://analytics.adobe.io/api'
-_endpoint_company = 'https://analytics.adobe.io/api/{company_id}'
-    
-def retrieveToken(verbose: bool = False,save:bool=False,**kwargs)->str:
-    """ Retrieve the token by using the information provided by the user during the import importConfigFile function. 
-    
-    Argument : 
-        verbose : OPTIONAL : Default False. If set to True, print information.
-    """
-    global _token
-    with open(_pathToKey, 'r') as f:
-        private_key_unencrypted = f.read()
-        header_jwt = {'cache-control':'no-cache','content-type':'application/x-www-form-urlencoded'}
-    jwtPayload = {
-        "exp": round(24*60*60+ int(_time.time())),###Expiration set to 24 hours
-        "iss": _org_id, ###org_id
-        "sub": _tech_id,###technical_account_id
-        "https://ims-na1.adobelogin.com/s/ent_analytics_bulk_ingest_sdk":True,
-        "aud": "https://ims-na1.adobelogin.com/c/"+_api_key
-    }
-    encoded_jwt = _jwt.encode(jwtPayload, private_key_unencrypted , algorithm='RS256')##working algorithm
-    payload = {
-            "client_id":_api_key,
-            "client_secret":_secret,
-            "jwt_token" : encoded_jwt.decode("utf-8")
-            }
-    response = _requests.post(_TokenEndpoint, headers=header_jwt, data=payload)
-    json_response = response.json()
-    token = json_response['access_token']
-    updateHeader(token=token)
-    expire = json_response['expires_in']
-    global _date_limit ## getting the scope right
-    _date_limit= _time.time()+ expire/1000 -500 ## end of time for the token
-    if save:
-        with open('token.txt','w') as f: ##save the token
-            f.write(token)
-    if verbose == True:
-        print('token valid till : ' + _time.ctime(_time.time()+ expire/1000))
-        print('token has been saved here : ' + Path.as_posix(Path.cwd()))
-    return token
-
-def _checkToken(func):
-    """    decorator that checks that the token is valid before calling the API    """
-    def checking(*args,**kwargs):## if function is not wrapped, will fire
-        global _date_limit
-        now = _time.time()
-        if now > _date_limit - 1000:
-            global _token
-            _token = retrieveToken(*args,**kwargs)
-            return func(*args,**kwargs)
-        else:## need to return the function for decorator to return something
-            return func(*args,**kwargs)
-    return checking ## return the function as object
-
-### 
-
-@_checkToken
-def _getData(endpoint:str,params:dict=None,data=None,*args,**kwargs):
-    """
-    Abstraction for getting data
-    """
-    global _header
-    if params != None and data == None:
-        res = _requests.get(endpoint,headers=_header,params=params)
-    elif params == None and data != None:
-        res = _requests.get(endpoint,headers=_header,data=data)
-    elif params != None and data != None:
-        res = _requests.get(endpoint,headers=_header,params=params,data=data)
-    try:
-        json = res.json()
-    except:
-        json = {'error':['Request Error']}
-    return json
-
-@_checkToken
-def _postData(endpoint:str,params:dict=None,data=None,*args,**kwargs):
-    """
-    Abstraction for getting data
-    """
-    global _header
-    if params != None and data == None:
-        res = _requests.post(endpoint,headers=_header,params=params)
-    elif params == None and data != None:
-        res = _requests.post(endpoint,headers=_header,data=_json.dumps(data))
-    elif params != None and data != None:
-        res = _requests.post(endpoint,headers=_header,params=params,data=_json.dumps(data=data))
-    try:
-        json = res.json()
-    except:
-        json = {'error':['Request Error']}
-    return json
-
-def updateHeader(companyid:str=None,token:str=_token,**kwargs)->None:
-    """ update the header when new token is generated
-    This would be mandatory id you retrieved the company ID with the option "all". 
-    Retrieving the company ID with option first or with a given position 
-    will automatically call this method. 
-    """
-    global _header
-    global _api_key
-    global _companyid
-    global _token
-    global _endpoint_company
-    if token:
-        _token = token
-    _header = {"Accept": "application/json",
-           "Content-Type": "application/json",
-           "Authorization": "Bearer "+_token,
-           "X-Api-Key": _api_key
-           }
-    if companyid != None:
-        _header['x-proxy-global-company-id']= companyid
-        _endpoint_company = _endpoint_company.format(company_id=companyid)
-
-@_checkToken
-def getCompanyId(infos:str='all'):
-    """
-    Retrieve the company id for later call for the properties.
-    Can return a string or a json object.
-    Arguments:
-        infos : OPTIONAL: returns the amount information provided.
-        Possible values:
-            - all : returns the list of companies data (default value)
-            - first : returns the first id (string returned)
-            - <X> : number that gives the position of the id we want to return (string)
-            You need to already know your position. 
-    """
-    res = _requests.get("https://analytics.adobe.io/discovery/me",headers=_header)
-    json_res = res.json()
-    if infos == 'all':
-        companies = json_res['imsOrgs'][0]['companies']
-        return companies
-    elif infos != 'all':
-        if infos == 'first':
-            infos = '0' #set to first position
-        position = int(infos)
-        companies = json_res['imsOrgs'][0]['companies']
-        global _companyid
-        _companyid = companies[position]['globalCompanyId']
-        global _token
-        updateHeader(companyid=_companyid,token=_token)
-        return _companyid
+_endpoint_company = '/api/{company_id}'
 
 ### Endpoints
 _endpoint_report ='/companies/'
@@ -215,284 +73,794 @@ _getUsers = '/users'
 _getDateRanges = '/dateranges'
 _getReport = '/reports'
 
-def getReportSuites(txt:str=None,rsid_list:str=None,limit:int=100,extended_info:bool=False,save:bool=False)->list:
-    """
-    Get the reportSuite IDs data. Returns a dataframe of reportSuite name and report suite id. 
-    Arguments: 
-        txt : OPTIONAL : returns the reportSuites that matches a speific text field
-        rsid_list : OPTIONAL : returns the reportSuites that matches the list of rsids set
-        limit : OPTIONAL : How many reportSuite retrieves per serverCall 
-        save : OPTIONAL : if set to True, it will save the list in a file. (Default False)
-        
-    """
-    global _companyid
-    params = {}
-    params.update({'limit' : str(limit)})
-    params.update({'page':'0'})
-    if txt != None:
-        params.update({'rsidContains':str(txt)})
-    if rsid_list != None:
-        params.update({'rsids':str(rsid_list)})
-    params.update({"expansion":"name,parentRsid,currency,calendarType,timezoneZoneinfo"})
-    rsids = _getData(_endpoint_company+_getRS,params=params)
-    content = rsids['content']
-    if extended_info==False:
-        list_content = [{'name':item['name'],'rsid':item['rsid']} for item in content]
-        df_rsids = _pd.DataFrame(list_content)
-    else:
-        df_rsids = _pd.DataFrame(content)
-    total_page = rsids['totalPages']
-    last_page = rsids['lastPage']
-    if not last_page: # if last_page =False
-        callsToMake = total_page
-        list_params = [{**params,'page':page} for page in range(1,callsToMake)]
-        list_urls = [_endpoint_company+_getRS for x in range(1,callsToMake)]
-        workers = min(10,total_page)
-        with _futures.ThreadPoolExecutor(workers) as executor:
-            res = executor.map(_getData,list_urls,list_params)
-        res = list(res)
-        list_data = [val for sublist in [r['content'] for r in res] for val in sublist]
-        if extended_info==False:
-            list_append = [{'name':item['name'],'rsid':item['rsid']} for item in list_data]
-            df_append = _pd.DataFrame(list_append)
-        else: 
-            df_append = _pd.DataFrame(list_data)
-        df_rsids = df_rsids.append(df_append,ignore_index=True)
-    if save:
-        df_rsids.to_csv('RSIDS.csv',sep='\t')
-    return df_rsids
+def _checkToken(func):
+    """    decorator that checks that the token of the client is valid before calling the API    """
+    @_wraps(func)
+    def checking(self,*args,**kwargs):## if function is not wrapped, will fire
+        now = _time.time()
+        if now > self.date_limit - 1000:
+            with self._token_lock: ## concurrent calls of the same client refresh the token once
+                if _time.time() > self.date_limit - 1000:
+                    self.retrieveToken()
+                    self.hooks.emit('token_refresh',latency=_time.time()-now,expires_in=(self.date_limit-_time.time())*1000)
+        return func(self,*args,**kwargs)
+    return checking ## return the function as object
 
+def _retryWait(res,attempt:int)->float:
+    """ Seconds to wait before sending a call again, from the Retry-After header or doubling from 1 second """
+    try:
+        return float(getattr(res,'headers',{}).get('Retry-After'))
+    except (TypeError,ValueError):
+        return float(2**(attempt-1))
 
-def getDimensions(rsid:str,tags:bool=False,save=False,**kwargs)->object:
-    """
-    Retrieve the list of dimensions from a specific reportSuite.Shrink columns to simplify output.
-    Returns the data frame of available dimensions. 
-    Arguments:
-        rsid : REQUIRED : Report Suite ID from which you want the dimensions
-        tags : OPTIONAL : If you would like to have additional information, such as tags.
-        save : OPTIONAL : If set to True, it will save the info in a csv file
-    Possible kwargs:
-        full : Boolean : Doesn't shrink the number of columns if set to true
-        example : getDimensions(rsid,full=True)
-    """
-    params = {}
-    if tags: 
-        params.update({'expansion':'tags'})
-    params.update({'rsid':rsid})
-    dims = _getData(_endpoint_company+_getDimensions,params=params)
-    df_dims = _pd.DataFrame(dims)
-    columns = ['id','name','category','type','parent','pathable','description']
-    if kwargs.get('full',False):
-        new_cols = _pd.DataFrame(df_dims.support.values.tolist(),columns=['support_oberon','support_dw'])#extract list in column
-        new_df = df_dims.merge(new_cols,right_index=True,left_index=True)
-        new_df.drop(['reportable','support'],axis=1,inplace=True)
-        df_dims = new_df
-    else:
-        df_dims = df_dims[columns]
-    df_dims.to_csv(f'dimensions_{rsid}.csv')
-    return df_dims
 
-def getMetrics(rsid:str,tags:bool=False,save=False,**kwargs)->object:
+class Client:
     """
-    Retrieve the list of metrics from a specific reportSuite. Shrink columns to simplify output.
-    Returns the data frame of available metrics. 
+    Holds the credentials, token, header and company of one Analytics login.
+    Every get* function of this module is available as a method, so that several companies
+    can be extracted in parallel inside one process. Clients created without a transport share
+    the module transport and therefore its connection pool.
     Arguments:
-        rsid : REQUIRED : Report Suite ID from which you want the dimensions
-        tags : OPTIONAL : If you would like to have additional information, such as tags.
-        save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
-    Possible kwargs:
-        full : Boolean : Doesn't shrink the number of columns if set to true.
+        org_id : REQUIRED : organization id (XXX@AdobeOrg)
+        api_key : REQUIRED : API key of the integration
+        tech_id : REQUIRED : technical account id (<something>@techacct.adobe.com)
+        secret : REQUIRED : client secret of the integration
+        pathToKey : REQUIRED : path to the private key
+        companyid : OPTIONAL : global company id, can be set later with getCompanyId or updateHeader
+        transport : OPTIONAL : transport.Transport used for the API calls (default the module transport)
+        hooks : OPTIONAL : hooks.Hooks receiving the lifecycle events (default a new registry feeding metrics.REGISTRY)
+        host : OPTIONAL : Analytics API host (default https://analytics.adobe.io), ie fakeserver.FakeAnalyticsServer().url
+        tokenEndpoint : OPTIONAL : IMS JWT exchange endpoint
+        coalesce : OPTIONAL : identical GET calls made by several threads at the same moment share one request (default True)
+        items : OPTIONAL : items.ItemDictionary recording the itemId and value of the rows of every report page
+        maxRetries : OPTIONAL : number of times a call answered with a 429 or 5xx status is sent again, each time emitting
+        the retry hook. The wait honours the Retry-After header, or doubles from 1 second. (default 0)
     """
-    params = {}
-    if tags:
-        params.update({'expansion':'tags'})
-    params.update({'rsid':rsid})
-    metrics = _getData(_endpoint_company+_getMetrics,params=params)
-    df_metrics = _pd.DataFrame(metrics)
-    columns = ['id','name','category','type','dataGroup','precision','segmentable']
-    if kwargs.get('full',False):
-        new_cols = _pd.DataFrame(df_metrics.support.values.tolist(),columns=['support_oberon','support_dw'])
-        new_df = df_metrics.merge(new_cols,right_index=True,left_index=True)
-        new_df.drop('support',axis=1,inplace=True)
-        df_metrics = new_df
-    else:
-        df_metrics = df_metrics[columns]
-    if save:
-        df_metrics.to_csv(f'metrics_{rsid}.csv',sep='\t')
-    return df_metrics
 
-def getUsers(save:bool=False,**kwargs)->object:
-    """
-    Retrieve the list of users for a login company.Returns a data frame.
-    Arguments:
-        save : OPTIONAL : Save the data in a file. 
-    Possible kwargs: 
-        limit : OPTIONAL : Nummber of results per requests. Default 100. 
-    """
-    params = {'limit':100}
-    if kwargs.get('limit',False):
-        if type(kwargs.get('limit')) == str:
-            limit = int(kwargs.get('limit'))
+    def __init__(self,org_id:str="",api_key:str="",tech_id:str="",secret:str="",pathToKey:str="",companyid:str=None,transport:_Transport=None,hooks:_Hooks=None,host:str=_host,tokenEndpoint:str=_TokenEndpoint,coalesce:bool=True,items:_ItemDictionary=None,maxRetries:int=0)->None:
+        self.org_id = org_id
+        self.api_key = api_key
+        self.tech_id = tech_id
+        self.secret = secret
+        self.pathToKey = pathToKey
+        self.companyid = companyid
+        self.host = host
+        self.tokenEndpoint = tokenEndpoint
+        self.transport = transport if transport is not None else _transport
+        self.hooks = hooks if hooks is not None else _metrics.instrument(_Hooks())
+        self.token = ''
+        self.date_limit = 0
+        self.header = {}
+        self._token_lock = _Lock()
+        self._singleFlight = _SingleFlight() if coalesce else None
+        self.items = items
+        self.maxRetries = maxRetries
+        self._metricCatalogs = {} ## rsid -> getMetrics dataframe, see integerMetrics
+        self._timezones = {} ## rsid -> timezoneZoneinfo, see getTimezone
+        self._calcDefinitions = {} ## calculated metric id -> definition, see addCalculatedMetrics
+
+    @classmethod
+    def fromConfigFile(cls,file:str,companyid:str=None,**kwargs)->'Client':
+        """
+        Create a client from a 'config_admin.json' file (see createConfigFile).
+        Arguments:
+            file : REQUIRED : path to the config file
+            companyid : OPTIONAL : global company id of the client
+        Possible kwargs:
+            transport, hooks, maxRetries : see Client
+        """
+        with open(file, 'r') as config:
+            f = _json.load(config)
+        return cls(org_id=f['org_id'],api_key=f['api_key'],tech_id=f['tech_id'],secret=f['secret'],
+                   pathToKey=f['pathToKey'],companyid=companyid,**kwargs)
+
+    @property
+    def endpoint_company(self)->str:
+        """ Base url of the company endpoints """
+        return self.host+_endpoint_company.format(company_id=self.companyid)
+
+    def retrieveToken(self,verbose: bool = False,save:bool=False,**kwargs)->str:
+        """ Retrieve the token by using the information provided to the client. 
+        
+        Argument : 
+            verbose : OPTIONAL : Default False. If set to True, print information.
+        """
+        with open(self.pathToKey, 'r') as f:
+            private_key_unencrypted = f.read()
+            header_jwt = {'cache-control':'no-cache','content-type':'application/x-www-form-urlencoded'}
+        jwtPayload = {
+            "exp": round(24*60*60+ int(_time.time())),###Expiration set to 24 hours
+            "iss": self.org_id, ###org_id
+            "sub": self.tech_id,###technical_account_id
+            "https://ims-na1.adobelogin.com/s/ent_analytics_bulk_ingest_sdk":True,
+            "aud": "https://ims-na1.adobelogin.com/c/"+self.api_key
+        }
+        encoded_jwt = _jwt.encode(jwtPayload, private_key_unencrypted , algorithm='RS256')##working algorithm
+        payload = {
+                "client_id":self.api_key,
+                "client_secret":self.secret,
+                "jwt_token" : encoded_jwt.decode("utf-8")
+                }
+        response = _requests.post(self.tokenEndpoint, headers=header_jwt, data=payload)
+        json_response = response.json()
+        token = json_response['access_token']
+        self.updateHeader(token=token)
+        expire = json_response['expires_in']
+        self.date_limit = _time.time()+ expire/1000 -500 ## end of time for the token
+        if save:
+            with open('token.txt','w') as f: ##save the token
+                f.write(token)
+        if verbose == True:
+            print('token valid till : ' + _time.ctime(_time.time()+ expire/1000))
+            print('token has been saved here : ' + Path.as_posix(Path.cwd()))
+        return token
+
+    def updateHeader(self,companyid:str=None,token:str=None,**kwargs)->None:
+        """ update the header when new token is generated
+        This would be mandatory id you retrieved the company ID with the option "all". 
+        Retrieving the company ID with option first or with a given position 
+        will automatically call this method. 
+        """
+        if token:
+            self.token = token
+        if companyid != None:
+            self.companyid = companyid
+        self.header = {"Accept": "application/json",
+               "Content-Type": "application/json",
+               "Authorization": "Bearer "+self.token,
+               "X-Api-Key": self.api_key
+               }
+        if self.companyid != None:
+            self.header['x-proxy-global-company-id']= self.companyid
+
+    def setTransport(self,transport:_Transport)->None:
+        """
+        Replace the HTTP transport used by the API calls of this client.
+        Arguments:
+            transport : REQUIRED : instance of transport.Transport, ie RequestsTransport() or HTTP2Transport()
+        """
+        self.transport = transport
+
+    def _send(self,method:str,endpoint:str,params:dict=None,data=None,**kwargs):
+        """
+        Send the request and emit the request_start / request_end hooks, answers with a status of _retryStatus are sent
+        again up to maxRetries times and emit the retry hook.
+        Every attempt is accounted against the company budget in quota.QUOTAS and may wait or raise QuotaExceededError.
+        """
+        info = {'endpoint':_endpoint_path(endpoint),'method':method.upper(),
+                'page':_page_number(params,data),'request_bytes':_body_size(data)}
+        attempt = 0
+        while True:
+            _QUOTAS.acquire(self.companyid,priority=_current_priority())
+            self.hooks.emit('request_start',**info)
+            start = _time.perf_counter()
+            res = self.transport.request(method,endpoint,headers=self.header,params=params,data=data,**kwargs)
+            self.hooks.emit('request_end',status=res.status_code,latency=_time.perf_counter()-start,
+                       response_bytes=len(res.content or b''),**info)
+            if res.status_code not in _retryStatus or attempt >= self.maxRetries:
+                return res
+            attempt += 1
+            wait = _retryWait(res,attempt)
+            self.hooks.emit('retry',status=res.status_code,attempt=attempt,wait=wait,**info)
+            _time.sleep(wait)
+
+    @_checkToken
+    def _getData(self,endpoint:str,params:dict=None,data=None,*args,**kwargs):
+        """
+        Abstraction for getting data
+        Concurrent identical calls share one request, each caller decodes its own copy of the response.
+        """
+        if self._singleFlight is not None:
+            res = self._singleFlight.do(_request_key('get',endpoint,params,data),
+                                        lambda: self._send('get',endpoint,params=params,data=data))
         else:
-            limit = kwargs.get('limit')
-        params.update({'limit':limit})
-    users = _getData(_endpoint_company+_getUsers,params=params)
-    data = users['content']
-    lastPage = users['lastPage']
-    if not lastPage : ## check if lastpage is inversed of False
-        callsToMake = users['totalPages']
-        list_params = [{'limit':100,'page':page} for page in range(1,callsToMake)]
-        list_urls = [_endpoint_company+_getUsers for x in range(1,callsToMake)]
-        workers = min(10,len(list_params))
-        with _futures.ThreadPoolExecutor(workers) as executor:
-            res = executor.map(_getData,list_urls,list_params)
-        res = list(res)
-        users_lists = [elem['content'] for elem in res if 'content' in elem.keys()]
-        nb_error = sum(1 for elem in res if 'error_code' in elem.keys())
-        nb_empty = sum(1 for elem in res if 'content' in elem.keys() and len(elem['content']) ==0)
-        append_data = [val for sublist in [data for data in users_lists] for val in sublist] ##flatten list of list
-        data = data + append_data
-    df_users = _pd.DataFrame(data)
-    columns = ['email','login','fullName','firstName','lastName','admin','loginId','imsUserId','login','createDate','lastAccess','title','disabled','phoneNumber','companyid']
-    df_users = df_users[columns]
-    df_users['createDate'] = _pd.to_datetime(df_users['createDate'])
-    df_users['lastAccess'] = _pd.to_datetime(df_users['lastAccess'])
-    if save: 
-        df_users.to_csv('users.csv',sep='\t')
-    if nb_error>0 or nb_empty >0:
-        print(f'WARNING : Retrieved data are partial.\n{nb_error}/{len(list_urls)} requests returned an error.\n{nb_empty}/{len(list_urls)} requests returned an empty response. \nTry to use filter to retrieve segments')
-    return df_users
-
-def getSegments(name:str=None,tagNames:str=None,inclType:str='all',rsids_list:list=None,sidFilter:list=None,extended_info:bool=False,save:bool=False,**kwargs)->object:
-    """
-    Retrieve the list of segments. Returns a data frame. 
-    Arguments:
-        name : OPTIONAL : Filter to only include segments that contains the name
-        tagNames : OPTIONAL : Filter list to only include segments that contains one of the tags (string delimited with comma, can be list as well)
-        inclType : OPTIONAL : type of segments to be retrieved. Possible values: 
-            - all : Default value (all segements possibles)
-            - shared : shared segments
-            - template : template segments
-            - deleted : deleted segments
-            - internal : internal segments
-            - curatedItem : curated segments
-        rsid_list : OPTIONAL : Filter list to only include segments tied to specified RSID list
-        sidFilter : OPTIONAL : Filter list to only include segments in the specified list
-        extended_info : OPTIONAL : additional segment metadata fields to include on response
-            additional infos: reportSuiteName, ownerFullName, modified, tags, compatibility, definition
-        save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
+            res = self._send('get',endpoint,params=params,data=data)
+        try:
+            json = _codec.decode(res)
+        except ValueError: ## body is not JSON, the JSON decoders raise ValueError subclasses
+            json = {'error':['Request Error']}
+        return json
+
+    @_checkToken
+    def _postData(self,endpoint:str,params:dict=None,data=None,*args,profiler:_Profiler=None,projection:bool=False,anomaly:bool=False,**kwargs):
+        """
+        Abstraction for getting data
+        Possible kwargs:
+            profiler : Profiler that records the request and decode phases of the call.
+            projection : If set to True, a /reports page is reduced to values, data arrays and paging fields (see codec.project_report)
+            anomaly : Keep the anomaly detection fields when projection is used.
+        """
+        profiler = profiler or _Profiler(enabled=False)
+        page = _page_number(params,data)
+        with profiler.phase('request',page):
+            res = self._send('post',endpoint,params=params,data=_json.dumps(data) if data != None else None)
+        with profiler.phase('decode',page):
+            try:
+                json = _codec.decode(res)
+            except ValueError: ## body is not JSON, the JSON decoders raise ValueError subclasses
+                json = {'error':['Request Error']}
+            if self.items is not None and isinstance(data,dict) and 'rows' in json:
+                self.items.record_page(data,json)
+            if projection and 'rows' in json:
+                json = _codec.project_report(json,anomaly=anomaly)
+        return json
+
+    @_checkToken
+    def getCompanyId(self,infos:str='all'):
+        """
+        Retrieve the company id for later call for the properties.
+        Can return a string or a json object.
+        Arguments:
+            infos : OPTIONAL: returns the amount information provided.
+            Possible values:
+                - all : returns the list of companies data (default value)
+                - first : returns the first id (string returned)
+                - <X> : number that gives the position of the id we want to return (string)
+                You need to already know your position. 
+        """
+        res = self._send('get',self.host+"/discovery/me")
+        json_res = res.json()
+        if infos == 'all':
+            companies = json_res['imsOrgs'][0]['companies']
+            return companies
+        elif infos != 'all':
+            if infos == 'first':
+                infos = '0' #set to first position
+            position = int(infos)
+            companies = json_res['imsOrgs'][0]['companies']
+            self.updateHeader(companyid=companies[position]['globalCompanyId'])
+            return self.companyid
+
+    def getReportSuites(self,txt:str=None,rsid_list:str=None,limit:int=100,extended_info:bool=False,save:bool=False)->list:
+        """
+        Get the reportSuite IDs data. Returns a dataframe of reportSuite name and report suite id. 
+        Arguments: 
+            txt : OPTIONAL : returns the reportSuites that matches a speific text field
+            rsid_list : OPTIONAL : returns the reportSuites that matches the list of rsids set
+            limit : OPTIONAL : How many reportSuite retrieves per serverCall 
+            save : OPTIONAL : if set to True, it will save the list in a file. (Default False)
+        
+        """
+        params = {}
+        params.update({'limit' : str(limit)})
+        params.update({'page':'0'})
+        if txt != None:
+            params.update({'rsidContains':str(txt)})
+        if rsid_list != None:
+            params.update({'rsids':str(rsid_list)})
+        params.update({"expansion":"name,parentRsid,currency,calendarType,timezoneZoneinfo"})
+        rsids = self._getData(self.endpoint_company+_getRS,params=params)
+        content = rsids['content']
+        if extended_info==False:
+            list_content = [{'name':item['name'],'rsid':item['rsid']} for item in content]
+            df_rsids = _pd.DataFrame(list_content)
+        else:
+            df_rsids = _pd.DataFrame(content)
+        total_page = rsids['totalPages']
+        last_page = rsids['lastPage']
+        if not last_page: # if last_page =False
+            callsToMake = total_page
+            list_params = [{**params,'page':page} for page in range(1,callsToMake)]
+            list_urls = [self.endpoint_company+_getRS for x in range(1,callsToMake)]
+            workers = min(10,total_page)
+            with _futures.ThreadPoolExecutor(workers) as executor:
+                res = executor.map(self._getData,list_urls,list_params)
+            res = list(res)
+            list_data = [val for sublist in [r['content'] for r in res] for val in sublist]
+            if extended_info==False:
+                list_append = [{'name':item['name'],'rsid':item['rsid']} for item in list_data]
+                df_append = _pd.DataFrame(list_append)
+            else: 
+                df_append = _pd.DataFrame(list_data)
+            df_rsids = df_rsids.append(df_append,ignore_index=True)
+        if save:
+            df_rsids.to_csv('RSIDS.csv',sep='\t')
+        return df_rsids
+
+
+    def getTimezone(self,rsid:str)->str:
+        """
+        Returns the timezoneZoneinfo of a reportSuite (ie 'US/Pacific'), requested once per rsid and kept by the client.
+        Arguments:
+            rsid : REQUIRED : Report Suite ID
+        """
+        if rsid not in self._timezones:
+            suite = self._getData(self.endpoint_company+_getRS+'/'+rsid,params={'expansion':'timezoneZoneinfo'})
+            self._timezones[rsid] = suite.get('timezoneZoneinfo')
+        return self._timezones[rsid]
+
+    def getDimensions(self,rsid:str,tags:bool=False,save=False,**kwargs)->object:
+        """
+        Retrieve the list of dimensions from a specific reportSuite.Shrink columns to simplify output.
+        Returns the data frame of available dimensions. 
+        Arguments:
+            rsid : REQUIRED : Report Suite ID from which you want the dimensions
+            tags : OPTIONAL : If you would like to have additional information, such as tags.
+            save : OPTIONAL : If set to True, it will save the info in a csv file
+        Possible kwargs:
+            full : Boolean : Doesn't shrink the number of columns if set to true
+            example : getDimensions(rsid,full=True)
+        """
+        params = {}
+        if tags: 
+            params.update({'expansion':'tags'})
+        params.update({'rsid':rsid})
+        dims = self._getData(self.endpoint_company+_getDimensions,params=params)
+        df_dims = _pd.DataFrame(dims)
+        columns = ['id','name','category','type','parent','pathable','description']
+        if kwargs.get('full',False):
+            new_cols = _pd.DataFrame(df_dims.support.values.tolist(),columns=['support_oberon','support_dw'])#extract list in column
+            new_df = df_dims.merge(new_cols,right_index=True,left_index=True)
+            new_df.drop(['reportable','support'],axis=1,inplace=True)
+            df_dims = new_df
+        else:
+            df_dims = df_dims[columns]
+        df_dims.to_csv(f'dimensions_{rsid}.csv')
+        return df_dims
+
+    def getMetrics(self,rsid:str,tags:bool=False,save=False,**kwargs)->object:
+        """
+        Retrieve the list of metrics from a specific reportSuite. Shrink columns to simplify output.
+        Returns the data frame of available metrics. 
+        Arguments:
+            rsid : REQUIRED : Report Suite ID from which you want the dimensions
+            tags : OPTIONAL : If you would like to have additional information, such as tags.
+            save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
+        Possible kwargs:
+            full : Boolean : Doesn't shrink the number of columns if set to true.
+        """
+        params = {}
+        if tags:
+            params.update({'expansion':'tags'})
+        params.update({'rsid':rsid})
+        metrics = self._getData(self.endpoint_company+_getMetrics,params=params)
+        df_metrics = _pd.DataFrame(metrics)
+        columns = ['id','name','category','type','dataGroup','precision','segmentable']
+        if kwargs.get('full',False):
+            new_cols = _pd.DataFrame(df_metrics.support.values.tolist(),columns=['support_oberon','support_dw'])
+            new_df = df_metrics.merge(new_cols,right_index=True,left_index=True)
+            new_df.drop('support',axis=1,inplace=True)
+            df_metrics = new_df
+        else:
+            df_metrics = df_metrics[columns]
+        if save:
+            df_metrics.to_csv(f'metrics_{rsid}.csv',sep='\t')
+        return df_metrics
+
+    def integerMetrics(self,rsid:str)->set:
+        """
+        Returns the ids of the metrics of a reportSuite that only take integer values (type int, precision 0).
+        The metrics catalog is requested once per rsid and kept by the client.
+        Arguments:
+            rsid : REQUIRED : Report Suite ID
+        """
+        return _dtypes.integer_metrics(self._metricCatalog(rsid))
+
+    def _metricCatalog(self,rsid:str)->object:
+        """ getMetrics dataframe of a reportSuite, requested once per rsid """
+        if rsid not in self._metricCatalogs:
+            self._metricCatalogs[rsid] = self.getMetrics(rsid)
+        return self._metricCatalogs[rsid]
+
+    def getUsers(self,save:bool=False,**kwargs)->object:
+        """
+        Retrieve the list of users for a login company.Returns a data frame.
+        Arguments:
+            save : OPTIONAL : Save the data in a file. 
+        Possible kwargs: 
+            limit : OPTIONAL : Nummber of results per requests. Default 100. 
+        """
+        params = {'limit':100}
+        if kwargs.get('limit',False):
+            if type(kwargs.get('limit')) == str:
+                limit = int(kwargs.get('limit'))
+            else:
+                limit = kwargs.get('limit')
+            params.update({'limit':limit})
+        users = self._getData(self.endpoint_company+_getUsers,params=params)
+        data = users['content']
+        lastPage = users['lastPage']
+        if not lastPage : ## check if lastpage is inversed of False
+            callsToMake = users['totalPages']
+            list_params = [{'limit':100,'page':page} for page in range(1,callsToMake)]
+            list_urls = [self.endpoint_company+_getUsers for x in range(1,callsToMake)]
+            workers = min(10,len(list_params))
+            with _futures.ThreadPoolExecutor(workers) as executor:
+                res = executor.map(self._getData,list_urls,list_params)
+            res = list(res)
+            users_lists = [elem['content'] for elem in res if 'content' in elem.keys()]
+            nb_error = sum(1 for elem in res if 'error_code' in elem.keys())
+            nb_empty = sum(1 for elem in res if 'content' in elem.keys() and len(elem['content']) ==0)
+            append_data = [val for sublist in [data for data in users_lists] for val in sublist] ##flatten list of list
+            data = data + append_data
+        df_users = _pd.DataFrame(data)
+        columns = ['email','login','fullName','firstName','lastName','admin','loginId','imsUserId','login','createDate','lastAccess','title','disabled','phoneNumber','companyid']
+        df_users = df_users[columns]
+        df_users['createDate'] = _pd.to_datetime(df_users['createDate'])
+        df_users['lastAccess'] = _pd.to_datetime(df_users['lastAccess'])
+        if save: 
+            df_users.to_csv('users.csv',sep='\t')
+        if nb_error>0 or nb_empty >0:
+            print(f'WARNING : Retrieved data are partial.\n{nb_error}/{len(list_urls)} requests returned an error.\n{nb_empty}/{len(list_urls)} requests returned an empty response. \nTry to use filter to retrieve segments')
+        return df_users
+
+    def getSegments(self,name:str=None,tagNames:str=None,inclType:str='all',rsids_list:list=None,sidFilter:list=None,extended_info:bool=False,save:bool=False,**kwargs)->object:
+        """
+        Retrieve the list of segments. Returns a data frame. 
+        Arguments:
+            name : OPTIONAL : Filter to only include segments that contains the name
+            tagNames : OPTIONAL : Filter list to only include segments that contains one of the tags (string delimited with comma, can be list as well)
+            inclType : OPTIONAL : type of segments to be retrieved. Possible values: 
+                - all : Default value (all segements possibles)
+                - shared : shared segments
+                - template : template segments
+                - deleted : deleted segments
+                - internal : internal segments
+                - curatedItem : curated segments
+            rsid_list : OPTIONAL : Filter list to only include segments tied to specified RSID list
+            sidFilter : OPTIONAL : Filter list to only include segments in the specified list
+            extended_info : OPTIONAL : additional segment metadata fields to include on response
+                additional infos: reportSuiteName, ownerFullName, modified, tags, compatibility, definition
+            save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
     
-    Possible kwargs:
-        limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.
+        Possible kwargs:
+            limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.
     
-    NOTE : Segment Endpoint doesn't support multi-threading. Defaukt
-    """
-    limit = int(kwargs.get('limit',500))
-    params = {'includeType':'all','limit':limit}
-    if extended_info:
-        params.update({'expansion':'reportSuiteName,ownerFullName,modified,tags,compatibility,definition'})
-    if name != None:
-        params.update({'name':str(name)})
-    if tagNames != None:
-        if type(tagNames) == list:
-            tagNames = ','.join(tagNames)
-        params.update({'tagNames':tagNames})
-    if inclType != 'all':
-        params['includeType'] = inclType
-    if rsids_list != None:
-        if type(rsids_list) == list:
-            rsids_list = ','.join(rsids_list)
-        params.update({'rsids':rsids_list})
-    if sidFilter != None:
-        if type(sidFilter) == list:
-            sidFilter = ','.join(sidFilter)
-        params.update({'rsids':sidFilter})
-    data = []
-    lastPage = False
-    page_nb = 0
-    while not lastPage:
-        params['page'] = page_nb
-        segs = _getData(_endpoint_company+_getSegments,params=params)
-        data += segs['content']
-        lastPage = segs['lastPage']
-        page_nb += 1
-    df_segments = _pd.DataFrame(data)
-    if save:
-        df_segments.to_csv('segments.csv',sep='\t')
-    return df_segments
-
-def createSegment():
-    pass
-
-
-def getCalculatedMetrics(name:str=None,tagNames:str=None,inclType:str='all',rsids_list:list=None,extended_info:bool=False,save=False,**kwargs)->object:
-    """
-    Retrieve the list of calculated metrics. Returns a data frame. 
-    Arguments:
-        name : OPTIONAL : Filter to only include calculated metrics that contains the name
-        tagNames : OPTIONAL : Filter list to only include calculated metrics that contains one of the tags (string delimited with comma, can be list as well)
-        inclType : OPTIONAL : type of calculated Metrics to be retrieved. Possible values: 
-            - all : Default value (all calculated metrics possibles)
-            - shared : shared calculated metrics
-            - template : template calculated metrics
-        rsid_list : OPTIONAL : Filter list to only include segments tied to specified RSID list
-        extended_info : OPTIONAL : additional segment metadata fields to include on response
-            additional infos: reportSuiteName,definition, ownerFullName, modified, tags, compatibility
-        save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
-    Possible kwargs:
-        limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.
-    """
-    limit = int(kwargs.get('limit',500))
-    params = {'includeType':'all','limit':limit}
-    if name != None:
-        params.update({'name':str(name)})
-    if tagNames != None:
-        if type(tagNames) == list:
-            tagNames = ','.join(tagNames)
-        params.update({'tagNames':tagNames})
-    if inclType != 'all':
-        params['includeType'] = inclType
-    if rsids_list != None:
-        if type(rsids_list) == list:
-            rsids_list = ','.join(rsids_list)
-        params.update({'rsids':rsids_list})
-    if extended_info:
-        params.update({'expansion':'reportSuiteName,definition,ownerFullName,modified,tags,categories,compatibility'})
-    metrics = _getData(_endpoint_company+_getCalcMetrics,params=params)
-    data = metrics['content']
-    lastPage = metrics['lastPage']
-    if not lastPage: ## check if lastpage is inversed of False
+        NOTE : Segment Endpoint doesn't support multi-threading. Defaukt
+        """
+        limit = int(kwargs.get('limit',500))
+        params = {'includeType':'all','limit':limit}
+        if extended_info:
+            params.update({'expansion':'reportSuiteName,ownerFullName,modified,tags,compatibility,definition'})
+        if name != None:
+            params.update({'name':str(name)})
+        if tagNames != None:
+            if type(tagNames) == list:
+                tagNames = ','.join(tagNames)
+            params.update({'tagNames':tagNames})
+        if inclType != 'all':
+            params['includeType'] = inclType
+        if rsids_list != None:
+            if type(rsids_list) == list:
+                rsids_list = ','.join(rsids_list)
+            params.update({'rsids':rsids_list})
+        if sidFilter != None:
+            if type(sidFilter) == list:
+                sidFilter = ','.join(sidFilter)
+            params.update({'rsids':sidFilter})
+        data = []
+        lastPage = False
         page_nb = 0
         while not lastPage:
-            page_nb += 1
             params['page'] = page_nb
-            metrics = _getData(_endpoint_company+_getCalcMetrics,params=params)
-            data += metrics['content']
-            lastPage = metrics['lastPage']
-    df_calc_metrics = _pd.DataFrame(data)
-    if save:
-        df_calc_metrics.to_csv('calculated_metrics.csv',sep='\t')
-    return df_calc_metrics
-
-def getDateRanges(extended_info:bool=False,save:bool=False,**kwargs)->object:
-    """
-    Get the list of date ranges available for the user. 
-    Arguments:
-        extended_info : OPTIONAL : additional segment metadata fields to include on response
-            additional infos: reportSuiteName, ownerFullName, modified, tags, compatibility, definition
-        save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
-    Possible kwargs:
-        limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.
-        full : Boolean : Doesn't shrink the number of columns if set to true
-    """
-    limit = int(kwargs.get('limit',500))
-    params = {'limit':limit}
-    if extended_info:
-        params.update({'expansion':'definition,ownerFullName,modified,tags'})
-    dateRanges = _getData(_endpoint_company+_getDateRanges,params=params)
-    data = dateRanges['content']
-    df_dates = _pd.DataFrame(data)
-    return df_dates
+            segs = self._getData(self.endpoint_company+_getSegments,params=params)
+            data += segs['content']
+            lastPage = segs['lastPage']
+            page_nb += 1
+        df_segments = _pd.DataFrame(data)
+        if save:
+            df_segments.to_csv('segments.csv',sep='\t')
+        return df_segments
+
+    def createSegment(self):
+        pass
+
+
+    def getCalculatedMetrics(self,name:str=None,tagNames:str=None,inclType:str='all',rsids_list:list=None,extended_info:bool=False,save=False,**kwargs)->object:
+        """
+        Retrieve the list of calculated metrics. Returns a data frame. 
+        Arguments:
+            name : OPTIONAL : Filter to only include calculated metrics that contains the name
+            tagNames : OPTIONAL : Filter list to only include calculated metrics that contains one of the tags (string delimited with comma, can be list as well)
+            inclType : OPTIONAL : type of calculated Metrics to be retrieved. Possible values: 
+                - all : Default value (all calculated metrics possibles)
+                - shared : shared calculated metrics
+                - template : template calculated metrics
+            rsid_list : OPTIONAL : Filter list to only include segments tied to specified RSID list
+            extended_info : OPTIONAL : additional segment metadata fields to include on response
+                additional infos: reportSuiteName,definition, ownerFullName, modified, tags, compatibility
+            save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
+        Possible kwargs:
+            limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.
+        """
+        limit = int(kwargs.get('limit',500))
+        params = {'includeType':'all','limit':limit}
+        if name != None:
+            params.update({'name':str(name)})
+        if tagNames != None:
+            if type(tagNames) == list:
+                tagNames = ','.join(tagNames)
+            params.update({'tagNames':tagNames})
+        if inclType != 'all':
+            params['includeType'] = inclType
+        if rsids_list != None:
+            if type(rsids_list) == list:
+                rsids_list = ','.join(rsids_list)
+            params.update({'rsids':rsids_list})
+        if extended_info:
+            params.update({'expansion':'reportSuiteName,definition,ownerFullName,modified,tags,categories,compatibility'})
+        metrics = self._getData(self.endpoint_company+_getCalcMetrics,params=params)
+        data = metrics['content']
+        lastPage = metrics['lastPage']
+        if not lastPage: ## check if lastpage is inversed of False
+            page_nb = 0
+            while not lastPage:
+                page_nb += 1
+                params['page'] = page_nb
+                metrics = self._getData(self.endpoint_company+_getCalcMetrics,params=params)
+                data += metrics['content']
+                lastPage = metrics['lastPage']
+        df_calc_metrics = _pd.DataFrame(data)
+        if save:
+            df_calc_metrics.to_csv('calculated_metrics.csv',sep='\t')
+        return df_calc_metrics
+
+    def addCalculatedMetrics(self,df:object,json_request:Union[dict,str],cm_ids:list,definitions:dict=None)->object:
+        """
+        Add calculated metrics as columns of the dataframe returned by getReport for json_request.
+        Calculated metrics that only combine metrics already in the dataframe with simple functions (see calculated.FUNCTIONS)
+        are computed locally, the others are requested with the dimension and filters of json_request.
+        Arguments:
+            df : REQUIRED : the 'data' dataframe returned by getReport. When several items of the dimension share a display value,
+            the requested metrics are aligned on the 'itemId' column of getReport(item_ids=True).
+            With an 'itemId' column, only the items of df are requested (search.itemIds), in one page per 50000 items.
+            Otherwise every page of the report is requested.
+            json_request : REQUIRED : the request of the report (dictionary or string)
+            cm_ids : REQUIRED : list of calculated metric ids
+            definitions : OPTIONAL : dictionary of id to definition already retrieved,
+            ie calculated.definitions(getCalculatedMetrics(extended_info=True)). Other definitions are requested per id.
+        """
+        if type(json_request) == str:
+            json_request = _json.loads(json_request)
+        definitions = definitions or {}
+        for cm_id in cm_ids:
+            if cm_id not in definitions and cm_id not in self._calcDefinitions:
+                metric = self._getData(self.endpoint_company+_getCalcMetrics+'/'+cm_id,params={'expansion':'definition'})
+                self._calcDefinitions[cm_id] = metric.get('definition')
+        metrics_definitions = {cm_id:definitions.get(cm_id) or self._calcDefinitions.get(cm_id) for cm_id in cm_ids}
+        df, missing = _calculated.add_calculated_metrics(df,metrics_definitions)
+        if len(missing)>0:
+            dimension = json_request['dimension']
+            request = _deepcopy(json_request)
+            request['metricContainer'] = {'metrics':[{'columnId':str(i),'id':cm_id,'filters':[]} for i,cm_id in enumerate(missing)]}
+            key = 'itemId' if 'itemId' in df.columns else dimension
+            if key == 'itemId':
+                item_ids = [item for item in dict.fromkeys(df[key]) if item is not None]
+                request.setdefault('search',{})['itemIds'] = item_ids
+                request.setdefault('settings',{})['limit'] = min(max(len(item_ids),1),_estimate.MAX_PAGE_SIZE)
+            fetched = self.getReport(request,n_result='inf',item_ids=key=='itemId')['data'].set_index(key)
+            if not fetched.index.is_unique:
+                raise ValueError(f"several items of {dimension} share a display value, request df with getReport(item_ids=True)")
+            for cm_id in missing:
+                df[cm_id] = fetched[cm_id].reindex(df[key],fill_value=0).to_numpy()
+        return df
+
+    def compareSegments(self,json_request:Union[dict,str],segment_ids:list,column_limit:int=_segments.COLUMN_LIMIT,n_result:Union[int,str]='inf',**kwargs)->object:
+        """
+        Compare the metrics of a request across segments with ceil(segments / (column_limit // metrics)) requests instead of one per segment.
+        Every metric is repeated per segment with a metricFilters entry on the segment (see segments.pack), the metrics of a segment stay
+        in one request. See segments.requests_needed for the number of requests.
+        Returns a long dataframe with the dimension, 'segment' and one column per metric.
+        Arguments:
+            json_request : REQUIRED : the request of the report (dictionary or string), without the segments
+            segment_ids : REQUIRED : list of segment ids to compare
+            column_limit : OPTIONAL : maximum number of metric columns per request (default segments.COLUMN_LIMIT)
+            n_result : OPTIONAL : Number of result per request (default "inf")
+        Possible kwargs:
+            any getReport argument, ie projection
+        """
+        if type(json_request) == str:
+            json_request = _json.loads(json_request)
+        metrics = [metric['id'] for metric in json_request['metricContainer']['metrics']]
+        frames = []
+        for request, packed_segments in _segments.pack(json_request,segment_ids,column_limit):
+            df = self.getReport(request,n_result=n_result,**kwargs)['data']
+            frames.append(_segments.unpack(df,packed_segments,metrics,dimension=json_request['dimension']))
+        return _pd.concat(frames,ignore_index=True)
+
+    def getReportSharded(self,json_request:Union[dict,str],max_workers:int=4,checkpoint_dir:str=None,**kwargs)->object:
+        """
+        Retrieve every item of a very high cardinality dimension (page url, tracking code) by splitting the item space
+        into disjoint shards of search clause prefixes (see shards.plan) walked concurrently.
+        Returns a dataframe with the dimension and one column per metric, without duplicated itemIds.
+        Arguments:
+            json_request : REQUIRED : the request of the report (dictionary or string), settings.limit is the page size of the shards
+            max_workers : OPTIONAL : number of shards retrieved at the same time (default 4)
+            checkpoint_dir : OPTIONAL : directory where every shard records its pages, so that an interrupted extraction
+            only requests the missing pages when it is run again.
+        Possible kwargs:
+            shards, priority, max_rows, alphabet, max_depth : see shards.extract and shards.plan
+        """
+        if type(json_request) == str:
+            json_request = _json.loads(json_request)
+        fetch = lambda request: self._postData(self.endpoint_company+_getReport,data=request)
+        df = _shards.extract(fetch,json_request,max_workers=max_workers,checkpoint_dir=checkpoint_dir,**kwargs)
+        df.index.name = json_request['dimension']
+        return df.reset_index()
+
+    def estimateReport(self,json_request:Union[dict,str],n_result:Union[int,str]='inf',**kwargs)->_estimate.Estimate:
+        """
+        Estimate the number of calls, quota minutes and wall time getReport would need for a request, without retrieving it.
+        A single request of one row reads totalElements, the planned extraction is then applied to it (see estimate.estimate).
+        Arguments:
+            json_request : REQUIRED : the request of the report (dictionary or string)
+            n_result : OPTIONAL : Number of result that getReport would retrieve (default "inf")
+        Possible kwargs:
+            page_size : settings.limit of the extraction (default the one of the request)
+            shards, breakdowns, breakdown_rows, rsids, concurrency, latency : the planned extraction, see estimate.estimate
+        """
+        kwargs.setdefault('company_id',self.companyid)
+        return _estimate.estimate(lambda probe: self._postData(self.endpoint_company+_getReport,data=probe),
+                                  json_request,max_rows=float(n_result),**kwargs)
+
+    def getDateRanges(self,extended_info:bool=False,save:bool=False,**kwargs)->object:
+        """
+        Get the list of date ranges available for the user. 
+        Arguments:
+            extended_info : OPTIONAL : additional segment metadata fields to include on response
+                additional infos: reportSuiteName, ownerFullName, modified, tags, compatibility, definition
+            save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
+        Possible kwargs:
+            limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.
+            full : Boolean : Doesn't shrink the number of columns if set to true
+        """
+        limit = int(kwargs.get('limit',500))
+        params = {'limit':limit}
+        if extended_info:
+            params.update({'expansion':'definition,ownerFullName,modified,tags'})
+        dateRanges = self._getData(self.endpoint_company+_getDateRanges,params=params)
+        data = dateRanges['content']
+        df_dates = _pd.DataFrame(data)
+        return df_dates
+
+    def _getReportPages(self,request:dict,n_result:Union[int,str],profiler:_Profiler,projection:bool,anomaly:bool)->tuple:
+        """
+        Request the pages of a report. Returns the error response (None if no error), the accumulated rows
+        (the projected pages if projection is set), the number of elements retrieved and the total number of elements.
+        """
+        n_result = float(n_result) ## in case "inf" has been used. Turn it to a number
+        data_list= []
+        last_page = False
+        page_nb,count_elements,total_elements = 0, 0, 0
+        while not last_page : 
+            request['settings']['page'] = page_nb
+            report = self._postData(self.endpoint_company+_getReport,data=request,profiler=profiler,projection=projection,anomaly=anomaly)
+            if 'errorCode' in report.keys():
+                return report,data_list,count_elements,total_elements
+            count_elements += report['numberOfElements']
+            total_elements = report['totalElements']
+            last_page = report['lastPage']
+            if not last_page and n_result != float('inf') : 
+                if count_elements >= n_result:
+                    last_page = True
+            if projection:
+                _metrics.observe_rows(len(report['values']),source='getReport')
+                data_list.append(report)
+            else:
+                data = report['rows']
+                _metrics.observe_rows(len(data),source='getReport')
+                with profiler.phase('accumulate',page_nb):
+                    data_list += data ## rows are freshly decoded for this page, _readData copies them before mutating
+            page_nb +=1
+            if page_nb%100 == 0: ## Analytics 2.0 can only receive 120 requests per minute.
+                _time.sleep(65)
+        return None,data_list,count_elements,total_elements
+
+    def getReport(self,json_request:Union[dict,str,IO],n_result:Union[int,str]=1000,save:bool=False,verbose:bool=False,profile:bool=False,projection:bool=False,categorical:Union[bool,_dtypes.StringPool]=False,integer_metrics:bool=False,parse_dates:bool=False,timezone:str=None,rollup:_rollup.Rollup=None,totals:bool=False,item_ids:bool=False)->object:
+        """
+        Retrieve data from a JSON request.Returns an object containing meta info and dataframe. 
+        Arguments:
+            json_request: REQUIRED : JSON statement that contains your request for Analytics API 2.0.
+            n_result : OPTIONAL : Number of result that you would like to retrieve. (default 1000)
+            if you want to have all possible data, use "inf".
+            save : OPTIONAL : If you would like to save the data within a CSV file. (default False)
+            verbose : OPTIONAL : If you want to have comment display (default False)
+            profile : OPTIONAL : If set to True, the returned object contains a 'profile' key with the time and
+            memory breakdown of the request, decode, accumulate, frame and save phases per page and in aggregate. (default False)
+            projection : OPTIONAL : If set to True, pages are reduced to itemIds, dimension values and metric arrays as soon as they are decoded. (default False)
+            categorical : OPTIONAL : If set to True, the dimension column is categorical. A dtypes.StringPool can be passed
+            to share the intern table of dimension values across reports or shards. (default False)
+            integer_metrics : OPTIONAL : If set to True, metrics typed int in getMetrics are downcast to the smallest integer dtype. (default False)
+            parse_dates : OPTIONAL : If set to True and the dimension is a time dimension (daterangeday, daterangehour, ...),
+            the dimension column holds tz-aware datetimes in the timezone of the reportSuite (see getTimezone). (default False)
+            timezone : OPTIONAL : timezone used by parse_dates instead of the one of the reportSuite, ie 'Europe/Berlin'.
+            rollup : OPTIONAL : rollup.Rollup recording the complete daterangeday reports. Week, month, quarter and year reports
+            are then computed from the recorded days for the additive metrics of getMetrics, only the other metrics are requested.
+            totals : OPTIONAL : If set to True, a single page of one row is requested and only its summaryData is read.
+            The dataframe is indexed by totals, filteredTotals, col-max and col-min with one column per metric. (default False)
+            item_ids : OPTIONAL : If set to True, an 'itemId' column follows the dimension column so that rows sharing a
+            display value can be told apart, ie by addCalculatedMetrics. (default False)
+            The argument can be : 
+                - a dictionary : It will be used as it is.
+                - a string that is a dictionary : It will be transformed to a dictionary / JSON.
+                - a path to a JSON file that contains the statement (must end with ".json"). 
+        """
+        obj = {}
+        if type(json_request) == str and '.json' not in json_request:
+            try:
+                request = _json.loads(json_request)
+            except :
+                raise TypeError("expected a parsable string")
+        elif type(json_request) == dict:
+            request = json_request
+        elif '.json' in json_request:
+            try:
+                with open(json_request,'r') as file:
+                    file_string = file.read()
+                request = _json.loads(file_string)
+            except:
+                raise TypeError("expected a parsable string")
+        request['limit']=1000
+        ## info for creating report
+        data_info = _dataDescriptor(request)
+        obj.update(data_info)
+        anomaly = request['settings'].get('includeAnomalyDetection',False)
+        columns = [data_info['dimension']] + data_info['metrics']
+        profiler = _Profiler(enabled=profile)
+        df,error = None,None
+        try:
+            if totals:
+                report = self._postData(self.endpoint_company+_getReport,data=_estimate.probe_payload(request),profiler=profiler)
+                if 'errorCode' in report.keys():
+                    error = report
+                elif not report.get('summaryData'):
+                    raise ValueError(f"/reports response of {data_info['rsid']} has no summaryData, got the fields {sorted(report)}")
+                else:
+                    count_elements = total_elements = report.get('totalElements',0)
+                    with profiler.phase('frame'):
+                        df = _pd.DataFrame.from_dict(_codec.project_summary(report),orient='index',columns=data_info['metrics'])
+                categorical,parse_dates = False,False
+            elif rollup is not None and columns[0] in _rollup.GRANULARITIES and not anomaly:
+                with profiler.phase('request'): ## the metrics catalog and the restricted report are fetched here
+                    additive = _rollup.additive_metrics(self._metricCatalog(data_info['rsid']))
+                    fetch = lambda restricted: self.getReport(restricted,n_result='inf',projection=projection)['data'].set_index(columns[0])
+                    df = rollup.report(request,additive,fetch)
+                with profiler.phase('frame'):
+                    if df is not None:
+                        if not parse_dates:
+                            df.index = _rollup.format_time_values(df.index,columns[0])
+                        df = df.reset_index()
+                        count_elements = total_elements = len(df)
+            if df is None:
+                if error is None:
+                    error,data_list,count_elements,total_elements = self._getReportPages(request,n_result,profiler,projection,anomaly)
+                if error is not None:
+                    print('Error with your statement \n'+error['errorDescription'])
+                    return {error['errorCode']:error['errorDescription']}
+                with profiler.phase('frame'):
+                    if projection:
+                        df = _readProjection(data_list,anomaly=anomaly,cols=columns,item_ids=item_ids)
+                    else:
+                        df = _readData(data_list,anomaly=anomaly,cols=columns,item_ids=item_ids)
+                    if rollup is not None and columns[0] == _rollup.DAY and count_elements >= total_elements and not anomaly:
+                        rollup.store(request,df.set_index(columns[0])[columns[1:]])
+            with profiler.phase('frame'):
+                if parse_dates and columns[0] in _dtypes.TIME_DIMENSIONS:
+                    tz = timezone or self.getTimezone(data_info['rsid'])
+                    if _pd.api.types.is_datetime64_any_dtype(df[columns[0]]):
+                        dates = _dtypes.localize(_pd.DatetimeIndex(df[columns[0]]),tz)
+                    else:
+                        dates = _dtypes.parse_time_dimension(df[columns[0]],columns[0],timezone=tz)
+                    if dates is not None:
+                        df[columns[0]] = dates
+                        categorical = False
+                if categorical is not False or integer_metrics:
+                    pool = _dtypes.StringPool() if categorical is True else (categorical or None)
+                    integers = self.integerMetrics(data_info['rsid']) if integer_metrics else ()
+                    df = _dtypes.compact(df,dimension=columns[0],pool=pool,integer_columns=integers)
+            obj['data'] = df
+            if save:
+                with profiler.phase('save'):
+                    df.to_csv(f'report_{data_info["rsid"]}.csv',sep='\t')
+        finally:
+            profiler.stop()
+        if profile:
+            obj['profile'] = profiler.report()
+        if verbose:
+            share = (count_elements/total_elements)*100 if total_elements > 0 else 100 ## an empty report contains all of its 0 dimensions
+            print(f'Report contains {share}% ofthe available dimensions')
+        return obj
+
 
 def _dataDescriptor(json_request:dict):
     """
@@ -506,8 +874,8 @@ def _dataDescriptor(json_request:dict):
     metrics_info = json_request['metricContainer']
     obj['metrics'] = [metric['id'] for metric in metrics_info['metrics']]
     metricsFilter = {metric['id']:metric['filters'] for metric in metrics_info['metrics'] if len(metric['filters'])>0}
-    filters = []
     for metric in metricsFilter:
+        filters = []
         for item in metricsFilter[metric]:
             if 'segmentId' in metrics_info['metricFilters'][int(item)].keys():
                 filters.append(metrics_info['metricFilters'][int(item)]['segmentId'])
@@ -524,17 +892,19 @@ def _dataDescriptor(json_request:dict):
     return obj
 
 
-def _readData(data_rows:list,anomaly:bool=False,cols:list=None):
+def _readData(data_rows:list,anomaly:bool=False,cols:list=None,item_ids:bool=False):
     """
     read the data from the requests and returns a dataframe. 
     Parameters:
         data_rows : REQUIRED : Rows that have been returned by the request.
         anomaly : OPTIONAL : Boolean to tell if the anomaly detection has been used. 
         cols : OPTIONAL : list of columns names
+        item_ids : OPTIONAL : Boolean to add an 'itemId' column after the dimension column.
     """
     data_rows = _deepcopy(data_rows)
-    dict_data = {}
-    dict_data = {row['value'] : row['data'] for row in data_rows}
+    ## rows are keyed by itemId so that items sharing a display value are not merged
+    dict_data = {row.get('itemId',row['value']) : row['data'] for row in data_rows}
+    dict_values = {row.get('itemId',row['value']) : row['value'] for row in data_rows}
     if cols != None : 
         n_metrics = len(cols)-1
     if anomaly == True:
@@ -543,77 +913,97 @@ def _readData(data_rows:list,anomaly:bool=False,cols:list=None):
         ## add data to the dictionary 
         for row in data_rows:
             for item in range(n_metrics):
-                dict_data[row['value']].append(row.get('dataExpected',[0 for i in range(n_metrics)])[item])
-                dict_data[row['value']].append(row.get('dataUpperBound',[0 for i in range(n_metrics)])[item])
-                dict_data[row['value']].append(row.get('dataLowerBound',[0 for i in range(n_metrics) ])[item])
-    df = _pd.DataFrame(dict_data).T ##require to transform the data
-    df.reset_index(inplace=True,)
-    df.columns = cols
+                key = row.get('itemId',row['value'])
+                dict_data[key].append(row.get('dataExpected',[0 for i in range(n_metrics)])[item])
+                dict_data[key].append(row.get('dataUpperBound',[0 for i in range(n_metrics)])[item])
+                dict_data[key].append(row.get('dataLowerBound',[0 for i in range(n_metrics) ])[item])
+    if len(dict_data) == 0: ## report without rows
+        df = _pd.DataFrame(columns=cols)
+    else:
+        df = _pd.DataFrame(dict_data).T ##require to transform the data
+        df.index = list(dict_values.values())
+        df.reset_index(inplace=True,)
+        df.columns = cols
+    if item_ids:
+        df.insert(1,'itemId',list(dict_values.keys()))
     return df
     
 
-def getReport(json_request:Union[dict,str,IO],n_result:Union[int,str]=1000,save:bool=False,verbose:bool=False)->object:
+def _readProjection(pages:list,anomaly:bool=False,cols:list=None,item_ids:bool=False):
+    """
+    read the pages projected with codec.project_report and returns a dataframe.
+    Same columns as _readData but built from the metric arrays without per row python objects.
+    Parameters:
+        pages : REQUIRED : projected pages that have been returned by the request.
+        anomaly : OPTIONAL : Boolean to tell if the anomaly detection has been used.
+        cols : OPTIONAL : list of columns names
+        item_ids : OPTIONAL : Boolean to add an 'itemId' column after the dimension column.
+    """
+    values = [value for page in pages for value in page['values']]
+    n_metrics = len(cols)-1
+    data = _np.concatenate([page['data'] for page in pages]) if pages else _np.empty((0,n_metrics))
+    if anomaly == True:
+        cols = cols + [f'{metric}-{suffix}' for metric in cols[1:] for suffix in ['expected','UpperBound','LowerBound']]
+        bounds = [_np.concatenate([page[field] for page in pages]) for field in _codec.ANOMALY_FIELDS]
+        ## interleave expected, upper and lower bound per metric
+        data = _np.hstack([data,_np.stack(bounds,axis=2).reshape(len(values),n_metrics*3)])
+    df = _pd.DataFrame(data,columns=cols[1:])
+    df.insert(0,cols[0],values)
+    if item_ids:
+        df.insert(1,'itemId',[item for page in pages for item in page['itemIds']])
+    return df
+
+
+### Module client
+### The functions below keep the module usable without handling a Client, they apply to the client
+### configured with importConfigFile.
+_client = Client(hooks=hooks)
+
+def importConfigFile(file : str)-> None:
+    """
+    This function will read the 'config_admin.json' to retrieve the information to be used by this module. 
+    """
+    global _client
+    _client = Client.fromConfigFile(file,transport=_transport,hooks=hooks)
+
+def setTransport(transport:_Transport)->None:
     """
-    Retrieve data from a JSON request.Returns an object containing meta info and dataframe. 
+    Replace the HTTP transport used by the module client and by clients created without a transport afterwards.
     Arguments:
-        json_request: REQUIRED : JSON statement that contains your request for Analytics API 2.0.
-        n_result : OPTIONAL : Number of result that you would like to retrieve. (default 1000)
-        if you want to have all possible data, use "inf".
-        save : OPTIONAL : If you would like to save the data within a CSV file. (default False)
-        verbose : OPTIONAL : If you want to have comment display (default False)
-        The argument can be : 
-            - a dictionary : It will be used as it is.
-            - a string that is a dictionary : It will be transformed to a dictionary / JSON.
-            - a path to a JSON file that contains the statement (must end with ".json"). 
+        transport : REQUIRED : instance of transport.Transport, ie RequestsTransport() or HTTP2Transport()
+        that multiplexes the concurrent page and metadata requests over few connections.
+    The previous transport is not closed: clients created without a transport before the call keep using it.
     """
-    obj = {}
-    if type(json_request) == str and '.json' not in json_request:
-        try:
-            request = _json.loads(json_request)
-        except :
-            raise TypeError("expected a parsable string")
-    elif type(json_request) == dict:
-        request = json_request
-    elif '.json' in json_request:
-        try:
-            with open(json_request,'r') as file:
-                file_string = file.read()
-            request = _json.loads(file_string)
-        except:
-            raise TypeError("expected a parsable string")
-    request['limit']=1000
-    ## info for creating report
-    data_info = _dataDescriptor(request)
-    obj.update(data_info)
-    anomaly = request['settings'].get('includeAnomalyDetection',False)
-    columns = [data_info['dimension']] + data_info['metrics']
-    ##preparing for the loop
-    n_result = float(n_result) ## in case "inf" has been used. Turn it to a number
-    data_list= []
-    last_page = False
-    page_nb,count_elements,total_elements = 0, 0, 0
-    while not last_page : 
-        request['settings']['page'] = page_nb
-        report = _postData(_endpoint_company+_getReport,data=request)
-        if 'errorCode' in report.keys():
-            print('Error with your statement \n'+report['errorDescription'])
-            return {report['errorCode']:report['errorDescription']}
-        count_elements += report['numberOfElements']
-        total_elements = report['totalElements']
-        last_page = report['lastPage']
-        if not last_page and n_result != float('inf') : 
-            if count_elements > n_result:
-                last_page == True
-        data = report['rows']
-        data_list += _deepcopy(data) ## do a deepcopy
-        page_nb +=1
-        if page_nb%100 == 0: ## Analytics 2.0 can only receive 120 requests per minute.
-            _time.sleep(65)
-    #return report
-    df = _readData(data_list,anomaly=anomaly,cols=columns)
-    obj['data'] = df
-    if verbose:
-        print(f'Report contains {(count_elements/total_elements)*100}% ofthe available dimensions')
-    return obj
+    global _transport
+    _transport = transport
+    _client.setTransport(transport)
+
+def _moduleFunction(name:str):
+    """ Expose the Client method 'name' as a function applied to the module client """
+    method = getattr(Client,name)
+    def function(*args,**kwargs):
+        return getattr(_client,name)(*args,**kwargs)
+    function.__name__ = name
+    function.__doc__ = method.__doc__
+    return function
 
-    
\ No newline at end of file
+_getData = _moduleFunction('_getData')
+_postData = _moduleFunction('_postData')
+retrieveToken = _moduleFunction('retrieveToken')
+updateHeader = _moduleFunction('updateHeader')
+getCompanyId = _moduleFunction('getCompanyId')
+getReportSuites = _moduleFunction('getReportSuites')
+getTimezone = _moduleFunction('getTimezone')
+getDimensions = _moduleFunction('getDimensions')
+getMetrics = _moduleFunction('getMetrics')
+integerMetrics = _moduleFunction('integerMetrics')
+getUsers = _moduleFunction('getUsers')
+getSegments = _moduleFunction('getSegments')
+createSegment = _moduleFunction('createSegment')
+getCalculatedMetrics = _moduleFunction('getCalculatedMetrics')
+addCalculatedMetrics = _moduleFunction('addCalculatedMetrics')
+compareSegments = _moduleFunction('compareSegments')
+estimateReport = _moduleFunction('estimateReport')
+getReportSharded = _moduleFunction('getReportSharded')
+getDateRanges = _moduleFunction('getDateRanges')
+getReport = _moduleFunction('getReport')
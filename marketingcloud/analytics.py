@@ -19,11 +19,24 @@ class ResponseError(Exception):
 class Analytics:
     """
     Adobe Analytics API implementation.
+
+    Arguments:
+        config(Union[str, typing.TextIO, dict, jwt.JWTAuth, jwt.JWTAuthPool]): Config file or credentials
+            passed to jwt.JWTAuth, or an already configured JWTAuth or JWTAuthPool
+        base_url(str, optional): Url of the company endpoints with a {company_id} placeholder,
+            defaults to BASE_URL. Used to target fakeserver.FakeAnalyticsServer
     """
     BASE_URL = 'https://analytics.adobe.io/api/{company_id}'
 
-    def __init__(self, config: typing.Union[str, typing.TextIO]) -> None:
-        self.session = jwt.JWTAuth(config)
+    def __init__(self,
+                 config: typing.Union[str, typing.TextIO, dict, jwt.JWTAuth, jwt.JWTAuthPool],
+                 base_url: str = None) -> None:
+        if base_url is not None:
+            self.BASE_URL = base_url
+        if isinstance(config, (jwt.JWTAuth, jwt.JWTAuthPool)):
+            self.session = config
+        else:
+            self.session = jwt.JWTAuth(config)
 
     # Endpoint Block
     # Calculated Metrics
@@ -98,10 +111,11 @@ class Analytics:
             raise ResponseError(response.json())
         return response
 
-    def get_calculatedmetric(self, id: str, locale: str = 'en_US'):
+    def get_calculatedmetric(self, id: str, locale: str = 'en_US', **kwargs):
         endpoint = f'/calculatedmetrics/{id}'
         params = {
-            'locale': locale
+            'locale': locale,
+            **kwargs
         }
         response = self.session.request('get', f'{self.BASE_URL}{endpoint}', params=params)
         if response.status_code != 200:
@@ -149,9 +163,9 @@ class Analytics:
             raise ResponseError(response.json())
         return response
 
-    def get_collection_suite(self, id: str) -> Response:
+    def get_collection_suite(self, id: str, **kwargs) -> Response:
         endpoint = f'/collections/suites/{id}'
-        response = self.session.request('get', f'{self.BASE_URL}{endpoint}')
+        response = self.session.request('get', f'{self.BASE_URL}{endpoint}', params=kwargs)
         if response.status_code != 200:
             raise ResponseError(response.json())
         return response
@@ -231,9 +245,9 @@ class Analytics:
                     **kwargs) -> Response:
         endpoint = '/metrics'
         params = {
-            rsid: rsid,
-            locale: locale,
-            segmentable: segmentable,
+            'rsid': rsid,
+            'locale': locale,
+            'segmentable': segmentable,
             **kwargs
         }
         response = self.session.request('get', f'{self.BASE_URL}{endpoint}', params=params)
@@ -1,34 +1,187 @@
+import os
+import sys
 import typing
+import tempfile
+import threading
 import pandas
+import numpy
 import json
+from collections import OrderedDict
 
 from .analytics import Analytics
+from . import metrics
+from . import codec
+from . import dtypes
+from . import calculated
+from . import segments
+from . import rollup as rollups
+from . import estimate as estimates
+from . import shards
+from .items import ItemDictionary
+from .profiler import Profiler
 
 
 class _Table:
     """This class serves as an abstraction layer for the received data from the /reports endpoint
     Received data will be modelled in this 2-d like table and can later be transformed into more advanced
     data models, ie pandas.Dataframe or alike.
+    Metrics are stored in a single growable float64 block (one contiguous row per metric) and the
+    dimension values and itemIds in object arrays, so no python object is kept per row. to_numpy, to_dataframe
+    and the metric columns of to_arrow are views on that block until the table grows again.
     """
     columns: typing.List[str]
-    rows: typing.List[typing.Tuple[str, typing.List[typing.Union[int, float]]]]
     dimension: str
+    INITIAL_CAPACITY = 1024
 
     def __init__(self,
                  id: int,
                  analytics_client: Analytics) -> None:
         self.id = id
+        self._values = numpy.empty(0, dtype=object)
+        self._item_ids = numpy.empty(0, dtype=object)
+        self._data = numpy.empty((0, 0), dtype=numpy.float64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def values(self) -> numpy.ndarray:
+        """Dimension values of the rows"""
+        return self._values[:self._size]
+
+    @property
+    def item_ids(self) -> numpy.ndarray:
+        """itemIds of the rows, None for the rows without one (ie totals)"""
+        return self._item_ids[:self._size]
+
+    @property
+    def rows(self) -> typing.List[typing.Tuple[str, typing.List[float]]]:
+        """Rows as (value, data) tuples, built on every access"""
+        return list(zip(self.values.tolist(), self.to_numpy().tolist()))
+
+    def _reserve(self, n_rows: int, n_metrics: int) -> None:
+        """Grows the value array and the metric block to hold n_rows more rows"""
+        if n_metrics != self._data.shape[0]:
+            if self._size:
+                raise ValueError(f'Rows with {n_metrics} metrics can\'t be added to a table of {self._data.shape[0]}')
+            self._data = numpy.empty((n_metrics, 0), dtype=numpy.float64)
+        needed = self._size + n_rows
+        capacity = len(self._values)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, self.INITIAL_CAPACITY)
+        data = numpy.empty((n_metrics, capacity), dtype=numpy.float64)
+        data[:, :self._size] = self._data[:, :self._size]
+        values = numpy.empty(capacity, dtype=object)
+        values[:self._size] = self._values[:self._size]
+        item_ids = numpy.empty(capacity, dtype=object)
+        item_ids[:self._size] = self._item_ids[:self._size]
+        self._data, self._values, self._item_ids = data, values, item_ids
+
+    def append(self,
+               values: typing.Sequence[str],
+               data: typing.Union[numpy.ndarray, list],
+               item_ids: typing.Sequence[typing.Optional[str]] = None) -> None:
+        """Appends rows given as dimension values, a rows x metrics array or list of lists and their itemIds"""
+        if not len(values):
+            return
+        data = numpy.asarray(data, dtype=numpy.float64).reshape(len(values), -1)
+        self._reserve(len(values), data.shape[1])
+        self._data[:, self._size:self._size + len(values)] = data.T
+        self._values[self._size:self._size + len(values)] = values
+        self._item_ids[self._size:self._size + len(values)] = item_ids if item_ids is not None else None
+        self._size += len(values)
 
     def process_response(self, chunk: dict) -> None:
-        if 'rows' in chunk:
-            rows = [(row['value'], row['data']) for row in chunk['rows']]
-            if not getattr(self, 'rows', None):
-                self.rows = rows
-            else:
-                self.rows += rows
+        if 'values' in chunk:
+            # page projected with codec.project_report
+            metrics.observe_rows(len(chunk['values']), source='Reports')
+            self.append(chunk['values'], chunk['data'], chunk.get('itemIds'))
+        elif 'rows' in chunk:
+            rows = chunk['rows']
+            metrics.observe_rows(len(rows), source='Reports')
+            self.append([row['value'] for row in rows], [row['data'] for row in rows],
+                        [row.get('itemId') for row in rows])
             self.dimension = chunk['columns']['dimension']['id']
         else:
-            self.rows = [("Total", chunk['summaryData']['totals'])]
+            self._size = 0
+            self.append(["Total"], [chunk['summaryData']['totals']])
+
+    def to_numpy(self) -> numpy.ndarray:
+        """Returns the metrics as a rows x metrics float64 view (Fortran ordered)"""
+        if not self._data.shape[0] and not self._size:
+            return numpy.empty((0, len(getattr(self, 'columns', []))), dtype=numpy.float64)
+        return self._data[:, :self._size].T
+
+    def to_dataframe(self, item_ids: bool = False) -> pandas.DataFrame:
+        """Returns a pandas.DataFrame indexed by the dimension values, sharing the metric block
+        If 'item_ids' is set, an 'itemId' column precedes the metrics
+        """
+        df = pandas.DataFrame(self.to_numpy(),
+                              columns=self.columns,
+                              index=pandas.Index(self.values, dtype=object, copy=False),
+                              copy=False)
+        if item_ids:
+            df.insert(0, 'itemId', self.item_ids)
+        return df
+
+    def to_arrow(self) -> typing.Any:
+        """Returns a pyarrow.Table with the dimension values followed by one column per metric
+        Requires the optional dependency pyarrow. Metric columns are zero-copy, the dimension values
+        are converted to an arrow string array.
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError('_Table.to_arrow requires pyarrow, install it with: pip install pyarrow')
+        data = self.to_numpy()
+        arrays = [pyarrow.array(self.values)] + [pyarrow.array(data[:, i]) for i in range(data.shape[1])]
+        names = [getattr(self, 'dimension', 'dimension')] + list(self.columns)
+        return pyarrow.Table.from_arrays(arrays, names=names)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the table: allocated metric block, value and itemId arrays and their strings"""
+        strings = sum(sys.getsizeof(value) for value in self.values)
+        strings += sum(sys.getsizeof(item_id) for item_id in self.item_ids if item_id is not None)
+        return self._data.nbytes + self._values.nbytes + self._item_ids.nbytes + strings
+
+    def save(self, path: str) -> None:
+        """Writes the table to an uncompressed npz file with one array per metric
+        Dimension values and itemIds are stored as utf-8 bytes and offsets, like an arrow string column
+        """
+        data = self._data[:, :self._size]
+        arrays = {f'metric_{i}': data[i] for i in range(data.shape[0])}
+        values, offsets = _encode_strings(self.values)
+        item_ids, item_offsets = _encode_strings(self.item_ids)
+        numpy.savez(path,
+                    values=values,
+                    offsets=offsets,
+                    item_ids=item_ids,
+                    item_offsets=item_offsets,
+                    has_item_ids=numpy.array([item_id is not None for item_id in self.item_ids], dtype=bool),
+                    columns=numpy.array(getattr(self, 'columns', []), dtype=str),
+                    dimension=numpy.array(getattr(self, 'dimension', ''), dtype=str),
+                    **arrays)
+
+    @classmethod
+    def load(cls, id: int, path: str) -> '_Table':
+        """Reads a table written by save"""
+        table = cls(id, None)
+        with numpy.load(path) as npz:
+            table.columns = npz['columns'].tolist()
+            if str(npz['dimension']):
+                table.dimension = str(npz['dimension'])
+            n_metrics = len([name for name in npz.files if name.startswith('metric_')])
+            table._values = _decode_strings(npz['values'], npz['offsets'])
+            table._item_ids = _decode_strings(npz['item_ids'], npz['item_offsets'])
+            table._item_ids[~npz['has_item_ids']] = None
+            table._data = numpy.empty((n_metrics, len(table._values)), dtype=numpy.float64)
+            for i in range(n_metrics):
+                table._data[i] = npz[f'metric_{i}']
+        table._size = len(table._values)
+        return table
 
     def process_payload(self, payload: typing.Union[str, dict]) -> None:
         """TODO: retrieve custom metrics names with analytics_client from /calculatedmetrics/{id}
@@ -37,15 +190,169 @@ class _Table:
         if isinstance(payload, str):
             payload = json.loads(payload)
         self.columns = [metric['id'] for metric in payload['metricContainer']['metrics']]
+        if 'dimension' in payload:
+            self.dimension = payload['dimension']
 
     def __repr__(self):
         return f'<Table {self.columns}>'
 
+
+def _encode_strings(strings: typing.Iterable[typing.Optional[str]]) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+    """Returns the utf-8 bytes and the offsets of 'strings', None is stored as an empty string"""
+    encoded = [str(string).encode('utf8') if string is not None else b'' for string in strings]
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8), offsets
+
+
+def _decode_strings(blob: numpy.ndarray, offsets: numpy.ndarray) -> numpy.ndarray:
+    """Reads the object array of strings written by _encode_strings"""
+    blob, offsets = blob.tobytes(), offsets.tolist()
+    strings = numpy.empty(len(offsets) - 1, dtype=object)
+    strings[:] = [blob[start:end].decode('utf8') for start, end in zip(offsets, offsets[1:])]
+    return strings
+
+
+class _TableRegistry:
+    """Tables created by a Reports instance, looked up by id
+
+    At most ``max_tables`` tables and ``max_bytes`` bytes are kept in memory. The least recently
+    used tables above these limits are written to npz files in a temporary directory and loaded
+    again when their id is looked up. Once the files exceed ``max_spill_bytes``, the oldest ones
+    are deleted and their tables forgotten. The directory is removed with the registry.
+
+    Arguments:
+        max_tables(int, optional): Maximum number of tables kept in memory, defaults to 16
+        max_bytes(int, optional): Maximum memory used by the tables kept in memory, defaults to 256 MiB.
+                                  The most recently used table is always kept, whatever its size
+        spill_dir(str, optional): Directory in which the spill directory is created, defaults to the
+                                  system temporary directory
+        max_spill_bytes(int, optional): Maximum disk space used by the spilled tables, defaults to 4 GiB.
+                                        None keeps every spilled table
+    """
+
+    def __init__(self,
+                 max_tables: int = 16,
+                 max_bytes: int = 256 * 2 ** 20,
+                 spill_dir: str = None,
+                 max_spill_bytes: int = 4 * 2 ** 30) -> None:
+        self.max_tables = max_tables
+        self.max_bytes = max_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self._spill_dir = spill_dir
+        self._tmp = None
+        self._tables = OrderedDict()
+        self._sizes = {}
+        # id -> (path, file size) in spilling order
+        self._spilled = OrderedDict()
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tables) + len(self._spilled)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self._tables or id in self._spilled
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(sorted(list(self._tables) + list(self._spilled)))
+
+    def __getitem__(self, id: int) -> _Table:
+        with self._lock:
+            if id in self._tables:
+                self._tables.move_to_end(id)
+                return self._tables[id]
+            if id not in self._spilled:
+                raise KeyError(id)
+            path, _ = self._spilled.pop(id)
+            table = _Table.load(id, path)
+            os.remove(path)
+            self._add(table)
+            return table
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the tables kept in memory"""
+        return sum(self._sizes.values())
+
+    @property
+    def spilled(self) -> typing.List[int]:
+        """Ids of the tables written to disk"""
+        return sorted(self._spilled)
+
+    @property
+    def spilled_bytes(self) -> int:
+        """Disk space used by the spilled tables"""
+        return sum(size for _, size in self._spilled.values())
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._last_id += 1
+            return self._last_id
+
+    def append(self, table: _Table) -> None:
+        with self._lock:
+            self._last_id = max(self._last_id, table.id)
+            self._add(table)
+
+    def _add(self, table: _Table) -> None:
+        self._tables[table.id] = table
+        self._sizes[table.id] = table.nbytes
+        while len(self._tables) > 1 and (len(self._tables) > self.max_tables
+                                         or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            id, evicted = self._tables.popitem(last=False)
+            del self._sizes[id]
+            if self._tmp is None:
+                self._tmp = tempfile.TemporaryDirectory(prefix='marketingcloud-tables-', dir=self._spill_dir)
+            path = os.path.join(self._tmp.name, f'table_{id}.npz')
+            evicted.save(path)
+            self._spilled[id] = (path, os.path.getsize(path))
+        while self._spilled and self.max_spill_bytes is not None and self.spilled_bytes > self.max_spill_bytes:
+            _, (path, _) = self._spilled.popitem(last=False)
+            os.remove(path)
+
+    def clear(self) -> None:
+        """Forgets every table, in memory and on disk"""
+        with self._lock:
+            self._tables.clear()
+            self._sizes.clear()
+            self._spilled.clear()
+            if self._tmp is not None:
+                self._tmp.cleanup()
+                self._tmp = None
+
+
 class Reports:
-    tables = []
+    """
+    Arguments:
+        config(str, TextIO, dict, JWTAuth): configuration used to create the Analytics client
+        base_url(str, optional): Analytics API base url
+        max_tables(int, optional): Number of created tables kept in memory, see _TableRegistry
+        max_table_bytes(int, optional): Memory the created tables may use before being spilled to disk
+        spill_dir(str, optional): Directory receiving the spilled tables
+        max_spill_bytes(int, optional): Disk space the spilled tables may use before the oldest are deleted
+        items(ItemDictionary, optional): Dictionary recording the itemId and value of the rows of every page
+    """
+
+    def __init__(self,
+                 config: typing.Union[str, typing.TextIO],
+                 base_url: str = None,
+                 max_tables: int = 16,
+                 max_table_bytes: int = 256 * 2 ** 20,
+                 spill_dir: str = None,
+                 items: ItemDictionary = None,
+                 max_spill_bytes: int = 4 * 2 ** 30) -> None:
+        self.analytics_client = Analytics(config, base_url=base_url)
+        self._tables = _TableRegistry(max_tables, max_table_bytes, spill_dir, max_spill_bytes)
+        self.items = items
+        self._metric_catalogs = {}
+        self._timezones = {}
+        self._calculated_definitions = {}
 
-    def __init__(self, config: typing.Union[str, typing.TextIO]) -> None:
-        self.analytics_client = Analytics(config)
+    @property
+    def tables(self) -> _TableRegistry:
+        """Registry of the tables created by this instance"""
+        return self._tables
 
     def _update_page_settings(self, payload: dict) -> dict:
         """Increments payloads settings.page value by one if not last page"""
@@ -57,13 +364,26 @@ class Reports:
         return payload
 
     def _get(self,
-             payload: typing.Union[str, dict]) -> typing.Generator[dict, None, None]:
-        """Requests the /report endpoint with the payload provided"""
+             payload: typing.Union[str, dict],
+             profiler: Profiler = None,
+             projection: bool = False) -> typing.Generator[dict, None, None]:
+        """Requests the /report endpoint with the payload provided
+        Pages are decoded with codec.decode, or reduced to values, data arrays and paging fields
+        with codec.project_report if 'projection' is set
+        """
         if isinstance(payload, str):
             payload = json.loads(payload)
+        profiler = profiler or Profiler(enabled=False)
         while True:
-            response = self.analytics_client.reports(payload)
-            response_dict = response.json()
+            page = payload.get('settings', {}).get('page', 0)
+            with profiler.phase('request', page):
+                response = self.analytics_client.reports(payload)
+            with profiler.phase('decode', page):
+                response_dict = codec.decode(response)
+                if self.items is not None:
+                    self.items.record_page(payload, response_dict)
+                if projection:
+                    response_dict = codec.project_report(response_dict)
             self._update_page_settings(payload)
             yield response_dict
             # lastPage indicates the last response chunk
@@ -73,28 +393,222 @@ class Reports:
 
     def _create_table(self,
                       payload: typing.Union[str, dict],
-                      all_pages: bool) -> _Table:
+                      all_pages: bool,
+                      profiler: Profiler = None,
+                      projection: bool = False) -> _Table:
         """Creates a new intermediate table format _Table"""
-        table = _Table(len(self.tables) + 1, self.analytics_client)
+        profiler = profiler or Profiler(enabled=False)
+        table = _Table(self.tables.next_id(), self.analytics_client)
         table.process_payload(payload)
-        for chunk in self._get(payload):
-            table.process_response(chunk)
-            if not all:
+        for page, chunk in enumerate(self._get(payload, profiler=profiler, projection=projection)):
+            with profiler.phase('accumulate', page):
+                table.process_response(chunk)
+            if not all_pages:
                 break
         self.tables.append(table)
         return table
 
+    def _totals(self, payload: dict, profiler: Profiler) -> pandas.DataFrame:
+        """Requests the smallest page of the report and returns its summaryData"""
+        with profiler.phase('request', 0):
+            response = self.analytics_client.reports(estimates.probe_payload(payload))
+        with profiler.phase('decode', 0):
+            document = codec.decode(response)
+            if not document.get('summaryData'):
+                raise ValueError(f"/reports response of {payload.get('rsid')} has no summaryData, "
+                                 f"got the fields {sorted(document)}")
+            summary = codec.project_summary(document)
+        with profiler.phase('frame'):
+            columns = [metric['id'] for metric in payload['metricContainer']['metrics']]
+            return pandas.DataFrame.from_dict(summary, orient='index', columns=columns)
+
+    def _metric_catalog(self, rsid: str) -> typing.List[dict]:
+        """/metrics catalog of the report suite, requested once per rsid"""
+        if rsid not in self._metric_catalogs:
+            self._metric_catalogs[rsid] = codec.decode(self.analytics_client.get_metrics(rsid))
+        return self._metric_catalogs[rsid]
+
+    def _integer_metrics(self, rsid: str) -> typing.Set[str]:
+        """Ids of the integer metrics of the report suite"""
+        return dtypes.integer_metrics(self._metric_catalog(rsid))
+
+    def _timezone(self, rsid: str) -> typing.Optional[str]:
+        """timezoneZoneinfo of the report suite, requested once per rsid"""
+        if rsid not in self._timezones:
+            suite = codec.decode(self.analytics_client.get_collection_suite(rsid, expansion='timezoneZoneinfo'))
+            self._timezones[rsid] = suite.get('timezoneZoneinfo')
+        return self._timezones[rsid]
+
     def get_dataframe(self,
                       payload: typing.Union[str, dict],
-                      all_pages: bool = True) -> pandas.DataFrame:
+                      all_pages: bool = True,
+                      profile: bool = False,
+                      projection: bool = False,
+                      categorical: typing.Union[bool, dtypes.StringPool] = False,
+                      integer_metrics: typing.Union[bool, typing.Iterable[str]] = False,
+                      parse_dates: bool = False,
+                      timezone: str = None,
+                      rollup: rollups.Rollup = None,
+                      totals: bool = False,
+                      item_ids: bool = False) -> typing.Union[
+                          pandas.DataFrame, typing.Tuple[pandas.DataFrame, dict]]:
         """Requests the Adobe Analytics /reports endpoint with the provided payload data
         and returns a pandas.DataFrame object.
         if 'all_pages' is set to False, only the first page will be requested. Otherwise
         this method will continue requesting following pages until the lastPage flag is set
+        if 'profile' is set to True, a tuple of the DataFrame and the Profiler.report() breakdown
+        of the request, decode, accumulate and frame phases is returned instead
+        if 'projection' is set, pages are reduced to itemIds, dimension values and metric arrays right after
+        decoding, which drops columns metadata and the totals fallback for dimensionless reports
+        if 'categorical' is set, the index is a CategoricalIndex. Pass a dtypes.StringPool to share the
+        intern table of dimension values between reports
+        if 'integer_metrics' is set, metrics typed int in the /metrics catalog of the report suite are
+        downcast to the smallest integer dtype. Pass the metric ids to skip the catalog request
+        if 'parse_dates' is set and the dimension is a time dimension (dtypes.TIME_DIMENSIONS), the index is
+        a DatetimeIndex localized to the timezoneZoneinfo of the report suite, or to 'timezone' if given
+        if a rollup.Rollup is passed, complete daterangeday reports are recorded in it and week, month, quarter
+        and year reports are computed from the recorded days for the additive metrics of the /metrics catalog,
+        only the other metrics are requested
+        if 'totals' is set, a single one row page is requested and only its summaryData is read: the DataFrame
+        has one column per metric and the codec.SUMMARY_FIELDS rows (totals, filteredTotals, col-max, col-min)
+        if 'item_ids' is set, an 'itemId' column precedes the metrics of a requested report so that rows sharing
+        a display value can be told apart, ie by add_calculated_metrics
         """
-        table = self._create_table(payload, all_pages)
-        data = [row[1] for row in table.rows]
-        index = [row[0] for row in table.rows]
-        columns = table.columns
-        df = pandas.DataFrame(data, columns=columns, index=index)
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        profiler = Profiler(enabled=profile)
+        try:
+            dimension = payload.get('dimension')
+            df = None
+            if totals:
+                df = self._totals(payload, profiler)
+                dimension, categorical = None, False
+            if df is None and rollup is not None and dimension in rollups.GRANULARITIES:
+                # the metrics catalog and the restricted report are fetched here
+                with profiler.phase('request'):
+                    df = rollup.report(payload, rollups.additive_metrics(self._metric_catalog(payload['rsid'])),
+                                       lambda restricted: self.get_dataframe(restricted, projection=projection))
+                if df is not None and not parse_dates:
+                    df.index = rollups.format_time_values(df.index, dimension)
+            if df is None:
+                table = self._create_table(payload, all_pages, profiler=profiler, projection=projection)
+                with profiler.phase('frame'):
+                    df = table.to_dataframe(item_ids=item_ids)
+                    dimension = getattr(table, 'dimension', None)
+                    if rollup is not None and all_pages and dimension == rollups.DAY:
+                        rollup.store(payload, df.drop(columns='itemId') if item_ids else df)
+            with profiler.phase('frame'):
+                if parse_dates and dimension in dtypes.TIME_DIMENSIONS:
+                    index = df.index
+                    tz = timezone or self._timezone(payload['rsid'])
+                    if not isinstance(index, pandas.DatetimeIndex):
+                        index = dtypes.parse_time_dimension(index, dimension, timezone=tz)
+                    else:
+                        index = dtypes.localize(index, tz)
+                    if index is not None:
+                        df.index = index
+                        categorical = False
+                if categorical is not False or integer_metrics is not False:
+                    if integer_metrics is True:
+                        integer_metrics = self._integer_metrics(payload['rsid'])
+                    pool = categorical if isinstance(categorical, dtypes.StringPool) else None
+                    if categorical is True:
+                        pool = dtypes.StringPool()
+                    df = dtypes.compact(df, pool=pool, integer_columns=integer_metrics or ())
+        finally:
+            profiler.stop()
+        if profile:
+            return df, profiler.report()
+        return df
+
+    def _calculated_definition(self, id: str) -> typing.Optional[dict]:
+        """Definition of a calculated metric, requested once per id"""
+        if id not in self._calculated_definitions:
+            response = codec.decode(self.analytics_client.get_calculatedmetric(id, expansion='definition'))
+            self._calculated_definitions[id] = response.get('definition')
+        return self._calculated_definitions[id]
+
+    def add_calculated_metrics(self,
+                               df: pandas.DataFrame,
+                               payload: typing.Union[str, dict],
+                               ids: typing.Iterable[str],
+                               definitions: typing.Dict[str, dict] = None) -> pandas.DataFrame:
+        """Adds calculated metrics as columns of a DataFrame returned by get_dataframe for 'payload'
+        Metrics whose formula only combines metrics already in df with the functions of calculated.FUNCTIONS
+        are computed locally, the others are requested with the dimension and filters of 'payload' and aligned
+        on the 'itemId' column of get_dataframe(item_ids=True), or on the index if df has no such column.
+        With an 'itemId' column, the request is restricted to the items of df with search.itemIds and costs one
+        page per estimate.MAX_PAGE_SIZE items, otherwise every page of the report is requested.
+        'definitions' maps ids to definitions already retrieved, ie with calculated.definitions, the
+        definition of the other ids is requested from /calculatedmetrics/{id}
+        """
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        definitions = definitions or {}
+        metrics_definitions = {id: definitions.get(id) or self._calculated_definition(id) for id in ids}
+        df, missing = calculated.add_calculated_metrics(df, metrics_definitions)
+        if missing:
+            restricted = json.loads(json.dumps(payload))
+            restricted['metricContainer'] = {'metrics': [{'columnId': str(i), 'id': id, 'filters': []}
+                                                         for i, id in enumerate(missing)]}
+            restricted.setdefault('settings', {})['page'] = 0
+            key = 'itemId' if 'itemId' in df.columns else None
+            if key is not None:
+                item_ids = [item for item in dict.fromkeys(df[key]) if item is not None]
+                restricted.setdefault('search', {})['itemIds'] = item_ids
+                restricted['settings']['limit'] = min(max(len(item_ids), 1), estimates.MAX_PAGE_SIZE)
+            fetched = self.get_dataframe(restricted, item_ids=key is not None)
+            if key is not None:
+                fetched = fetched.set_index(key)
+            if not fetched.index.is_unique:
+                raise ValueError(f"several items of {payload.get('dimension')} share a display value, "
+                                 f"request df with get_dataframe(item_ids=True)")
+            keys = df[key] if key is not None else df.index
+            for id in missing:
+                df[id] = fetched[id].reindex(keys, fill_value=0).to_numpy()
         return df
+
+    def compare_segments(self,
+                         payload: typing.Union[str, dict],
+                         segment_ids: typing.Sequence[str],
+                         column_limit: int = segments.COLUMN_LIMIT,
+                         **kwargs) -> pandas.DataFrame:
+        """Compares the metrics of 'payload' across segments with as few requests as the column limit allows
+        The segments are packed as metricFilters (see segments.pack), column_limit // metrics segments per request,
+        so segments.requests_needed requests are sent. The reports are returned as one long DataFrame with the
+        dimension, 'segment' and one column per metric. Other keyword arguments are passed to get_dataframe
+        """
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        metric_ids = [metric['id'] for metric in payload['metricContainer']['metrics']]
+        frames = []
+        for request, packed_segments in segments.pack(payload, segment_ids, column_limit):
+            df = self.get_dataframe(request, **kwargs)
+            df.index.name = payload.get('dimension')
+            frames.append(segments.unpack(df, packed_segments, metric_ids))
+        return pandas.concat(frames, ignore_index=True)
+
+    def extract(self, payload: typing.Union[str, dict], **kwargs) -> pandas.DataFrame:
+        """Retrieves a report of a very high cardinality dimension as disjoint shards walked concurrently
+        The item space is split with search clause prefixes until every shard is small enough, the shards
+        are merged without duplicated itemIds and can be checkpointed to resume an interrupted extraction.
+        See shards.extract for the keyword arguments, ie max_workers, checkpoint_dir, max_rows or alphabet
+        """
+        def fetch(request):
+            page = codec.decode(self.analytics_client.reports(request))
+            if self.items is not None:
+                self.items.record_page(request, page)
+            return page
+        return shards.extract(fetch, payload, **kwargs)
+
+    def estimate(self, payload: typing.Union[str, dict], **kwargs) -> estimates.Estimate:
+        """Estimates the calls, quota and time get_dataframe would need for 'payload' without running it
+        A single one row request reads the size of the report, see estimate.estimate for the keyword arguments
+        describing the planned shards, breakdowns, report suites and page size. The rate is the budget of
+        the company in the quota tracker of the session
+        """
+        session = self.analytics_client.session
+        kwargs.setdefault('company_id', session.config['companyId'])
+        if getattr(session, 'quota', None) is not None:
+            kwargs.setdefault('quota', session.quota)
+        return estimates.estimate(lambda probe: codec.decode(self.analytics_client.reports(probe)), payload, **kwargs)
@@ -0,0 +1,192 @@
+import json
+import time
+import heapq
+import typing
+import itertools
+import threading
+from concurrent.futures import Future, as_completed
+
+from .quota import call_priority
+
+PRIORITIES = ('high', 'normal', 'low')
+
+
+class DeadlineExceededError(Exception):
+    """Raised in the future of a payload whose deadline passed before a worker picked it up"""
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __str__(self):
+        return f'Deadline passed {time.monotonic() - self.deadline:.1f}s before the report could start'
+
+
+def canonical(payload: typing.Union[str, dict]) -> str:
+    """Returns a key identical for payloads requesting the same report, whatever their key order or page"""
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    settings = {key: value for key, value in payload.get('settings', {}).items() if key != 'page'}
+    return json.dumps(dict(payload, settings=settings), sort_keys=True)
+
+
+class _Job:
+    def __init__(self, key: str, payload: dict, priority: str, deadline: typing.Optional[float]) -> None:
+        self.key = key
+        self.payload = payload
+        self.priority = priority
+        self.deadline = deadline
+        self.future = Future()
+
+
+class BatchExecutor:
+    """Runs many report payloads on a bounded pool of worker threads
+
+    Queued payloads are started by priority ('high' before 'normal' before 'low'), then by
+    deadline and submission order, so interactive requests jump ahead of background backfills.
+    Workers run the reports inside quota.call_priority, which lets 'high' reports use the share
+    of the company budget reserved for them. Identical payloads (see canonical) submitted while
+    one is queued or running share its future; resubmitting with a higher priority or an earlier
+    deadline moves the queued job ahead.
+
+    Arguments:
+        run(callable): function producing the result of one payload, ie Reports(...).get_dataframe or
+                       lambda payload: client.getReport(payload, n_result='inf'). It receives a copy of
+                       the payload
+        max_workers(int, optional): Number of reports running at the same time, defaults to 4
+    """
+
+    def __init__(self, run: typing.Callable[[dict], typing.Any], max_workers: int = 4) -> None:
+        self.run = run
+        self.max_workers = max_workers
+        self._queue = []
+        self._jobs = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._workers = [threading.Thread(target=self._work, name=f'batch-worker-{i}', daemon=True)
+                         for i in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def __len__(self) -> int:
+        """Number of queued or running payloads"""
+        return len(self._jobs)
+
+    def submit(self,
+               payload: typing.Union[str, dict],
+               priority: str = 'normal',
+               deadline: float = None) -> Future:
+        """Queues a report payload and returns the future of its result
+
+        Arguments:
+            payload(dict, str): report payload
+            priority(str, optional): 'high', 'normal' or 'low', defaults to 'normal'
+            deadline(float, optional): Seconds from now after which the report isn't started anymore, its
+                                       future then raises DeadlineExceededError
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f'priority must be one of {PRIORITIES}')
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        key = canonical(payload)
+        deadline = time.monotonic() + deadline if deadline is not None else None
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot submit to a shut down BatchExecutor')
+            job = self._jobs.get(key)
+            if job is None or job.future.cancelled():
+                job = self._jobs[key] = _Job(key, json.loads(json.dumps(payload)), priority, deadline)
+                self._push(job)
+            elif not job.future.running():
+                rank = PRIORITIES.index(priority) < PRIORITIES.index(job.priority)
+                earlier = deadline is not None and (job.deadline is None or deadline < job.deadline)
+                if rank or earlier:
+                    job.priority = priority if rank else job.priority
+                    job.deadline = deadline if earlier else job.deadline
+                    self._push(job)
+            return job.future
+
+    def map(self,
+            payloads: typing.Iterable[typing.Union[str, dict]],
+            priority: str = 'normal',
+            deadline: float = None) -> typing.List[Future]:
+        """Submits every payload with the same priority and deadline"""
+        return [self.submit(payload, priority=priority, deadline=deadline) for payload in payloads]
+
+    def stream(self,
+               payloads: typing.Iterable[typing.Union[str, dict]],
+               priority: str = 'normal',
+               deadline: float = None) -> typing.Iterator[typing.Tuple[dict, typing.Any]]:
+        """Submits the payloads and yields (payload, result) as the reports complete
+        The exception of a failed report is raised when its turn comes
+        """
+        payloads = [json.loads(payload) if isinstance(payload, str) else payload for payload in payloads]
+        futures = {}
+        for payload in payloads:
+            futures.setdefault(self.submit(payload, priority=priority, deadline=deadline), []).append(payload)
+        for future in as_completed(futures):
+            for payload in futures[future]:
+                yield payload, future.result()
+
+    def _push(self, job: _Job) -> None:
+        deadline = job.deadline if job.deadline is not None else float('inf')
+        heapq.heappush(self._queue, (PRIORITIES.index(job.priority), deadline, next(self._counter), job))
+        self._condition.notify()
+
+    def _next(self) -> typing.Optional[_Job]:
+        with self._condition:
+            while True:
+                while self._queue:
+                    rank, deadline, _, job = heapq.heappop(self._queue)
+                    # jobs pushed again after a priority change leave stale entries behind
+                    current = job.deadline if job.deadline is not None else float('inf')
+                    if self._jobs.get(job.key) is not job or job.future.running() or job.future.done() \
+                            or (rank, deadline) != (PRIORITIES.index(job.priority), current):
+                        continue
+                    # claimed under the lock, a job pushed again is never handed to a second worker
+                    if job.future.set_running_or_notify_cancel():
+                        return job
+                    del self._jobs[job.key]
+                if self._shutdown:
+                    return None
+                self._condition.wait()
+
+    def _work(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            try:
+                if job.deadline is not None and time.monotonic() > job.deadline:
+                    job.future.set_exception(DeadlineExceededError(job.deadline))
+                    continue
+                try:
+                    with call_priority(job.priority):
+                        result = self.run(json.loads(json.dumps(job.payload)))
+                except BaseException as error:
+                    job.future.set_exception(error)
+                else:
+                    job.future.set_result(result)
+            finally:
+                with self._condition:
+                    if self._jobs.get(job.key) is job:
+                        del self._jobs[job.key]
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stops the workers once the queue is empty, or right after the running reports if cancel_pending is set"""
+        with self._condition:
+            self._shutdown = True
+            if cancel_pending:
+                for _, _, _, job in self._queue:
+                    job.future.cancel()
+                    self._jobs.pop(job.key, None)
+                self._queue = []
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -0,0 +1,115 @@
+import typing
+
+import numpy
+import pandas
+
+FUNCTIONS = ('metric', 'number', 'add', 'subtract', 'multiply', 'divide', 'negate', 'abs')
+
+
+class UnsupportedFormulaError(Exception):
+    """Raised if a calculated metric formula uses a function or operand that can't be evaluated locally"""
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def formula(definition: dict) -> dict:
+    """Returns the formula of a calculated metric, its definition or the formula itself"""
+    if 'definition' in definition:
+        definition = definition['definition']
+    if 'formula' in definition:
+        definition = definition['formula']
+    return definition
+
+
+def definitions(catalog: typing.Union[pandas.DataFrame, typing.List[dict]]) -> typing.Dict[str, dict]:
+    """Maps the calculated metric ids of a catalog retrieved with the definition expansion to their definition
+    ie getCalculatedMetrics(extended_info=True) in aanalytics2 or /calculatedmetrics?expansion=definition
+    """
+    if isinstance(catalog, pandas.DataFrame):
+        catalog = catalog.to_dict('records')
+    return {metric['id']: metric['definition'] for metric in catalog if isinstance(metric.get('definition'), dict)}
+
+
+def operands(definition: dict) -> typing.Set[str]:
+    """Returns the ids of the metrics the formula is computed from
+
+    Raises:
+        UnsupportedFormulaError: if the formula uses a function other than FUNCTIONS or a segmented metric
+    """
+    node = formula(definition)
+    func = node.get('func')
+    if func not in FUNCTIONS:
+        raise UnsupportedFormulaError(f'function {func} is not evaluated locally')
+    if func == 'metric':
+        if node.get('filters') or 'name' not in node:
+            raise UnsupportedFormulaError(f'metric {node.get("name")} is filtered')
+        return {node['name']}
+    if func == 'number':
+        return set()
+    if func in ('negate', 'abs'):
+        return operands(node['col'])
+    return operands(node['col1']) | operands(node['col2'])
+
+
+def evaluate(definition: dict, df: pandas.DataFrame) -> numpy.ndarray:
+    """Evaluates a calculated metric over the metric columns of ``df``
+
+    Division by zero yields 0, like the API.
+
+    Arguments:
+        definition(dict): calculated metric, its definition or its formula
+        df(DataFrame): report with one column per operand metric id
+
+    Raises:
+        UnsupportedFormulaError: if the formula can't be evaluated locally
+        KeyError: if an operand isn't a column of df
+    """
+    node = formula(definition)
+    func = node.get('func')
+    operands(node)
+    if func == 'metric':
+        columns = list(df.columns)
+        if node['name'] not in columns:
+            raise KeyError(node['name'])
+        return df.iloc[:, columns.index(node['name'])].to_numpy(dtype=numpy.float64)
+    if func == 'number':
+        return numpy.full(len(df), float(node['val']))
+    if func == 'negate':
+        return -evaluate(node['col'], df)
+    if func == 'abs':
+        return numpy.abs(evaluate(node['col'], df))
+    left, right = evaluate(node['col1'], df), evaluate(node['col2'], df)
+    if func == 'add':
+        return left + right
+    if func == 'subtract':
+        return left - right
+    if func == 'multiply':
+        return left * right
+    result = numpy.zeros(len(df))
+    numpy.divide(left, right, out=result, where=right != 0)
+    return result
+
+
+def add_calculated_metrics(df: pandas.DataFrame,
+                           metrics: typing.Dict[str, dict]) -> typing.Tuple[pandas.DataFrame, typing.List[str]]:
+    """Adds the calculated metrics whose operands are all columns of ``df``
+
+    Arguments:
+        df(DataFrame): report with one column per metric id
+        metrics(dict): calculated metric id -> definition, None if the definition is unknown
+
+    Returns:
+        (DataFrame, list) df with one column per computed metric, and the ids left for the API
+    """
+    missing = []
+    for id, definition in metrics.items():
+        try:
+            if definition is None or not operands(definition) <= set(df.columns):
+                raise UnsupportedFormulaError(f'operands of {id} are not in the report')
+            df[id] = evaluate(definition, df)
+        except UnsupportedFormulaError:
+            missing.append(id)
+    return df, missing
@@ -0,0 +1,97 @@
+import json
+import typing
+
+import numpy
+
+try:
+    import orjson as _fast_json
+except ImportError:
+    try:
+        import ujson as _fast_json
+    except ImportError:
+        _fast_json = None
+
+
+PAGING_FIELDS = ('totalPages', 'firstPage', 'lastPage', 'numberOfElements', 'number', 'totalElements')
+ANOMALY_FIELDS = ('dataExpected', 'dataUpperBound', 'dataLowerBound')
+# rows of a totals report, read from summaryData and summaryData.statistics
+SUMMARY_FIELDS = ('totals', 'filteredTotals', 'col-max', 'col-min')
+
+_loads: typing.Callable[[typing.Union[bytes, str]], typing.Any] = \
+    _fast_json.loads if _fast_json is not None else json.loads
+
+
+def set_decoder(loads: typing.Callable[[typing.Union[bytes, str]], typing.Any] = None) -> None:
+    """Replaces the JSON decoder used for API responses
+
+    Arguments:
+        loads(callable, optional): function parsing bytes or str into python objects. Resets to the
+                                   fastest available codec (orjson, ujson, json) if omitted
+    """
+    global _loads
+    if loads is None:
+        loads = _fast_json.loads if _fast_json is not None else json.loads
+    _loads = loads
+
+
+def loads(data: typing.Union[bytes, str]) -> typing.Any:
+    return _loads(data)
+
+
+def decode(response: typing.Any) -> typing.Any:
+    """Decodes the body of a response with the configured decoder
+    Falls back to response.json() for response objects that don't expose the raw content
+    """
+    content = getattr(response, 'content', None)
+    if isinstance(content, (bytes, str)):
+        return _loads(content)
+    return response.json()
+
+
+def project_report(document: typing.Union[dict, bytes, str], anomaly: bool = False) -> dict:
+    """Reduces a /reports page to the fields needed to build a table
+
+    The row dicts are dropped as soon as itemIds, values and metrics have been copied to lists
+    and arrays, ``columns`` metadata and, unless ``anomaly`` is set, the anomaly detection
+    fields are never retained.
+
+    Arguments:
+        document(dict, bytes, str): decoded page or raw response body
+        anomaly(bool, optional): keep dataExpected, dataUpperBound and dataLowerBound as arrays
+
+    Returns:
+        (dict) with 'itemIds' (list of itemIds, None for rows without one), 'values' (list of
+               dimension values), 'data' (float64 array rows x metrics),
+               the paging fields and, if anomaly is set, the anomaly fields as arrays.
+    """
+    if isinstance(document, (bytes, str)):
+        document = _loads(document)
+    rows = document.get('rows', [])
+    n_metrics = len(rows[0]['data']) if rows else 0
+    projection = {field: document[field] for field in PAGING_FIELDS if field in document}
+    projection['itemIds'] = [row.get('itemId') for row in rows]
+    projection['values'] = [row['value'] for row in rows]
+    projection['data'] = _to_array([row['data'] for row in rows], n_metrics)
+    if anomaly:
+        for field in ANOMALY_FIELDS:
+            projection[field] = _to_array([row.get(field) or [0] * n_metrics for row in rows], n_metrics)
+    return projection
+
+
+def project_summary(document: typing.Union[dict, bytes, str]) -> typing.Dict[str, numpy.ndarray]:
+    """Reduces a /reports page to the totals and statistics of its summaryData, rows are ignored
+
+    Returns:
+        (dict) SUMMARY_FIELDS present in the page -> float64 array with one value per metric
+    """
+    if isinstance(document, (bytes, str)):
+        document = _loads(document)
+    summary = document.get('summaryData') or {}
+    fields = dict(summary, **(summary.get('statistics') or {}))
+    return {field: numpy.asarray(fields[field], dtype=numpy.float64) for field in SUMMARY_FIELDS if field in fields}
+
+
+def _to_array(data: list, n_metrics: int) -> numpy.ndarray:
+    if not data:
+        return numpy.empty((0, n_metrics), dtype=numpy.float64)
+    return numpy.asarray(data, dtype=numpy.float64).reshape(len(data), n_metrics)
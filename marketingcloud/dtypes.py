@@ -0,0 +1,187 @@
+import typing
+import threading
+
+import numpy
+import pandas
+
+INTEGER_TYPES = ('int', 'integer')
+_INTEGER_DTYPES = (numpy.int8, numpy.int16, numpy.int32, numpy.int64)
+# pandas 2 infers a single format from the first value unless format='mixed', older versions parse each value
+_MIXED_FORMAT = {'format': 'mixed'} if int(pandas.__version__.split('.')[0]) >= 2 else {}
+# formats of the display values of the time dimensions, tried in order before pandas' mixed parser
+TIME_DIMENSIONS = {
+    'variables/daterangeminute': ('%H:%M %Y-%m-%d', '%b %d, %Y, %H:%M'),
+    'variables/daterangehour': ('%H:%M %Y-%m-%d', '%b %d, %Y, Hour %H', '%b %d, %Y, %H:%M'),
+    'variables/daterangeday': ('%b %d, %Y',),
+    'variables/daterangeweek': ('%b %d, %Y',),
+    'variables/daterangemonth': ('%b %Y',),
+    'variables/daterangequarter': ('quarter',),
+    'variables/daterangeyear': ('%Y',),
+}
+
+
+class StringPool:
+    """Intern table of dimension values
+
+    Every distinct value gets a stable integer code, so a pool shared by the pages of a report,
+    by several reports or by the shards of an extraction stores each string once and the
+    dimension columns only hold codes. Categories are appended in order of first appearance and
+    a frame only gets the categories of its own values, in pool order: frames built from the same
+    pool can be combined with pandas.api.types.union_categoricals.
+    """
+
+    def __init__(self) -> None:
+        self._codes = {}
+        self.categories = []
+        self._index = pandas.Index([], dtype=object)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def encode(self, values: typing.Iterable[str]) -> numpy.ndarray:
+        """Returns the codes of ``values``, interning the unknown ones"""
+        codes = self._codes
+        with self._lock:
+            encoded = []
+            for value in values:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(self.categories)
+                    self.categories.append(value)
+                encoded.append(code)
+        return numpy.asarray(encoded, dtype=numpy.int32 if len(self.categories) < 2 ** 31 else numpy.int64)
+
+    def index(self, size: int) -> pandas.Index:
+        """Returns an Index of at least the first ``size`` categories, rebuilt only when the pool outgrew it"""
+        with self._lock:
+            if len(self._index) < size:
+                self._index = pandas.Index(self.categories[:len(self)], dtype=object)
+            return self._index
+
+    def categorical(self, values: typing.Iterable[str]) -> pandas.Categorical:
+        """Returns ``values`` as a pandas.Categorical whose categories are the pool values present in ``values``"""
+        used, codes = numpy.unique(self.encode(values), return_inverse=True)
+        size = int(used[-1]) + 1 if len(used) else 0
+        index = self.index(size)
+        if size == len(used):
+            # the values use a prefix of the pool, the cached index is shared instead of copied
+            categories = index if size == len(index) else index[:size]
+        else:
+            categories = index.take(used)
+        return pandas.Categorical.from_codes(codes.reshape(-1), categories=categories)
+
+
+def integer_metrics(catalog: typing.Union[pandas.DataFrame, typing.List[dict]]) -> typing.Set[str]:
+    """Returns the ids of the metrics of a /metrics catalog that only take integer values
+
+    Arguments:
+        catalog(DataFrame, list): metrics as returned by aanalytics2 getMetrics or the /metrics endpoint,
+                                  with at least the id and type fields
+    """
+    if isinstance(catalog, pandas.DataFrame):
+        catalog = catalog.to_dict('records')
+    integers = set()
+    for metric in catalog:
+        precision = metric.get('precision')
+        if pandas.isna(precision):
+            precision = 0
+        if str(metric.get('type', '')).lower() in INTEGER_TYPES and not precision:
+            integers.add(metric['id'])
+    return integers
+
+
+def downcast_integers(values: typing.Union[numpy.ndarray, pandas.Series]) -> numpy.ndarray:
+    """Returns ``values`` in the smallest signed integer dtype holding them
+    Values are returned unchanged if they are not all finite integers.
+    """
+    values = numpy.asarray(values)
+    if not len(values):
+        return values.astype(numpy.int8)
+    if not numpy.isfinite(values).all() or not (values == numpy.trunc(values)).all():
+        return values
+    low, high = values.min(), values.max()
+    for dtype in _INTEGER_DTYPES:
+        info = numpy.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+def compact(df: pandas.DataFrame,
+            dimension: str = None,
+            pool: StringPool = None,
+            integer_columns: typing.Iterable[str] = ()) -> pandas.DataFrame:
+    """Converts the dimension to a categorical and the integer metrics to compact integer dtypes
+
+    Arguments:
+        df(DataFrame): report frame
+        dimension(str, optional): column holding the dimension values, the index is converted if omitted
+        pool(StringPool, optional): intern table of the dimension values, the dimension is left as is if omitted
+        integer_columns(iterable, optional): metric columns to downcast, see integer_metrics
+    """
+    if pool is not None:
+        if dimension is None:
+            df.index = pandas.CategoricalIndex(pool.categorical(df.index), name=df.index.name)
+        else:
+            df[dimension] = pool.categorical(df[dimension])
+    integer_columns = set(integer_columns)
+    positions = [position for position, column in enumerate(df.columns) if column in integer_columns]
+    if positions:
+        # columns are replaced by position, metric ids can repeat (ie segment comparisons)
+        columns = df.columns
+        df.columns = pandas.RangeIndex(len(columns))
+        for position in positions:
+            df[position] = downcast_integers(df[position].to_numpy())
+        df.columns = columns
+    return df
+
+
+def _parse_quarter(values: pandas.Index) -> pandas.DatetimeIndex:
+    """Parses 'Q1 2019' values to the first day of the quarter"""
+    periods = values.str.replace(r'^Q([1-4]) (\d{4})$', r'\2Q\1', regex=True)
+    return pandas.PeriodIndex(periods, freq='Q').to_timestamp()
+
+
+def parse_time_dimension(values: typing.Iterable[str],
+                         dimension: str,
+                         timezone: str = None) -> typing.Optional[pandas.DatetimeIndex]:
+    """Parses the display values of a time dimension in one vectorised pass
+
+    Arguments:
+        values(iterable): display values, ie 'Jan 1, 2019' for variables/daterangeday
+        dimension(str): dimension id, only the ids of TIME_DIMENSIONS are parsed
+        timezone(str, optional): IANA zone of the report suite (timezoneZoneinfo), the index is
+                                 tz-naive if omitted
+
+    Returns:
+        (DatetimeIndex) named after the dimension, or None if the dimension isn't a time dimension
+        or its values can't be parsed
+    """
+    if dimension not in TIME_DIMENSIONS:
+        return None
+    values = pandas.Index(values, dtype=object)
+    parsed = None
+    for date_format in TIME_DIMENSIONS[dimension]:
+        try:
+            if date_format == 'quarter':
+                parsed = _parse_quarter(values)
+            else:
+                parsed = pandas.to_datetime(values, format=date_format)
+            break
+        except (ValueError, TypeError):
+            continue
+    if parsed is None:
+        try:
+            parsed = pandas.to_datetime(values, **_MIXED_FORMAT)
+        except (ValueError, TypeError):
+            return None
+    return localize(pandas.DatetimeIndex(parsed, name=dimension), timezone)
+
+
+def localize(index: pandas.DatetimeIndex, timezone: str = None) -> pandas.DatetimeIndex:
+    """Localizes naive wall clock times to ``timezone``, the index is returned as is if timezone is omitted"""
+    if not timezone or index.tz is not None:
+        return index
+    # repeated wall clock hours at the end of daylight saving time are read as standard time
+    return index.tz_localize(timezone, ambiguous=numpy.zeros(len(index), dtype=bool), nonexistent='shift_forward')
@@ -0,0 +1,129 @@
+import json
+import math
+import time
+import typing
+
+from .quota import QuotaTracker, QUOTAS
+
+# documented limit of the Analytics 2.0 API, 12 calls per 6 seconds
+API_RATE_LIMIT = 120
+# largest settings.limit accepted by /reports
+MAX_PAGE_SIZE = 50000
+# settings.limit of a payload that doesn't set one
+DEFAULT_PAGE_SIZE = 50
+
+
+def probe_payload(payload: dict) -> dict:
+    """Returns the payload of a one row, first page request reading totalElements and totalPages"""
+    probe = json.loads(json.dumps(payload))
+    settings = probe.setdefault('settings', {})
+    settings.update({'limit': 1, 'page': 0})
+    settings.pop('includeAnomalyDetection', None)
+    return probe
+
+
+def pages_needed(rows: int, page_size: int) -> int:
+    """Number of requests walking ``rows`` rows, an empty report still costs one request"""
+    return max(math.ceil(rows / page_size), 1)
+
+
+class Estimate:
+    """Cost of a planned extraction, see estimate
+
+    Attributes:
+        total_rows(int): rows of the report, read from totalElements of the probe
+        rows(int): rows the extraction retrieves for one report suite, total_rows capped by max_rows
+        page_size(int): settings.limit of the extraction requests
+        pages(int): /reports requests of the extraction, every report suite, shard and breakdown included
+        probes(int): requests already made by the estimation
+        per_minute(int): rate limit the extraction is paced by
+        quota_minutes(float): minutes of the rate limit the extraction uses
+        wall_time(float): estimated seconds of the extraction, the longest of the rate limit and of the
+                          request latency spread over the concurrent workers
+    """
+
+    def __init__(self,
+                 total_rows: int,
+                 rows: int,
+                 page_size: int,
+                 pages: int,
+                 probes: int,
+                 per_minute: int,
+                 latency: float,
+                 concurrency: int) -> None:
+        self.total_rows = total_rows
+        self.rows = rows
+        self.page_size = page_size
+        self.pages = pages
+        self.probes = probes
+        self.per_minute = per_minute
+        self.latency = latency
+        self.concurrency = concurrency
+        self.quota_minutes = pages / per_minute
+        self.wall_time = max(self.quota_minutes * 60, math.ceil(pages / concurrency) * latency)
+
+    @property
+    def calls(self) -> int:
+        """API calls of the extraction and of its estimation"""
+        return self.pages + self.probes
+
+    def to_dict(self) -> dict:
+        return {'total_rows': self.total_rows, 'rows': self.rows, 'page_size': self.page_size,
+                'pages': self.pages, 'probes': self.probes, 'calls': self.calls, 'per_minute': self.per_minute,
+                'quota_minutes': self.quota_minutes, 'wall_time': self.wall_time}
+
+    def __repr__(self):
+        return f'Estimate(rows={self.rows}, calls={self.calls}, quota_minutes={self.quota_minutes:.1f}, ' \
+               f'wall_time={self.wall_time:.0f}s)'
+
+
+def estimate(probe: typing.Callable[[dict], dict],
+             payload: typing.Union[str, dict],
+             page_size: int = None,
+             max_rows: float = float('inf'),
+             shards: int = 1,
+             breakdowns: int = 0,
+             breakdown_rows: int = 1,
+             rsids: typing.Union[int, typing.Sequence[str]] = 1,
+             company_id: str = None,
+             quota: QuotaTracker = QUOTAS,
+             priority: str = 'normal',
+             concurrency: int = 1,
+             latency: float = None) -> Estimate:
+    """Estimates the calls, quota and time of an extraction from a single one row probe request
+
+    Arguments:
+        probe(callable): sends a /reports payload and returns the decoded page
+        payload(dict, str): report payload of the extraction
+        page_size(int, optional): settings.limit of the extraction, defaults to the one of the payload
+        max_rows(float, optional): rows retrieved at most per report, ie the n_result of aanalytics2 getReport
+        shards(int, optional): disjoint shards the item space is walked in, each walk costs at least one request
+        breakdowns(int, optional): breakdown reports run per report suite, ie one per top item broken down
+        breakdown_rows(int, optional): expected rows of every breakdown report, defaults to 1 (one request each)
+        rsids(int, list, optional): report suites the payload is run for, or their number. The probe is run
+                                    on the rsid of the payload and its size assumed for every suite
+        company_id(str, optional): company whose budget in ``quota`` sets the rate, API_RATE_LIMIT is used
+                                   if omitted or if the company has no per minute budget
+        quota(QuotaTracker, optional): tracker holding the budgets, defaults to QUOTAS
+        priority(str, optional): priority of the extraction calls, 'normal' ones can't use the reserved share
+        concurrency(int, optional): requests sent at the same time by the extraction, defaults to 1
+        latency(float, optional): seconds of one request, defaults to the latency of the probe
+    """
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    page_size = min(page_size or payload.get('settings', {}).get('limit') or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    started = time.perf_counter()
+    page = probe(probe_payload(payload))
+    measured = time.perf_counter() - started
+    if 'totalElements' not in page:
+        raise ValueError(f'probe request failed: {page}')
+    total_rows = int(page['totalElements'])
+    rows = int(min(total_rows, max_rows))
+    n_rsids = rsids if isinstance(rsids, int) else len(rsids)
+    walk = pages_needed(rows, page_size) if shards <= 1 else shards * pages_needed(math.ceil(rows / shards), page_size)
+    pages = n_rsids * (walk + breakdowns * pages_needed(breakdown_rows, page_size))
+    budget = quota.get_budget(company_id) if company_id is not None else None
+    limits = {name: limit for name, _, limit in budget.limits(priority)} if budget is not None else {}
+    per_minute = limits.get('minute') or API_RATE_LIMIT
+    return Estimate(total_rows, rows, page_size, pages, 1, per_minute,
+                    latency if latency is not None else measured, max(concurrency, 1))
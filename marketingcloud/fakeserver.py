@@ -0,0 +1,388 @@
+import re
+import json
+import hashlib
+import time
+import random
+import typing
+import datetime
+import threading
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TIME_DIMENSIONS = {
+    'variables/daterangeday': 'day',
+    'variables/daterangeweek': 'week',
+    'variables/daterangemonth': 'month'
+}
+
+
+def report_item(dimension: str, index: int) -> typing.Tuple[str, str]:
+    """Returns the itemId and display value of the ``index``-th item of ``dimension``"""
+    granularity = TIME_DIMENSIONS.get(dimension)
+    if granularity:
+        start = datetime.date(2019, 1, 1)
+        if granularity == 'day':
+            day = start + datetime.timedelta(days=index)
+        elif granularity == 'week':
+            day = start + datetime.timedelta(weeks=index)
+        else:
+            day = datetime.date(start.year + index // 12, index % 12 + 1, 1)
+        value = day.strftime('%b %Y') if granularity == 'month' else f'{day:%b} {day.day}, {day.year}'
+        return f'{day.year - 1900:03d}{day.month:02d}{day.day:02d}', value
+    name = dimension.split('/')[-1]
+    return str(1000000 + index), f'{name} {index}'
+
+
+def _metric_value(index: int, metric: int) -> float:
+    return float((index * 7919 + metric * 104729) % 1000)
+
+
+def _metric_total(total: int, metric: int) -> float:
+    # values cycle through a permutation of 0..999 every 1000 items
+    full, rest = divmod(total, 1000)
+    return float(full * 499500 + sum(_metric_value(full * 1000 + i, metric) for i in range(rest)))
+
+
+_CLAUSE_TOKENS = re.compile(r"\s*(\(|\)|AND\b|OR\b|NOT\b|(BEGINS-WITH|ENDS-WITH|CONTAINS)\s+'((?:[^'\\]|\\.)*)')")
+
+
+def search_matcher(clause: str) -> typing.Callable[[str], bool]:
+    """Compiles the AND, OR, NOT, BEGINS-WITH, ENDS-WITH and CONTAINS subset of search clauses
+
+    Matching is case insensitive. Raises ValueError on anything else.
+    """
+    tokens, position = [], 0
+    while position < len(clause.rstrip()):
+        match = _CLAUSE_TOKENS.match(clause, position)
+        if not match:
+            raise ValueError(f'unsupported search clause: {clause}')
+        operand = re.sub(r'\\(.)', r'\1', match.group(3)).lower() if match.group(2) else None
+        tokens.append((match.group(2) or match.group(1), operand))
+        position = match.end()
+    tests = {'BEGINS-WITH': str.startswith, 'ENDS-WITH': str.endswith, 'CONTAINS': str.__contains__}
+
+    def parse(index, level):
+        # level 0 parses OR, level 1 AND, level 2 NOT, parentheses and operators
+        if level < 2:
+            operator, combine = (('OR', any), ('AND', all))[level]
+            operand, index = parse(index, level + 1)
+            operands = [operand]
+            while index < len(tokens) and tokens[index][0] == operator:
+                operand, index = parse(index + 1, level + 1)
+                operands.append(operand)
+            return (lambda value: combine(test(value) for test in operands)), index
+        if index >= len(tokens):
+            raise ValueError(f'unsupported search clause: {clause}')
+        kind, operand = tokens[index]
+        if kind == 'NOT':
+            inner, index = parse(index + 1, 2)
+            return (lambda value: not inner(value)), index
+        if kind == '(':
+            inner, index = parse(index + 1, 0)
+            if index >= len(tokens) or tokens[index][0] != ')':
+                raise ValueError(f'unsupported search clause: {clause}')
+            return inner, index + 1
+        if kind in tests:
+            return (lambda value: tests[kind](value.lower(), operand)), index + 1
+        raise ValueError(f'unsupported search clause: {clause}')
+
+    matcher, index = parse(0, 0)
+    if index != len(tokens):
+        raise ValueError(f'unsupported search clause: {clause}')
+    return matcher
+
+
+def report_page(payload: dict, total_rows: int = 1000) -> dict:
+    """Generates the /reports page requested by ``payload`` for a dimension of ``total_rows`` items
+
+    The page honours settings.limit, settings.page, settings.includeAnomalyDetection, search.itemIds
+    and the search.clause subset of search_matcher, and has the same structure as an Analytics 2.0
+    response. Metric values are deterministic.
+    """
+    settings = payload.get('settings', {})
+    limit = max(int(settings.get('limit', 50)), 1)
+    page = int(settings.get('page', 0))
+    metrics = payload.get('metricContainer', {}).get('metrics', [])
+    column_ids = [metric.get('columnId', str(i)) for i, metric in enumerate(metrics)]
+    n_metrics = len(metrics)
+    dimension = payload.get('dimension', 'variables/daterangeday')
+    anomaly = settings.get('includeAnomalyDetection', False)
+    indices = range(total_rows)
+    clause = payload.get('search', {}).get('clause')
+    if clause:
+        matcher = search_matcher(clause)
+        indices = [index for index in indices if matcher(report_item(dimension, index)[1])]
+    item_ids = payload.get('search', {}).get('itemIds')
+    if item_ids is not None:
+        item_ids = set(item_ids)
+        indices = [index for index in indices if report_item(dimension, index)[0] in item_ids]
+    total_pages = max((len(indices) + limit - 1) // limit, 1)
+    rows = []
+    for index in indices[page * limit:(page + 1) * limit]:
+        item_id, value = report_item(dimension, index)
+        data = [_metric_value(index, m) for m in range(n_metrics)]
+        row = {'itemId': item_id, 'value': value, 'data': data}
+        if anomaly:
+            row['dataExpected'] = [d * 0.9 for d in data]
+            row['dataUpperBound'] = [d * 1.2 for d in data]
+            row['dataLowerBound'] = [d * 0.6 for d in data]
+        rows.append(row)
+    totals = [_metric_total(total_rows, m) for m in range(n_metrics)]
+    return {
+        'totalPages': total_pages,
+        'firstPage': page == 0,
+        'lastPage': page >= total_pages - 1,
+        'numberOfElements': len(rows),
+        'number': page,
+        'totalElements': len(indices),
+        'columns': {'dimension': {'id': dimension, 'type': 'string'}, 'columnIds': column_ids},
+        'rows': rows,
+        'summaryData': {
+            'filteredTotals': totals,
+            'totals': totals,
+            'statistics': {'col-max': [1000.0] * n_metrics, 'col-min': [0.0] * n_metrics}
+        }
+    }
+
+
+class FakeAnalyticsServer:
+    """Local stand-in for the Analytics 2.0 API and the IMS JWT exchange
+
+    Serves /reports with paging and anomaly fields, /segments, /calculatedmetrics, /dimensions,
+    /metrics, /users, /dateranges, /collections/suites, /discovery/me and /ims/exchange/jwt
+    from generated data, so that clients, retries and rate limiting can be exercised offline.
+    Tokens and signatures are not validated. GET responses carry an ETag and are answered with
+    a 304 when If-None-Match matches it.
+
+    Arguments:
+        latency(float, optional): Seconds every response is delayed by, defaults to 0
+        error_rate(float, optional): Share of requests answered with a 500 error, defaults to 0
+        throttle_rate(float, optional): Share of requests answered with a 429, defaults to 0
+        rate_limit(int, optional): Requests allowed per rolling minute before answering 429
+        report_rows(int, optional): Number of items of every report dimension, defaults to 1000
+        items(int, optional): Number of segments, calculated metrics, users and report suites, defaults to 25
+        seed(int, optional): Seed of the generated metric values and injected errors
+        host(str, optional): Interface to bind, defaults to 127.0.0.1
+        port(int, optional): Port to bind, defaults to a free port
+        max_age(int, optional): Cache-Control max-age of the GET responses, none is sent if omitted
+        max_requests(int, optional): Number of the latest (method, path) pairs kept in ``requests``, defaults
+                                     to 10000. 0 turns recording off, None keeps every request
+
+    Example:
+        with FakeAnalyticsServer(latency=0.05, throttle_rate=0.1) as server:
+            auth = JWTAuth(config, endpoint=server.token_endpoint, max_retries=3)
+            analytics = Analytics(auth, base_url=server.base_url)
+    """
+    COMPANY_ID = 'FAKECOMPANY'
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 throttle_rate: float = 0.0,
+                 rate_limit: int = None,
+                 report_rows: int = 1000,
+                 items: int = 25,
+                 seed: int = None,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 max_age: int = None,
+                 max_requests: typing.Optional[int] = 10000) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.report_rows = report_rows
+        self.items = items
+        self.max_age = max_age
+        self.requests = deque(maxlen=max_requests)
+        self._random = random.Random(seed)
+        self._calls = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def base_url(self) -> str:
+        """Counterpart of Analytics.BASE_URL"""
+        return self.url + '/api/{company_id}'
+
+    @property
+    def token_endpoint(self) -> str:
+        """Counterpart of JWTAuth.EXCHANGE_ENDPOINT"""
+        return self.url + '/ims/exchange/jwt'
+
+    def start(self) -> 'FakeAnalyticsServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # Request handling
+
+    def _handler(self) -> typing.Type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, payload, headers = server.handle(method, self.path, body, self.headers)
+                content = json.dumps(payload).encode('utf8') if status != 304 else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        return Handler
+
+    def _throttled(self) -> typing.Optional[float]:
+        """Returns the Retry-After seconds if the request exceeds the rate limit"""
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and self._calls[0] <= now - 60:
+                self._calls.popleft()
+            if self.rate_limit is not None and len(self._calls) >= self.rate_limit:
+                return max(self._calls[0] + 60 - now, 0)
+            self._calls.append(now)
+            throttle = self._random.random() < self.throttle_rate
+            error = self._random.random() < self.error_rate
+        if throttle:
+            return 1.0
+        return -1.0 if error else None
+
+    def handle(self,
+               method: str,
+               raw_path: str,
+               body: bytes,
+               headers: dict = None) -> typing.Tuple[int, typing.Any, dict]:
+        """Returns status, json payload and extra headers of a request"""
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.requests.append((method, path))
+        if self.latency:
+            time.sleep(self.latency)
+        if path == '/ims/exchange/jwt':
+            return 200, {'token_type': 'bearer', 'access_token': 'fake_token', 'expires_in': 86399000}, {}
+        throttled = self._throttled()
+        if throttled is not None and throttled >= 0:
+            return 429, {'error_code': '429050', 'message': 'Too many requests'}, {'Retry-After': f'{throttled:.3f}'}
+        if throttled is not None:
+            return 500, self._error('internal_error', 'Injected error'), {}
+        if path == '/discovery/me':
+            return 200, {'imsOrgs': [{'imsOrgId': 'XYZ@AdobeOrg', 'companies': [
+                {'globalCompanyId': self.COMPANY_ID, 'companyName': 'Fake Company'}]}]}, {}
+        match = re.match(r'^/api/[^/]+(/.*)$', path)
+        if not match:
+            return 404, self._error('not_found', path), {}
+        resource = match.group(1)
+        if method == 'POST' and resource == '/reports':
+            return 200, report_page(json.loads(body or b'{}'), self.report_rows), {}
+        if method != 'GET':
+            return 200, json.loads(body or b'{}'), {}
+        status, payload, extra = self._resource(resource, params)
+        if status != 200:
+            return status, payload, extra
+        extra['ETag'] = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf8')).hexdigest() + '"'
+        if self.max_age is not None:
+            extra['Cache-Control'] = f'max-age={self.max_age}'
+        if (headers or {}).get('If-None-Match') == extra['ETag']:
+            return 304, None, extra
+        return status, payload, extra
+
+    def _error(self, code: str, description: str) -> dict:
+        return {'errorCode': code, 'errorId': 'fake', 'errorDescription': description}
+
+    def _resource(self, resource: str, params: dict) -> typing.Tuple[int, typing.Any, dict]:
+        collections = {
+            '/segments': lambda i: {'id': f's{self.COMPANY_ID}_{i:08d}', 'name': f'Segment {i}',
+                                    'rsid': 'fakersid', 'definition': {}},
+            '/calculatedmetrics': lambda i: {'id': f'cm{i}_{i:08d}', 'name': f'Calculated metric {i}',
+                                             'rsid': 'fakersid', 'definition': {}},
+            '/users': lambda i: {'login': f'user{i}', 'email': f'user{i}@example.com', 'fullName': f'User {i}'},
+            '/collections/suites': lambda i: {'rsid': f'fakersid{i}' if i else 'fakersid',
+                                              'name': f'Fake report suite {i}', 'timezoneZoneinfo': 'US/Pacific',
+                                              'currency': 'USD'},
+            '/dateranges': lambda i: {'id': f'dr{i}', 'name': f'Date range {i}'}
+        }
+        if resource in collections:
+            return 200, self._page([collections[resource](i) for i in range(self.items)], params), {}
+        if resource == '/dimensions':
+            return 200, [{'id': f'variables/{name}', 'name': name, 'type': kind, 'category': 'Traffic',
+                          'parent': '', 'pathable': False, 'description': name}
+                         for name, kind in (('daterangeday', 'time'), ('daterangeweek', 'time'),
+                                            ('daterangemonth', 'time'), ('page', 'string'),
+                                            ('evar1', 'string'), ('browser', 'enum'))], {}
+        if resource == '/metrics':
+            return 200, [{'id': f'metrics/{name}', 'name': name, 'type': kind, 'precision': precision,
+                          'category': 'Traffic', 'dataGroup': 'Traffic', 'segmentable': True}
+                         for name, kind, precision in (('visits', 'int', 0), ('pageviews', 'int', 0),
+                                                       ('orders', 'int', 0), ('revenue', 'currency', 2),
+                                                       ('visitors', 'int', 0), ('bouncerate', 'percent', 2))], {}
+        if resource == '/users/me':
+            return 200, {'login': 'me', 'email': 'me@example.com'}, {}
+        for prefix in ('/segments/', '/calculatedmetrics/', '/collections/suites/', '/dimensions/',
+                       '/metrics/', '/dateranges/'):
+            if resource.startswith(prefix):
+                item_id = resource[len(prefix):]
+                item = {'id': item_id, 'name': item_id}
+                if prefix == '/collections/suites/':
+                    item = {'rsid': item_id, 'name': item_id, 'timezoneZoneinfo': 'US/Pacific', 'currency': 'USD'}
+                return 200, item, {}
+        return 404, self._error('not_found', resource), {}
+
+    def _page(self, content: list, params: dict) -> dict:
+        limit = max(int(params.get('limit', 10) or 10), 1)
+        page = int(params.get('page', 0) or 0)
+        total_pages = max((len(content) + limit - 1) // limit, 1)
+        chunk = content[page * limit:(page + 1) * limit]
+        return {
+            'content': chunk,
+            'totalElements': len(content),
+            'totalPages': total_pages,
+            'numberOfElements': len(chunk),
+            'number': page,
+            'firstPage': page == 0,
+            'lastPage': page >= total_pages - 1,
+            'sort': None
+        }
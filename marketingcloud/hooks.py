@@ -0,0 +1,89 @@
+import typing
+import json
+from urllib.parse import urlparse
+
+
+class UnknownEventError(Exception):
+    """Raised if a callback is registered for an event that is never emitted"""
+    pass
+
+
+class Hooks:
+    """Registry of lifecycle callbacks for outgoing API calls
+
+    Callbacks are registered per event name and invoked synchronously with a single
+    dict argument describing the call. The following events are emitted:
+
+        request_start  : before the request is sent
+        request_end    : after a response has been received
+        retry          : before a failed request is sent again
+        token_refresh  : after a new access token has been retrieved
+
+    Request events carry the keys ``event``, ``endpoint``, ``method``, ``page`` and
+    ``request_bytes``. ``request_end`` additionally carries ``status``, ``latency``
+    (seconds) and ``response_bytes``, ``retry`` carries ``status``, ``attempt`` and
+    ``wait``. ``token_refresh`` carries ``latency`` and ``expires_in``.
+
+    Example:
+        def to_apm(event):
+            apm.record(event['endpoint'], event['latency'])
+
+        client.session.hooks.register('request_end', to_apm)
+    """
+    EVENTS = ('request_start', 'request_end', 'retry', 'token_refresh')
+
+    def __init__(self) -> None:
+        self._callbacks = {event: [] for event in self.EVENTS}
+
+    def register(self, event: str, callback: typing.Callable[[dict], None]) -> None:
+        if event not in self._callbacks:
+            raise UnknownEventError(event)
+        self._callbacks[event].append(callback)
+
+    def unregister(self, event: str, callback: typing.Callable[[dict], None]) -> None:
+        if event not in self._callbacks:
+            raise UnknownEventError(event)
+        if callback in self._callbacks[event]:
+            self._callbacks[event].remove(callback)
+
+    def emit(self, event: str, **info) -> None:
+        """Invokes every callback registered for ``event`` with the event description"""
+        callbacks = self._callbacks.get(event)
+        if not callbacks:
+            return
+        info['event'] = event
+        for callback in list(callbacks):
+            callback(info)
+
+
+def endpoint_path(url: str) -> str:
+    """Returns the path component of an url, ie /api/XYZ/reports"""
+    return urlparse(url).path or url
+
+
+def page_number(params: typing.Optional[dict] = None,
+                payload: typing.Any = None) -> typing.Optional[int]:
+    """Extracts the requested page number from query parameters or a /reports payload"""
+    if isinstance(payload, (str, bytes)):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            payload = None
+    if isinstance(payload, dict):
+        page = payload.get('settings', {}).get('page', payload.get('page'))
+        if page is not None:
+            return int(page)
+    if isinstance(params, dict) and params.get('page') is not None:
+        return int(params['page'])
+    return None
+
+
+def body_size(body: typing.Any) -> int:
+    """Returns the byte size of a request body as it would be sent over the wire"""
+    if body is None:
+        return 0
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf8'))
+    return len(json.dumps(body).encode('utf8'))
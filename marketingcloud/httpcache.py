@@ -0,0 +1,124 @@
+import re
+import time
+import typing
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from . import metrics
+
+# endpoints whose responses rarely change, relative to the company url
+METADATA_PATHS = (r'/dimensions(/[^/]+)?', r'/metrics(/[^/]+)?', r'/dateranges(/[^/]+)?',
+                  r'/collections/suites(/[^/]+)?', r'/calculatedmetrics/functions(/[^/]+)?')
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class _Entry:
+    def __init__(self, response: typing.Any, expires: float) -> None:
+        self.response = response
+        self.expires = expires
+        headers = getattr(response, 'headers', None) or {}
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+
+
+def max_age(headers: typing.Mapping[str, str]) -> typing.Optional[float]:
+    """Seconds a response stays fresh according to its Cache-Control header, None if it must not be stored"""
+    cache_control = (headers or {}).get('Cache-Control', '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0.0
+    match = _MAX_AGE.search(cache_control)
+    return float(match.group(1)) if match else 0.0
+
+
+class HTTPCache:
+    """Conditional request cache of the GET responses of the metadata endpoints
+
+    Responses with status 200 are stored with their validators (ETag, Last-Modified) and
+    Cache-Control max-age. A stored response is served without any request while it is fresh;
+    afterwards the request carries If-None-Match / If-Modified-Since and a 304 answer serves the
+    stored response again. Responses without validator nor max-age are not stored. Lookups are
+    recorded as metrics.observe_cache('http', hit), 304 answers count as hits.
+
+    Arguments:
+        paths(Sequence[str], optional): Regular expressions of the cached endpoint paths, matched
+                                        against the end of the url path, defaults to METADATA_PATHS
+        max_entries(int, optional): Number of responses kept, least recently used first out, defaults to 512
+        clock(callable, optional): Time source in seconds, defaults to time.monotonic
+    """
+
+    def __init__(self,
+                 paths: typing.Sequence[str] = METADATA_PATHS,
+                 max_entries: int = 512,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        self._paths = re.compile(r'(' + '|'.join(paths) + r')/?$')
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, url: str) -> bool:
+        return self._paths.search(urlparse(url).path) is not None
+
+    def _get(self, key: str) -> typing.Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, response: typing.Any) -> None:
+        age = max_age(getattr(response, 'headers', None))
+        entry = _Entry(response, self.clock() + (age or 0.0)) if age is not None else None
+        with self._lock:
+            if entry is None or not (entry.etag or entry.last_modified or age):
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fetch(self,
+              key: str,
+              url: str,
+              send: typing.Callable[[dict], typing.Any],
+              headers: dict = None) -> typing.Any:
+        """Returns the response of a GET request, from the cache when possible
+
+        Arguments:
+            key(str): key of the request, see singleflight.request_key
+            url(str): url of the request, only the urls matching the cached paths are cached
+            send(callable): sends the request with the headers it is given and returns the response
+            headers(dict, optional): headers of the request
+        """
+        if not self.cacheable(url):
+            return send(headers)
+        entry = self._get(key)
+        if entry is not None and self.clock() < entry.expires:
+            metrics.observe_cache('http', True)
+            return entry.response
+        conditional = dict(headers or {})
+        if entry is not None and entry.etag:
+            conditional['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            conditional['If-Modified-Since'] = entry.last_modified
+        response = send(conditional or headers)
+        metrics.observe_cache('http', entry is not None and response.status_code == 304)
+        if entry is not None and response.status_code == 304:
+            age = max_age(getattr(response, 'headers', None))
+            with self._lock:
+                entry.expires = self.clock() + (age or 0.0)
+            return entry.response
+        if response.status_code == 200:
+            self._store(key, response)
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
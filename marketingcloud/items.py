@@ -0,0 +1,101 @@
+import typing
+import threading
+
+from .dtypes import StringPool
+
+
+class ItemDictionary:
+    """itemId <-> display value of the dimension items seen in report pages, per report suite and dimension
+
+    Reports and aanalytics2 clients given a dictionary record the items of every /reports page they
+    receive, so that breakdowns and filters can resolve an itemId from a value, or the reverse,
+    without extra requests. Display values are interned in a dtypes.StringPool shared by every
+    report suite and dimension: a value seen in many reports is stored once. Several items may
+    share a display value, every lookup by value returns all of them.
+
+    Arguments:
+        pool(StringPool, optional): intern table of the display values, a new one is created if omitted.
+                                    Passing the pool of categorical reports shares their categories
+    """
+
+    def __init__(self, pool: StringPool = None) -> None:
+        self.pool = pool if pool is not None else StringPool()
+        self._codes = {}
+        # display value -> itemIds in the order they took the value, the keys are the interned values
+        self._item_ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of items recorded"""
+        return sum(len(codes) for codes in self._codes.values())
+
+    def __contains__(self, key: typing.Tuple[str, str, str]) -> bool:
+        rsid, dimension, item_id = key
+        return item_id in self._codes.get((rsid, dimension), {})
+
+    def record(self,
+               rsid: str,
+               dimension: str,
+               item_ids: typing.Sequence[str],
+               values: typing.Sequence[str]) -> None:
+        """Records the display value of every itemId, a known itemId takes the latest value"""
+        codes = self.pool.encode(values).tolist()
+        categories = self.pool.categories
+        with self._lock:
+            known = self._codes.setdefault((rsid, dimension), {})
+            index = self._item_ids.setdefault((rsid, dimension), {})
+            for item_id, code in zip(item_ids, codes):
+                previous = known.get(item_id)
+                if previous == code:
+                    continue
+                if previous is not None:
+                    del index[categories[previous]][item_id]
+                known[item_id] = code
+                index.setdefault(categories[code], {})[item_id] = None
+
+    def record_page(self, payload: dict, page: dict) -> None:
+        """Records the rows of a /reports page, pages without rows or itemIds are ignored"""
+        rows = page.get('rows')
+        if not rows or 'itemId' not in rows[0] or 'rsid' not in payload:
+            return
+        dimension = page.get('columns', {}).get('dimension', {}).get('id') or payload.get('dimension')
+        self.record(payload['rsid'], dimension, [row['itemId'] for row in rows], [row['value'] for row in rows])
+
+    def value(self, rsid: str, dimension: str, item_id: str, default: str = None) -> typing.Optional[str]:
+        """Display value of an itemId, ``default`` if it was never seen"""
+        code = self._codes.get((rsid, dimension), {}).get(item_id)
+        return self.pool.categories[code] if code is not None else default
+
+    def values(self, rsid: str, dimension: str, item_ids: typing.Iterable[str]) -> typing.List[typing.Optional[str]]:
+        """Display values of itemIds, None for the ones never seen"""
+        codes = self._codes.get((rsid, dimension), {})
+        categories = self.pool.categories
+        return [categories[codes[item_id]] if item_id in codes else None for item_id in item_ids]
+
+    def item_ids(self, rsid: str, dimension: str, value: str) -> typing.List[str]:
+        """ItemIds displayed as ``value``, in the order they were first seen with it"""
+        with self._lock:
+            return list(self._item_ids.get((rsid, dimension), {}).get(value, ()))
+
+    def items(self, rsid: str, dimension: str) -> typing.Dict[str, str]:
+        """Every itemId recorded for the dimension of the report suite with its display value"""
+        with self._lock:
+            codes = dict(self._codes.get((rsid, dimension), {}))
+        categories = self.pool.categories
+        return {item_id: categories[code] for item_id, code in codes.items()}
+
+    def breakdown_filters(self, rsid: str, dimension: str, value: str) -> typing.List[dict]:
+        """metricFilters of type breakdown selecting the items displayed as ``value``
+
+        Raises:
+            KeyError: if no item of the dimension was seen with this value
+        """
+        item_ids = self.item_ids(rsid, dimension, value)
+        if not item_ids:
+            raise KeyError(f'{value} of {dimension} in {rsid}')
+        return [{'type': 'breakdown', 'dimension': dimension, 'itemId': item_id} for item_id in item_ids]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._codes.clear()
+            self._item_ids.clear()
@@ -3,10 +3,19 @@ import datetime
 import json
 import jwt
 import re
+import time
+import threading
 import requests
 from requests.auth import AuthBase
 from requests import Response
 
+from .hooks import Hooks, endpoint_path, page_number, body_size
+from . import metrics
+from .quota import QuotaTracker, QUOTAS, current_priority
+from .transport import Transport, RequestsTransport, keyword_arguments
+from .singleflight import SingleFlight, request_key
+from .httpcache import HTTPCache
+
 
 class BearerAuth(AuthBase):
     def __init__(self, token):
@@ -40,7 +49,7 @@ class JWTAuth:
     """Implementation of the JWT Service Account Flow
 
     Arguments:
-        config(Union[str, typing.TextIO])     : Path of file descriptor to the config file.
+        config(Union[str, typing.TextIO, dict]): Path of file descriptor to the config file or the config itself.
                                                 A full description on how to create this file is available
                                                 below. The config file needs to be in a valid json
                                                 format. The constructor will throw an error otherwise.
@@ -67,16 +76,50 @@ class JWTAuth:
         -------------------------------------------------------------
 
         endpoint(str, optional): JWT exchange endpoint, defaults to EXCHANGE_ENDPOINT
+        max_retries(int, optional): Number of times a request is sent again if the API answers
+                                    with one of RETRY_STATUS, defaults to 0
+        hooks(Hooks, optional): Lifecycle hooks registry, a new registry feeding metrics.REGISTRY
+                                is created if omitted
+        quota(QuotaTracker, optional): Tracker every API call is accounted against, under the companyId
+                                       and under the clientId of the integration. Defaults to the
+                                       process wide QUOTAS shared with aanalytics2
+        priority(str, optional): 'high' lets the calls of this client use the reserved share of the
+                                 company budget, defaults to 'normal'. Overridden for the calls of
+                                 a thread by quota.call_priority
+        transport(Transport, optional): HTTP transport of the API calls, defaults to a RequestsTransport.
+                                        Use transport.HTTP2Transport to multiplex concurrent calls. The
+                                        credentials are sent with every request, so a transport can be
+                                        shared by several JWTAuth
+        coalesce(bool, optional): Identical GET requests sent by several threads at the same moment share
+                                  a single call, see singleflight.SingleFlight. Defaults to True
+        cache(Union[HTTPCache, bool], optional): Conditional request cache of the GET responses of the
+                                                 metadata endpoints, see httpcache.HTTPCache. True creates
+                                                 one for this client, False disables it. Defaults to True
     """
     EXCHANGE_ENDPOINT = "https://ims-na1.adobelogin.com/ims/exchange/jwt"
     REQUIRED_FIELDS = 'iss sub aud privateKeyPath clientSecret companyId'.split(' ')
+    RETRY_STATUS = (429, 500, 502, 503, 504)
 
     def __init__(self,
-                 config: typing.Union[str, typing.TextIO],
-                 endpoint: str = EXCHANGE_ENDPOINT) -> None:
-        self.session: requests.Session = None
+                 config: typing.Union[str, typing.TextIO, dict],
+                 endpoint: str = EXCHANGE_ENDPOINT,
+                 max_retries: int = 0,
+                 hooks: Hooks = None,
+                 quota: QuotaTracker = QUOTAS,
+                 priority: str = 'normal',
+                 transport: Transport = None,
+                 coalesce: bool = True,
+                 cache: typing.Union[HTTPCache, bool] = True) -> None:
+        self.transport = transport if transport is not None else RequestsTransport()
         self.metascopes = {}
         self.endpoint = endpoint
+        self.max_retries = max_retries
+        self.hooks = hooks if hooks is not None else metrics.instrument(Hooks())
+        self.quota = quota
+        self.priority = priority
+        self.single_flight = SingleFlight() if coalesce else None
+        self.cache = HTTPCache() if cache is True else None if cache is False else cache
+        self._token_lock = threading.Lock()
         self.config = self._get_info(config)
         if not all([k in self.config for k in self.REQUIRED_FIELDS]):
             raise ConfigInsufficientInformationError(
@@ -90,8 +133,10 @@ class JWTAuth:
             if re.match("^https:", key):
                 self.metascopes[key] = True
 
-    def _get_info(self, data: typing.Union[str, typing.TextIO]) -> dict:
+    def _get_info(self, data: typing.Union[str, typing.TextIO, dict]) -> dict:
         """This method either parses a string to dict or reads a file an does the same"""
+        if isinstance(data, dict):
+            return dict(data)
         dict_data = {}
         try:
             dict_data = data.read()
@@ -151,26 +196,163 @@ class JWTAuth:
         This method serves as a proxy request for the final API method call. If the access_token
         expires, this method will automatically refresh the token and execute the API request
         for the original caller. Both positional parameters ``method`` and ``url`` are required as
-        ``method`` will retrieve the method call from the underlying requests session and ``url``
+        ``method`` selects the HTTP method of the underlying transport and ``url``
         is a required parameter for all requests calls.
-        *args and **kwargs will be passed to the underlying requests method
+        *args are the positional arguments of the requests.Session method (params for get, data and
+        json for post), they and **kwargs will be passed to the underlying transport request method
+        Every attempt emits ``request_start`` and ``request_end`` on ``self.hooks``, answers with a
+        RETRY_STATUS are sent again up to ``max_retries`` times and emit ``retry``.
+        Each attempt is accounted against the company budget of ``self.quota`` first, which may
+        block or raise quota.QuotaExceededError depending on the budget policy.
+        Concurrent identical GET requests share one call and receive the same Response. GET responses
+        of the metadata endpoints are served by ``self.cache`` while fresh, then revalidated.
 
         Arguments:
-            method(str): HTTP method for the API Call. Method will retrieve the underlying
-                         requests library method for this query
+            method(str): HTTP method for the API Call, one of Transport.METHODS
             url(str)   : Required url parameter for requests http requests
 
         Returns:
-            (Response) Response from the underlying requests method call
+            (Response) Response from the underlying transport
         """
-        if not getattr(self, 'token_expiration', None) or \
-                getattr(self, 'token_expiration') < datetime.datetime.utcnow():
-            refresh_token = self.get_token()
-            setattr(self, 'token_expiration', datetime.datetime.utcnow() +
-                    datetime.timedelta(milliseconds=refresh_token['expires_in']))
-            self.session = requests.Session()
-            self.session.headers.update(self._http_header(refresh_token['access_token']))
-        func = getattr(self.session, method, None)
-        if not func:
+        if method.lower() not in self.transport.METHODS:
             raise InvalidMethodInvocation()
-        return func(url.format(company_id=self.config['companyId']), *args, **kwargs)
+        kwargs = keyword_arguments(method, args, kwargs)
+        if method.lower() != 'get':
+            return self._request(method, url, **kwargs)
+        # keyed on the company url, caches and single flights may be shared by clients of several companies
+        url = url.format(company_id=self.config['companyId'])
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('headers'))
+        if self.single_flight is not None:
+            return self.single_flight.do(key, lambda: self._get(key, url, **kwargs))
+        return self._get(key, url, **kwargs)
+
+    def _get(self, key: str, url: str, **kwargs) -> Response:
+        if self.cache is None:
+            return self._request('get', url, **kwargs)
+        return self.cache.fetch(key, url, lambda headers: self._request('get', url, **dict(kwargs, headers=headers)),
+                                kwargs.get('headers'))
+
+    def _token_expired(self) -> bool:
+        return not getattr(self, 'token_expiration', None) or \
+            getattr(self, 'token_expiration') < datetime.datetime.utcnow()
+
+    def _request(self, method: str, url: str, **kwargs) -> Response:
+        if self._token_expired():
+            # concurrent requests of the same client refresh the token once
+            with self._token_lock:
+                if self._token_expired():
+                    started = time.perf_counter()
+                    refresh_token = self.get_token()
+                    setattr(self, 'token_expiration', datetime.datetime.utcnow() +
+                            datetime.timedelta(milliseconds=refresh_token['expires_in']))
+                    # sent with every request, the transport may be shared by clients of other credentials
+                    self._headers = self._http_header(refresh_token['access_token'])
+                    self.hooks.emit('token_refresh',
+                                    latency=time.perf_counter() - started,
+                                    expires_in=refresh_token['expires_in'])
+        url = url.format(company_id=self.config['companyId'])
+        kwargs['headers'] = dict(self._headers, **(kwargs.get('headers') or {}))
+        info = {
+            'endpoint': endpoint_path(url),
+            'method': method.upper(),
+            'page': page_number(kwargs.get('params'), kwargs.get('json', kwargs.get('data'))),
+            'request_bytes': body_size(kwargs.get('json', kwargs.get('data')))
+        }
+        attempt = 0
+        priority = current_priority(self.priority)
+        while True:
+            self.quota.acquire(self.config['companyId'], self.config['clientId'], priority=priority)
+            self.hooks.emit('request_start', **info)
+            started = time.perf_counter()
+            response = self.transport.request(method, url, **kwargs)
+            self.hooks.emit('request_end',
+                            status=response.status_code,
+                            latency=time.perf_counter() - started,
+                            response_bytes=len(getattr(response, 'content', None) or b''),
+                            **info)
+            if response.status_code not in self.RETRY_STATUS or attempt >= self.max_retries:
+                return response
+            attempt += 1
+            wait = self._retry_wait(response, attempt)
+            self.hooks.emit('retry', status=response.status_code, attempt=attempt, wait=wait, **info)
+            time.sleep(wait)
+
+    def _retry_wait(self, response: Response, attempt: int) -> float:
+        """Returns the seconds to wait before retrying, honouring a Retry-After header"""
+        retry_after = getattr(response, 'headers', {}).get('Retry-After')
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return float(2 ** (attempt - 1))
+
+
+class JWTAuthPool:
+    """Spreads the API calls of one company over several service accounts
+
+    Every credential keeps its own JWTAuth, hence its own transport, token and retry settings.
+    Each call is given to the credential with the fewest calls in flight among those that still
+    have quota left for their clientId and companyId in ``quota``. Per integration limits are set
+    with ``quota.set_budget(clientId, Budget(...))``. A pool can be passed anywhere Analytics or
+    Reports take a ``config``.
+
+    Arguments:
+        configs(Sequence[Union[str, typing.TextIO, dict]]): Config files or credential dicts, see JWTAuth
+        endpoint(str, optional): JWT exchange endpoint, defaults to JWTAuth.EXCHANGE_ENDPOINT
+        transport_factory(callable, optional): Called once per credential to create its transport,
+                                               ie transport.HTTP2Transport, defaults to a RequestsTransport
+        **kwargs: Passed to every JWTAuth, ie max_retries, quota or priority. Identical GET requests
+                  are coalesced by the pool unless coalesce=False, and the members share one HTTPCache
+                  unless cache=False. A single transport can't be passed, see transport_factory
+    """
+
+    def __init__(self,
+                 configs: typing.Sequence[typing.Union[str, typing.TextIO, dict]],
+                 endpoint: str = JWTAuth.EXCHANGE_ENDPOINT,
+                 transport_factory: typing.Callable[[], Transport] = RequestsTransport,
+                 **kwargs) -> None:
+        if not configs:
+            raise ConfigInsufficientInformationError('at least one config is required')
+        if 'transport' in kwargs:
+            raise TypeError('every credential of a JWTAuthPool keeps its own transport, pass transport_factory')
+        self.single_flight = SingleFlight() if kwargs.pop('coalesce', True) else None
+        if kwargs.get('cache', True) is True:
+            kwargs['cache'] = HTTPCache()
+        self.members = [JWTAuth(config, endpoint, coalesce=False, transport=transport_factory(), **kwargs)
+                        for config in configs]
+        self._in_flight = [0] * len(self.members)
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> dict:
+        """Config of the first credential, all credentials are expected to share the companyId"""
+        return self.members[0].config
+
+    def _acquire_member(self) -> int:
+        with self._lock:
+            def load(index):
+                member = self.members[index]
+                priority = current_priority(member.priority)
+                exhausted = min(member.quota.remaining(member.config['clientId'], priority),
+                                member.quota.remaining(member.config['companyId'], priority)) <= 0
+                usage = member.quota.usage(member.config['clientId'])['minute']
+                return exhausted, self._in_flight[index], usage
+            index = min(range(len(self.members)), key=load)
+            self._in_flight[index] += 1
+            return index
+
+    def request(self, method: str, url: str, *args, **kwargs) -> Response:
+        """Sends the request with the least loaded credential, see JWTAuth.request"""
+        kwargs = keyword_arguments(method, args, kwargs)
+        if method.lower() == 'get' and self.single_flight is not None:
+            url = url.format(company_id=self.config['companyId'])
+            key = request_key(method, url, kwargs.get('params'), kwargs.get('headers'))
+            return self.single_flight.do(key, lambda: self._request(method, url, **kwargs))
+        return self._request(method, url, **kwargs)
+
+    def _request(self, method: str, url: str, **kwargs) -> Response:
+        index = self._acquire_member()
+        try:
+            return self.members[index].request(method, url, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight[index] -= 1
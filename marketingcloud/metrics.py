@@ -0,0 +1,207 @@
+import bisect
+import typing
+import threading
+
+from .hooks import Hooks
+
+
+class Counter:
+    """Monotonic counter family, one value per label set"""
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: typing.Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(label, '')) for label in self.labels), 0)
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, dict, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}_total', dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    """Histogram family with cumulative buckets, one histogram per label set"""
+    type = 'histogram'
+    DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labels: typing.Sequence[str] = (),
+                 buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(tuple(str(labels.get(label, '')) for label in self.labels), ([], 0))
+        return sum(counts)
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, dict, float]]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                yield f'{self.name}_bucket', {**labels, 'le': le}, cumulative
+            yield f'{self.name}_count', labels, cumulative
+            yield f'{self.name}_sum', labels, total
+
+
+class MetricsRegistry:
+    """In-process collection of metric families that can be rendered as OpenMetrics text"""
+
+    def __init__(self) -> None:
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labels, **kwargs):
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = cls(name, documentation, labels, **kwargs)
+            family = self._families[name]
+        if not isinstance(family, cls):
+            raise TypeError(f'{name} is already registered as {family.type}')
+        return family
+
+    def counter(self, name: str, documentation: str = '', labels: typing.Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def histogram(self,
+                  name: str,
+                  documentation: str = '',
+                  labels: typing.Sequence[str] = (),
+                  buckets: typing.Sequence[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets=buckets)
+
+    def families(self) -> typing.List[typing.Union[Counter, Histogram]]:
+        with self._lock:
+            return [self._families[name] for name in sorted(self._families)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._families = {}
+
+
+REGISTRY = MetricsRegistry()
+
+# ids in the API are either numeric, prefixed (s123_5aec40c4..., cm1214_5aec...) or report suite ids
+_STATIC_SEGMENTS = {'api', 'collections', 'suites', 'calculatedmetrics', 'functions', 'validate',
+                    'dateranges', 'dimensions', 'metrics', 'reports', 'ranked', 'segments', 'users',
+                    'me', 'discovery', 'ims', 'exchange', 'jwt', 'topItems'}
+
+
+def endpoint_template(path: str) -> str:
+    """Collapses ids in an API path into placeholders so that latencies can be aggregated
+
+    Example:
+        /api/XYZ/segments/s1234_5aec40c4373fa864abcbe786  ->  /segments/{id}
+    """
+    parts = [part for part in path.split('?')[0].split('/') if part]
+    if len(parts) >= 2 and parts[0] == 'api':
+        parts = parts[2:]
+    return '/' + '/'.join(part if part in _STATIC_SEGMENTS else '{id}' for part in parts)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+def render_openmetrics(registry: MetricsRegistry = REGISTRY) -> str:
+    """Renders every family of the registry in the OpenMetrics text exposition format
+    This output can be served as-is with the content type
+    ``application/openmetrics-text; version=1.0.0; charset=utf-8``
+    """
+    lines = []
+    for family in registry.families():
+        lines.append(f'# TYPE {family.name} {family.type}')
+        if family.documentation:
+            lines.append(f'# HELP {family.name} {_escape(family.documentation)}')
+        for name, labels, value in family.samples():
+            if labels:
+                label_str = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_str}}} {_format_value(value)}')
+            else:
+                lines.append(f'{name} {_format_value(value)}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def observe_rows(count: int, source: str, registry: MetricsRegistry = REGISTRY) -> None:
+    """Records the number of report rows decoded by ``source``"""
+    registry.counter('adobe_rows_decoded', 'Report rows decoded', ('source',)).inc(count, source=source)
+
+
+def observe_cache(cache: str, hit: bool, registry: MetricsRegistry = REGISTRY) -> None:
+    """Records a cache lookup, hit ratio is hits / (hits + misses) per cache"""
+    registry.counter('adobe_cache_lookups', 'Cache lookups by result', ('cache', 'result')) \
+        .inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def cache_hit_ratio(cache: str, registry: MetricsRegistry = REGISTRY) -> float:
+    lookups = registry.counter('adobe_cache_lookups', 'Cache lookups by result', ('cache', 'result'))
+    hits, misses = lookups.value(cache=cache, result='hit'), lookups.value(cache=cache, result='miss')
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+def instrument(hooks: Hooks, registry: MetricsRegistry = REGISTRY) -> Hooks:
+    """Registers callbacks on ``hooks`` that feed the request metrics of ``registry``"""
+    requests_total = registry.counter('adobe_requests', 'API requests by endpoint template and status',
+                                      ('endpoint', 'method', 'status'))
+    latency = registry.histogram('adobe_request_duration_seconds', 'API request latency',
+                                 ('endpoint', 'method'))
+    pages = registry.counter('adobe_pages_fetched', 'Paged responses fetched', ('endpoint',))
+    rate_limited = registry.counter('adobe_rate_limited', 'Responses with status 429', ('endpoint',))
+    retries = registry.counter('adobe_retries', 'Retried requests', ('endpoint', 'status'))
+    refreshes = registry.counter('adobe_token_refreshes', 'Access token refreshes')
+
+    def on_request_end(event):
+        endpoint = endpoint_template(event['endpoint'])
+        requests_total.inc(endpoint=endpoint, method=event['method'], status=event['status'])
+        latency.observe(event['latency'], endpoint=endpoint, method=event['method'])
+        if event.get('page') is not None:
+            pages.inc(endpoint=endpoint)
+        if event['status'] == 429:
+            rate_limited.inc(endpoint=endpoint)
+
+    def on_retry(event):
+        retries.inc(endpoint=endpoint_template(event['endpoint']), status=event['status'])
+
+    def on_token_refresh(event):
+        refreshes.inc()
+
+    hooks.register('request_end', on_request_end)
+    hooks.register('retry', on_retry)
+    hooks.register('token_refresh', on_token_refresh)
+    return hooks
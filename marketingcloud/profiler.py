@@ -0,0 +1,85 @@
+import time
+import typing
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Collects wall time and memory per phase of a report extraction
+
+    Phases are measured with ``time.perf_counter`` and ``tracemalloc``. Tracing is started
+    on the first phase if it is not already running and stopped again by ``stop``.
+    A disabled profiler turns ``phase`` into a no-op so it can be passed around unconditionally.
+
+    Arguments:
+        enabled(bool, optional): Set to False to skip all measurements, defaults to True
+    """
+    PHASES = ('request', 'decode', 'accumulate', 'frame', 'save')
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.records = []
+        self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name: str, page: typing.Optional[int] = None) -> typing.Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        memory_start, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            memory_end, memory_peak = tracemalloc.get_traced_memory()
+            self.records.append({
+                'phase': name,
+                'page': page,
+                'time': elapsed,
+                'memory_delta': memory_end - memory_start,
+                'memory_peak': max(memory_peak - memory_start, 0)
+            })
+
+    def stop(self) -> None:
+        """Stops tracemalloc if it was started by this profiler"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self) -> dict:
+        """Returns the per page and aggregated breakdown
+
+        Returns:
+            (dict) {
+                'pages': {page: {phase: {'time', 'memory_delta', 'memory_peak'}}},
+                'total': {phase: {'time', 'memory_delta', 'memory_peak', 'calls'}}
+            }
+            time is expressed in seconds, memory in bytes. Phases that are not bound
+            to a page (ie frame build) only appear in 'total'.
+        """
+        pages, total = {}, {}
+        for record in self.records:
+            stats = {key: record[key] for key in ('time', 'memory_delta', 'memory_peak')}
+            if record['page'] is not None:
+                page = pages.setdefault(record['page'], {})
+                if record['phase'] in page:
+                    page[record['phase']] = {
+                        'time': page[record['phase']]['time'] + stats['time'],
+                        'memory_delta': page[record['phase']]['memory_delta'] + stats['memory_delta'],
+                        'memory_peak': max(page[record['phase']]['memory_peak'], stats['memory_peak'])
+                    }
+                else:
+                    page[record['phase']] = stats
+            aggregate = total.setdefault(record['phase'],
+                                         {'time': 0.0, 'memory_delta': 0, 'memory_peak': 0, 'calls': 0})
+            aggregate['time'] += stats['time']
+            aggregate['memory_delta'] += stats['memory_delta']
+            aggregate['memory_peak'] = max(aggregate['memory_peak'], stats['memory_peak'])
+            aggregate['calls'] += 1
+        return {'pages': pages, 'total': total}
@@ -0,0 +1,186 @@
+import time
+import typing
+import threading
+import contextlib
+from bisect import bisect_right
+from collections import deque
+
+_local = threading.local()
+
+
+class QuotaExceededError(Exception):
+    """Raised if a call would exceed the request budget of a company"""
+    def __init__(self, company_id, window, limit):
+        self.company_id = company_id
+        self.window = window
+        self.limit = limit
+
+    def __str__(self):
+        return f'Request budget of {self.limit} per {self.window} exhausted for company {self.company_id}'
+
+
+class Budget:
+    """Request budget of a company id
+
+    Arguments:
+        per_minute(int, optional): Maximum number of requests in any rolling 60 seconds
+        per_day(int, optional)   : Maximum number of requests in any rolling 24 hours
+        policy(str, optional)    : 'queue' blocks the caller until the budget allows the call,
+                                   'reject' raises QuotaExceededError. Defaults to 'queue'
+        timeout(float, optional) : Maximum seconds a queued call waits before QuotaExceededError
+                                   is raised. Waits indefinitely if omitted
+        reserved(int, optional)  : Share of each window only available to priority 'high' calls,
+                                   so that background extractions can't starve interactive use
+    """
+    POLICIES = ('queue', 'reject')
+
+    def __init__(self,
+                 per_minute: int = None,
+                 per_day: int = None,
+                 policy: str = 'queue',
+                 timeout: float = None,
+                 reserved: int = 0) -> None:
+        if policy not in self.POLICIES:
+            raise ValueError(f'policy must be one of {self.POLICIES}')
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.policy = policy
+        self.timeout = timeout
+        self.reserved = reserved
+
+    def limits(self, priority: str) -> typing.List[typing.Tuple[str, float, int]]:
+        reserved = 0 if priority == 'high' else self.reserved
+        limits = []
+        if self.per_minute is not None:
+            limits.append(('minute', 60.0, max(self.per_minute - reserved, 0)))
+        if self.per_day is not None:
+            limits.append(('day', 86400.0, max(self.per_day - reserved, 0)))
+        return limits
+
+
+class QuotaTracker:
+    """Tracks requests per rolling minute and day for every company id and enforces budgets
+
+    A single tracker (QUOTAS) is shared by Analytics and aanalytics2 so that every call made
+    with the same company id, whatever the module, is accounted against the same budget.
+    Keys are plain strings, JWTAuth also accounts its calls under the integration clientId.
+    """
+    MINUTE = 60.0
+    DAY = 86400.0
+
+    def __init__(self, clock: typing.Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._calls = {}
+        self._budgets = {}
+        self._condition = threading.Condition()
+
+    def set_budget(self, company_id: str, budget: typing.Optional[Budget]) -> None:
+        """Sets or removes (budget=None) the budget of ``company_id``"""
+        with self._condition:
+            if budget is None:
+                self._budgets.pop(company_id, None)
+            else:
+                self._budgets[company_id] = budget
+            self._condition.notify_all()
+
+    def get_budget(self, company_id: str) -> typing.Optional[Budget]:
+        return self._budgets.get(company_id)
+
+    def _prune(self, calls: deque, now: float) -> None:
+        while calls and calls[0] <= now - self.DAY:
+            calls.popleft()
+
+    def _count(self, calls: deque, now: float, window: float) -> int:
+        return len(calls) - bisect_right(calls, now - window)
+
+    def usage(self, company_id: str) -> dict:
+        """Returns the number of requests made in the last minute and day"""
+        with self._condition:
+            now = self._clock()
+            calls = self._calls.get(company_id, deque())
+            self._prune(calls, now)
+            return {'minute': self._count(calls, now, self.MINUTE), 'day': len(calls)}
+
+    def remaining(self, company_id: str, priority: str = 'normal') -> float:
+        """Returns the number of requests still allowed right now, inf if no budget is set"""
+        with self._condition:
+            budget = self._budgets.get(company_id)
+            if budget is None:
+                return float('inf')
+            now = self._clock()
+            calls = self._calls.get(company_id, deque())
+            self._prune(calls, now)
+            return min([limit - self._count(calls, now, window) for _, window, limit in budget.limits(priority)]
+                       or [float('inf')])
+
+    def _wait_time(self, company_id: str, priority: str, now: float) -> typing.Tuple[float, str, int]:
+        """Returns the seconds until the next call is allowed with the exhausted window and limit"""
+        budget = self._budgets.get(company_id)
+        calls = self._calls.setdefault(company_id, deque())
+        self._prune(calls, now)
+        if budget is None:
+            return 0.0, '', 0
+        for name, window, limit in budget.limits(priority):
+            used = self._count(calls, now, window)
+            if used >= limit:
+                if limit == 0:
+                    return float('inf'), name, limit
+                # the call that frees a slot is the limit-th most recent one in the window
+                return calls[len(calls) - limit] + window - now, name, limit
+        return 0.0, '', 0
+
+    def acquire(self, *company_ids: str, priority: str = 'normal') -> None:
+        """Records one request for every id of ``company_ids``, queueing or rejecting it if a budget is exhausted
+
+        The request is recorded for all the ids at once, or for none of them when it is rejected.
+
+        Arguments:
+            company_ids(str): Global company id the request is made for, and any other key it is accounted under
+            priority(str)  : 'high' calls may use the reserved share of the budget
+        """
+        with self._condition:
+            deadlines = {}
+            while True:
+                now = self._clock()
+                waits = [(self._wait_time(company_id, priority, now), company_id) for company_id in company_ids]
+                (wait, window, limit), company_id = max(waits, key=lambda item: item[0][0])
+                if wait <= 0:
+                    for company_id in company_ids:
+                        self._calls[company_id].append(now)
+                    return
+                budget = self._budgets[company_id]
+                if budget.policy == 'reject':
+                    raise QuotaExceededError(company_id, window, limit)
+                if budget.timeout is not None:
+                    deadline = deadlines.setdefault(company_id, now + budget.timeout)
+                    if now + wait > deadline:
+                        raise QuotaExceededError(company_id, window, limit)
+                self._condition.wait(None if wait == float('inf') else wait)
+
+    def reset(self, company_id: str = None) -> None:
+        """Forgets the recorded requests of ``company_id`` or of all companies"""
+        with self._condition:
+            if company_id is None:
+                self._calls = {}
+            else:
+                self._calls.pop(company_id, None)
+            self._condition.notify_all()
+
+
+QUOTAS = QuotaTracker()
+
+
+@contextlib.contextmanager
+def call_priority(priority: str) -> typing.Iterator[None]:
+    """Sets the priority of the calls made by the current thread, ie by a batch worker running a 'high' report"""
+    previous = getattr(_local, 'priority', None)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority(default: str = 'normal') -> str:
+    """Priority set with call_priority for the current thread, ``default`` if none is set"""
+    return getattr(_local, 'priority', None) or default
@@ -0,0 +1,196 @@
+import json
+import typing
+import threading
+
+import pandas
+
+from . import dtypes
+from . import metrics
+
+DAY = 'variables/daterangeday'
+GRANULARITIES = {
+    'variables/daterangeweek': 'W',
+    'variables/daterangemonth': 'M',
+    'variables/daterangequarter': 'Q',
+    'variables/daterangeyear': 'Y',
+}
+ADDITIVE_TYPES = ('int', 'integer', 'currency')
+# integer metrics counting distinct visitors, their weekly or monthly value isn't the sum of the daily ones
+NON_ADDITIVE_METRICS = {'metrics/visitors', 'metrics/uniquevisitors', 'metrics/visitorsmcvisid',
+                        'metrics/visitorsnew', 'metrics/mobileuniquevisitors'}
+_WEEK_ENDS = {'SUN': 'SAT', 'MON': 'SUN', 'TUE': 'MON', 'WED': 'TUE', 'THU': 'WED', 'FRI': 'THU', 'SAT': 'FRI'}
+
+
+def additive_metrics(catalog: typing.Union[pandas.DataFrame, typing.List[dict]]) -> typing.Set[str]:
+    """Returns the ids of the metrics of a /metrics catalog whose coarse values are the sum of the daily values
+
+    Counts and currencies are additive, rates, averages, times and distinct visitor counts are not.
+    Calculated metrics are never in the catalog and always requested from the API.
+    """
+    if isinstance(catalog, pandas.DataFrame):
+        catalog = catalog.to_dict('records')
+    return {metric['id'] for metric in catalog
+            if str(metric.get('type', '')).lower() in ADDITIVE_TYPES and metric['id'] not in NON_ADDITIVE_METRICS}
+
+
+def date_range(payload: dict) -> typing.Optional[typing.Tuple[pandas.Timestamp, pandas.Timestamp]]:
+    """Returns the [start, end) days of the dateRange global filter of a report payload
+
+    An end later than midnight, ie the usual 2019-10-31T23:59:59.999, includes its day.
+    """
+    for report_filter in payload.get('globalFilters', []):
+        if 'dateRange' in report_filter:
+            start, end = (pandas.Timestamp(bound) for bound in report_filter['dateRange'].split('/'))
+            return start.floor('D'), end.ceil('D')
+    return None
+
+
+def format_time_values(index: pandas.DatetimeIndex, dimension: str) -> pandas.Index:
+    """Formats period starts the way the API displays the values of ``dimension``"""
+    if dimension == 'variables/daterangemonth':
+        values = [f'{stamp:%b %Y}' for stamp in index]
+    elif dimension == 'variables/daterangequarter':
+        values = [f'Q{stamp.quarter} {stamp.year}' for stamp in index]
+    elif dimension == 'variables/daterangeyear':
+        values = [str(stamp.year) for stamp in index]
+    else:
+        values = [f'{stamp:%b} {stamp.day}, {stamp.year}' for stamp in index]
+    return pandas.Index(values, dtype=object, name=index.name)
+
+
+class Rollup:
+    """Serves week, month, quarter and year reports from the daily reports already retrieved
+
+    Complete daterangeday reports are recorded with ``store``. A coarser report is then computed
+    with a group-by over the recorded days when its date range is covered and its metrics are
+    additive; the other metrics of the request are fetched from the API and joined.
+    Reports are matched on report suite, global filters other than the date range and, per
+    metric, on the metric id and its resolved metric filters.
+
+    Arguments:
+        week_start(str, optional): First day of the weeks of daterangeweek, defaults to 'SUN'
+    """
+
+    def __init__(self, week_start: str = 'SUN') -> None:
+        if week_start not in _WEEK_ENDS:
+            raise ValueError(f'week_start must be one of {tuple(_WEEK_ENDS)}')
+        self._freqs = dict(GRANULARITIES, **{'variables/daterangeweek': f'W-{_WEEK_ENDS[week_start]}'})
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    @staticmethod
+    def _key(payload: dict) -> str:
+        filters = [report_filter for report_filter in payload.get('globalFilters', []) if 'dateRange' not in report_filter]
+        return json.dumps({'rsid': payload['rsid'], 'globalFilters': filters}, sort_keys=True)
+
+    @staticmethod
+    def _signatures(payload: dict) -> typing.List[str]:
+        container = payload['metricContainer']
+        metric_filters = container.get('metricFilters', [])
+        return [json.dumps({'id': metric['id'],
+                            'filters': [metric_filters[int(item)] for item in metric.get('filters', [])]},
+                           sort_keys=True)
+                for metric in container['metrics']]
+
+    def store(self, payload: dict, df: pandas.DataFrame) -> None:
+        """Records a complete daterangeday report
+
+        Arguments:
+            payload(dict): payload of the report, with a dateRange global filter
+            df(DataFrame): one row per day indexed by the display values or by datetimes, one column per metric
+        """
+        if payload.get('dimension') != DAY or date_range(payload) is None:
+            return
+        index = df.index
+        if not isinstance(index, pandas.DatetimeIndex):
+            index = dtypes.parse_time_dimension(index, DAY)
+            if index is None:
+                return
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        start, end = date_range(payload)
+        key = self._key(payload)
+        with self._lock:
+            for position, signature in enumerate(self._signatures(payload)):
+                series = pandas.Series(df.iloc[:, position].to_numpy(dtype=float), index=index.normalize())
+                known, intervals = self._days.get((key, signature), (None, []))
+                if known is not None:
+                    series = series.combine_first(known)
+                self._days[(key, signature)] = (series.sort_index(), _merge(intervals + [(start, end)]))
+
+    def _covered(self, key: str, signature: str, start: pandas.Timestamp, end: pandas.Timestamp) -> bool:
+        _, intervals = self._days.get((key, signature), (None, []))
+        return any(low <= start and end <= high for low, high in intervals)
+
+    def report(self,
+               payload: dict,
+               additive: typing.Set[str],
+               fetch: typing.Callable[[dict], pandas.DataFrame]) -> typing.Optional[pandas.DataFrame]:
+        """Computes a week, month, quarter or year report from the recorded days
+
+        Arguments:
+            payload(dict): payload of the coarse report
+            additive(set): ids of the additive metrics, see additive_metrics
+            fetch(callable): requests a payload restricted to the metrics that can't be computed locally
+                             and returns its DataFrame indexed by the dimension values, one column per metric
+
+        Returns:
+            (DataFrame) indexed by the period starts (DatetimeIndex named after the dimension) with one column
+            per metric of the payload, or None if no metric can be computed locally
+        """
+        dimension = payload.get('dimension')
+        bounds = date_range(payload)
+        if dimension not in self._freqs or bounds is None:
+            return None
+        start, end = bounds
+        key = self._key(payload)
+        metrics_list = payload['metricContainer']['metrics']
+        signatures = self._signatures(payload)
+        with self._lock:
+            local = [position for position, signature in enumerate(signatures)
+                     if metrics_list[position]['id'] in additive and self._covered(key, signature, start, end)]
+            # the end of the range is exclusive
+            days = pandas.date_range(start, end - pandas.Timedelta(days=1), freq='D')
+            series = {position: self._days[(key, signatures[position])][0].reindex(days, fill_value=0.0)
+                      for position in local}
+        metrics.observe_cache('rollup', bool(local))
+        if not local:
+            return None
+        periods = days.to_period(self._freqs[dimension])
+        grouped = pandas.DataFrame(series).groupby(periods, sort=True).sum()
+        index = pandas.DatetimeIndex(grouped.index.to_timestamp(), name=dimension)
+        columns = {position: grouped[position].to_numpy() for position in local}
+        remaining = [position for position in range(len(metrics_list)) if position not in columns]
+        if remaining:
+            restricted = json.loads(json.dumps(payload))
+            restricted['metricContainer']['metrics'] = [metrics_list[position] for position in remaining]
+            fetched = fetch(restricted)
+            fetched_index = fetched.index
+            if not isinstance(fetched_index, pandas.DatetimeIndex):
+                fetched_index = dtypes.parse_time_dimension(fetched_index, dimension)
+            elif fetched_index.tz is not None:
+                fetched_index = fetched_index.tz_localize(None)
+            for column, position in enumerate(remaining):
+                values = pandas.Series(fetched.iloc[:, column].to_numpy(), index=fetched_index)
+                columns[position] = values.reindex(index, fill_value=0).to_numpy()
+        df = pandas.DataFrame({position: columns[position] for position in range(len(metrics_list))}, index=index)
+        df.columns = [metric['id'] for metric in metrics_list]
+        return df
+
+    def clear(self) -> None:
+        with self._lock:
+            self._days.clear()
+
+
+def _merge(intervals: typing.List[typing.Tuple[pandas.Timestamp, pandas.Timestamp]]) -> list:
+    """Merges overlapping or adjacent [start, end) intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,96 @@
+import copy
+import math
+import typing
+
+import pandas
+
+# maximum number of metric columns packed in one /reports request
+COLUMN_LIMIT = 50
+
+
+def pack(payload: dict,
+         segment_ids: typing.Sequence[str],
+         column_limit: int = COLUMN_LIMIT) -> typing.List[typing.Tuple[dict, typing.List[str]]]:
+    """Packs the comparison of segments into as few report payloads as the column limit allows
+
+    Every metric of ``payload`` is repeated once per segment with a metricFilters entry on the
+    segment, in addition to the metric filters it already has. Filter ids are the position of the
+    filter in metricFilters, which is how aanalytics2._dataDescriptor reads them. The metrics of a
+    segment are never split across payloads, so a payload holds column_limit // metrics segments
+    and some columns may stay unused, ie 7 metrics x 50 segments take 8 payloads of 7 segments.
+
+    Arguments:
+        payload(dict): report payload of the metrics to compare
+        segment_ids(list): ids of the segments to compare
+        column_limit(int, optional): maximum number of metric columns per payload, defaults to COLUMN_LIMIT
+
+    Returns:
+        (list) of (payload, segment ids) tuples, ceil(segments / (column_limit // metrics)) long,
+               see requests_needed
+    """
+    container = payload['metricContainer']
+    metrics = container['metrics']
+    if not metrics:
+        raise ValueError('payload has no metric to compare')
+    if len(metrics) > column_limit:
+        raise ValueError(f'{len(metrics)} metrics exceed the limit of {column_limit} columns per request')
+    base_filters = container.get('metricFilters', [])
+    per_request = column_limit // len(metrics)
+    packed = []
+    for start in range(0, len(segment_ids), per_request):
+        segments = list(segment_ids[start:start + per_request])
+        request = copy.deepcopy(payload)
+        metric_filters = [dict(metric_filter, id=str(position)) for position, metric_filter in enumerate(base_filters)]
+        positions = {metric_filter.get('id', str(position)): str(position)
+                     for position, metric_filter in enumerate(base_filters)}
+        packed_metrics = []
+        for segment_id in segments:
+            segment_filter = str(len(metric_filters))
+            metric_filters.append({'id': segment_filter, 'type': 'segment', 'segmentId': segment_id})
+            for metric in metrics:
+                packed_metrics.append(dict(metric,
+                                           columnId=str(len(packed_metrics)),
+                                           filters=[positions[item] for item in metric.get('filters', [])]
+                                           + [segment_filter]))
+        request['metricContainer'] = dict(container, metrics=packed_metrics, metricFilters=metric_filters)
+        request.setdefault('settings', {})['page'] = 0
+        packed.append((request, segments))
+    return packed
+
+
+def requests_needed(n_segments: int, n_metrics: int, column_limit: int = COLUMN_LIMIT) -> int:
+    """Number of payloads pack returns for n_segments segments of n_metrics metrics"""
+    return math.ceil(n_segments / (column_limit // n_metrics))
+
+
+def unpack(df: pandas.DataFrame,
+           segment_ids: typing.Sequence[str],
+           metrics: typing.Sequence[str],
+           dimension: str = None) -> pandas.DataFrame:
+    """Turns the report of a packed payload into a long DataFrame with one row per dimension value and segment
+
+    Arguments:
+        df(DataFrame): report of a payload built by pack, metric columns in packing order
+        segment_ids(list): segments of the payload
+        metrics(list): metric ids of the original payload
+        dimension(str, optional): column holding the dimension values (getReport), the index is used if omitted
+
+    Returns:
+        (DataFrame) with the dimension, 'segment' and one column per metric
+    """
+    if dimension is None:
+        name = df.index.name or 'dimension'
+        values = df.index.to_numpy()
+        data = df
+    else:
+        name = dimension
+        values = df[dimension].to_numpy()
+        data = df.drop(columns=dimension)
+    frames = []
+    for position, segment_id in enumerate(segment_ids):
+        block = data.iloc[:, position * len(metrics):(position + 1) * len(metrics)]
+        frame = pandas.DataFrame(block.to_numpy(), columns=list(metrics))
+        frame.insert(0, 'segment', segment_id)
+        frame.insert(0, name, values)
+        frames.append(frame)
+    return pandas.concat(frames, ignore_index=True)
@@ -0,0 +1,213 @@
+import os
+import json
+import string
+import hashlib
+import typing
+from concurrent import futures
+
+import numpy
+import pandas
+
+from .batch import BatchExecutor, canonical
+from .estimate import probe_payload
+
+ALPHABET = string.ascii_lowercase + string.digits
+# rows of a shard above which plan splits it on the next character
+MAX_SHARD_ROWS = 100000
+# longest prefix plan follows, items sharing a longer prefix stay in one shard
+MAX_PREFIX = 256
+
+
+def _quote(prefix: str) -> str:
+    return "'" + prefix.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+class Shard:
+    """Part of the item space of a dimension: the items beginning with ``prefix`` but none of ``exclude``
+
+    Shards produced by ``split`` are disjoint and their union is the parent shard: one shard per
+    character of the alphabet, and a remainder shard holding the items whose next character isn't
+    in the alphabet. The search clause is case insensitive like the API.
+    """
+
+    def __init__(self, prefix: str = '', exclude: typing.Sequence[str] = ()) -> None:
+        self.prefix = prefix
+        self.exclude = tuple(exclude)
+
+    @property
+    def clause(self) -> typing.Optional[str]:
+        """search.clause selecting the items of the shard, None for the whole item space"""
+        parts = []
+        if self.prefix:
+            parts.append(f'BEGINS-WITH {_quote(self.prefix)}')
+        if self.exclude:
+            parts.append('NOT ( ' + ' OR '.join(f'BEGINS-WITH {_quote(item)}' for item in self.exclude) + ' )')
+        return ' AND '.join(parts) or None
+
+    def split(self, alphabet: str = ALPHABET) -> typing.List['Shard']:
+        children = [self.prefix + char for char in alphabet]
+        return [Shard(child) for child in children] + [Shard(self.prefix, children)]
+
+    def payload(self, payload: dict) -> dict:
+        """Returns a copy of ``payload`` restricted to the shard, its own search clause is kept"""
+        request = json.loads(json.dumps(payload))
+        clause = self.clause
+        if clause is not None:
+            search = request.setdefault('search', {})
+            search['clause'] = f'( {search["clause"]} ) AND ( {clause} )' if search.get('clause') else clause
+        request.setdefault('settings', {})['page'] = 0
+        return request
+
+    def __eq__(self, other):
+        return isinstance(other, Shard) and (self.prefix, self.exclude) == (other.prefix, other.exclude)
+
+    def __repr__(self):
+        return f'<Shard {self.clause}>'
+
+
+def plan(probe: typing.Callable[[dict], dict],
+         payload: dict,
+         max_rows: int = MAX_SHARD_ROWS,
+         alphabet: str = ALPHABET,
+         max_depth: int = 3,
+         max_workers: int = 4) -> typing.List[Shard]:
+    """Splits the item space of the payload until every shard holds at most ``max_rows`` items
+
+    Shard sizes are read from totalElements with one row probes (see estimate.probe_payload), a
+    split costs len(alphabet) + 1 probes sent ``max_workers`` at a time. Empty shards are dropped.
+    A split leaving a single non-empty shard follows the prefix shared by all of its items (ie 'http'
+    for urls) without counting a level. Remainder shards and shards ``max_depth`` levels deep are
+    kept whatever their size.
+
+    Arguments:
+        probe(callable): sends a /reports payload and returns the decoded page
+        payload(dict): report payload of the extraction
+        max_rows(int, optional): items per shard, defaults to MAX_SHARD_ROWS
+        alphabet(str, optional): characters the prefixes are extended with, defaults to ALPHABET
+        max_depth(int, optional): number of splits with several non-empty shards, defaults to 3
+        max_workers(int, optional): probes sent at the same time, defaults to 4
+    """
+    def size(shard):
+        page = probe(shard.payload(probe_payload(payload)))
+        if 'totalElements' not in page:
+            raise ValueError(f'probe request failed: {page}')
+        return page['totalElements']
+
+    shards = []
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = size(Shard())
+        pending = [(Shard(), 0, rows)] if rows else []
+        while pending:
+            shard, depth, rows = pending.pop(0)
+            if rows <= max_rows or shard.exclude or depth >= max_depth or len(shard.prefix) >= MAX_PREFIX:
+                shards.append(shard)
+                continue
+            children = shard.split(alphabet)
+            found = [(child, count) for child, count in zip(children, executor.map(size, children)) if count]
+            # a single non-empty child is a prefix common to every item, following it isn't a level
+            pending.extend((child, depth + (len(found) > 1), count) for child, count in found)
+    return shards
+
+
+def _read_checkpoint(path: str) -> typing.List[dict]:
+    """Returns the pages recorded in a checkpoint, an incomplete last line is truncated"""
+    pages, valid = [], 0
+    with open(path, 'rb+') as fd:
+        for line in fd:
+            try:
+                pages.append(json.loads(line))
+            except ValueError:
+                break
+            valid += len(line)
+        fd.truncate(valid)
+    return pages
+
+
+def walk(fetch: typing.Callable[[dict], dict], payload: dict, checkpoint: str = None) -> dict:
+    """Requests every page of a shard
+
+    Arguments:
+        fetch(callable): sends a /reports payload and returns the decoded page
+        payload(dict): report payload of the shard
+        checkpoint(str, optional): file every page is appended to as a json line as soon as it is
+                                   received. A walk resumes after the pages already recorded
+
+    Returns:
+        (dict) with the 'itemIds' and 'values' lists and the 'data' float64 array (rows x metrics)
+    """
+    request = json.loads(json.dumps(payload))
+    pages = _read_checkpoint(checkpoint) if checkpoint and os.path.exists(checkpoint) else []
+    done = bool(pages) and pages[-1]['lastPage']
+    with open(checkpoint, 'a') if checkpoint else open(os.devnull, 'w') as fd:
+        while not done:
+            request['settings']['page'] = len(pages)
+            response = fetch(request)
+            if 'rows' not in response:
+                raise ValueError(f'shard request failed: {response}')
+            rows = response['rows']
+            page = {'itemIds': [row.get('itemId') for row in rows], 'values': [row['value'] for row in rows],
+                    'data': [row['data'] for row in rows], 'lastPage': response['lastPage']}
+            fd.write(json.dumps(page) + '\n')
+            fd.flush()
+            pages.append(page)
+            done = page['lastPage']
+    n_metrics = len(payload['metricContainer']['metrics'])
+    data = [row for page in pages for row in page['data']]
+    return {'itemIds': [item for page in pages for item in page['itemIds']],
+            'values': [value for page in pages for value in page['values']],
+            'data': numpy.asarray(data, dtype=numpy.float64).reshape(len(data), n_metrics)}
+
+
+def merge(parts: typing.Sequence[dict], columns: typing.Sequence[str], dimension: str = None) -> pandas.DataFrame:
+    """Concatenates shard walks, keeping the first row of every itemId, sorted by the first metric descending
+
+    Returns:
+        (DataFrame) indexed by the dimension values with one column per metric, like Reports.get_dataframe
+    """
+    item_ids = pandas.Index([item for part in parts for item in part['itemIds']])
+    values = numpy.array([value for part in parts for value in part['values']], dtype=object)
+    data = numpy.concatenate([part['data'] for part in parts]) if parts else numpy.empty((0, len(columns)))
+    keep = ~item_ids.duplicated()
+    df = pandas.DataFrame(data[keep], index=pandas.Index(values[keep], dtype=object, name=dimension),
+                          columns=list(columns))
+    if len(df.columns):
+        df = df.iloc[numpy.argsort(-df.iloc[:, 0].to_numpy(), kind='stable')]
+    return df
+
+
+def extract(fetch: typing.Callable[[dict], dict],
+            payload: typing.Union[str, dict],
+            shards: typing.Sequence[Shard] = None,
+            max_workers: int = 4,
+            checkpoint_dir: str = None,
+            priority: str = 'low',
+            **kwargs) -> pandas.DataFrame:
+    """Walks the shards of a high cardinality dimension concurrently and merges them
+
+    Arguments:
+        fetch(callable): sends a /reports payload and returns the decoded page
+        payload(dict, str): report payload, settings.limit is the page size of every shard
+        shards(list, optional): shards to walk, planned with ``plan`` if omitted
+        max_workers(int, optional): shards walked, or probes sent while planning, at the same time, defaults to 4
+        checkpoint_dir(str, optional): directory of the shard checkpoints, one file per shard named after
+                                       its payload. Running the same extraction again only requests the
+                                       pages that are not recorded yet
+        priority(str, optional): quota priority of the calls, defaults to 'low' (see batch.BatchExecutor)
+        **kwargs: passed to plan, ie max_rows, alphabet or max_depth
+    """
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    if shards is None:
+        shards = plan(fetch, payload, max_workers=max_workers, **kwargs)
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def run(request):
+        name = hashlib.sha1(canonical(request).encode('utf8')).hexdigest()
+        return walk(fetch, request, os.path.join(checkpoint_dir, f'{name}.jsonl') if checkpoint_dir else None)
+
+    with BatchExecutor(run, max_workers=max_workers) as executor:
+        futures = executor.map([shard.payload(payload) for shard in shards], priority=priority)
+        parts = [future.result() for future in futures]
+    columns = [metric['id'] for metric in payload['metricContainer']['metrics']]
+    return merge(parts, columns, payload.get('dimension'))
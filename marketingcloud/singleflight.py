@@ -0,0 +1,65 @@
+import json
+import typing
+import threading
+
+from . import metrics
+
+
+def request_key(method: str, url: str, params: dict = None, data: typing.Any = None) -> str:
+    """Returns a key identical for requests to the same url with the same parameters, whatever their order"""
+    return json.dumps([method.lower(), url, params or {}, data], sort_keys=True, default=str)
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Shares one in-flight call between the threads asking for the same key at the same moment
+
+    The first thread runs the call, the threads arriving with the same key before it returns wait
+    and receive its result, or its exception. Nothing is kept once the call returned, so a later
+    call runs again. Lookups are recorded as metrics.observe_cache(name, shared).
+
+    Arguments:
+        name(str, optional): Cache label of the metrics, defaults to 'single_flight'
+    """
+
+    def __init__(self, name: str = 'single_flight') -> None:
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of calls in flight"""
+        return len(self._calls)
+
+    def do(self, key: typing.Hashable, call: typing.Callable[[], typing.Any]) -> typing.Any:
+        """Runs ``call`` unless a call with the same key is in flight, and returns its result"""
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Call()
+            else:
+                flight.waiters += 1
+        metrics.observe_cache(self.name, not leader)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = call()
+            return flight.result
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
@@ -0,0 +1,107 @@
+import abc
+import typing
+
+import requests
+
+# parameters requests.Session.<method> accepts positionally after the url
+POSITIONAL_ARGUMENTS = {'get': ('params',), 'post': ('data', 'json'), 'put': ('data',), 'patch': ('data',)}
+
+
+def keyword_arguments(method: str, args: tuple, kwargs: dict) -> dict:
+    """Returns ``kwargs`` completed with the positional ``args`` of a requests.Session.<method> call after the url"""
+    names = POSITIONAL_ARGUMENTS.get(method.lower(), ())
+    if len(args) > len(names):
+        raise TypeError(f'{method} takes {len(names)} positional arguments after the url but {len(args)} were given')
+    positional = dict(zip(names, args))
+    if set(positional) & set(kwargs):
+        raise TypeError(f'{method} got multiple values for {", ".join(sorted(set(positional) & set(kwargs)))}')
+    return dict(kwargs, **positional)
+
+
+class Transport(abc.ABC):
+    """Interface every HTTP call of JWTAuth and aanalytics2 goes through
+
+    Implementations hold the connection pool and the default headers. ``request`` takes the
+    requests library keyword arguments (params, data, json, headers, timeout) and returns an
+    object exposing ``status_code``, ``headers``, ``content`` and ``json()``.
+    """
+    METHODS = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+
+    @abc.abstractmethod
+    def request(self, method: str, url: str, **kwargs) -> typing.Any:
+        pass
+
+    @abc.abstractmethod
+    def update_headers(self, headers: dict) -> None:
+        """Sets default headers sent with every request, ie the Authorization header"""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RequestsTransport(Transport):
+    """Default transport based on a pooled requests.Session (HTTP/1.1)
+
+    Arguments:
+        pool_maxsize(int, optional): Maximum number of kept alive connections per host, defaults to 10
+    """
+
+    def __init__(self, pool_maxsize: int = 10) -> None:
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method.upper(), url, **kwargs)
+
+    def update_headers(self, headers: dict) -> None:
+        self.session.headers.update(headers)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class HTTP2Transport(Transport):
+    """Transport multiplexing concurrent requests over few HTTP/2 connections
+
+    Requires the optional dependency ``httpx[http2]``. The client is thread safe, so a single
+    instance can be shared by the worker threads of concurrent page or metadata requests.
+
+    Arguments:
+        max_connections(int, optional): Maximum number of open connections, defaults to 4
+        timeout(float, optional): Timeout in seconds for every request, defaults to 60
+    """
+
+    def __init__(self, max_connections: int = 4, timeout: float = 60.0) -> None:
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('HTTP2Transport requires httpx, install it with: pip install "httpx[http2]"')
+        self.client = httpx.Client(http2=True,
+                                   timeout=timeout,
+                                   limits=httpx.Limits(max_connections=max_connections))
+
+    def request(self, method: str, url: str, **kwargs) -> typing.Any:
+        # httpx expects raw bodies as content, form data stays in data
+        data = kwargs.pop('data', None)
+        if isinstance(data, (str, bytes)):
+            kwargs['content'] = data
+        elif data is not None:
+            kwargs['data'] = data
+        params = kwargs.pop('params', None)
+        if params:
+            kwargs['params'] = {k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()}
+        return self.client.request(method.upper(), url, **kwargs)
+
+    def update_headers(self, headers: dict) -> None:
+        self.client.headers.update(headers)
+
+    def close(self) -> None:
+        self.client.close()
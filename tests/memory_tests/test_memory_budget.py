@@ -0,0 +1,116 @@
+"""Peak memory ceilings of report ingestion
+
+Every ingestion path runs under tracemalloc against synthetic paged /reports responses and its peak
+traced memory must stay below a multiple of the memory used by the final DataFrame. The raw pages are
+generated before tracing starts, so the peak only covers decoding, accumulation and frame building.
+
+The number of rows defaults to 20000 so the suite runs in CI. Set MARKETINGCLOUD_MEMORY_ROWS to run
+the same ceilings against multi-million row reports, ie MARKETINGCLOUD_MEMORY_ROWS=2000000.
+"""
+import os
+import json
+import tracemalloc
+import pytest
+
+from marketingcloud import aanalytics2, codec
+from marketingcloud.analytics_reports import Reports
+from marketingcloud.fakeserver import report_page
+
+N_ROWS = int(os.environ.get('MARKETINGCLOUD_MEMORY_ROWS', 20000))
+PAGE_SIZE = 2000
+N_METRICS = 10
+# credentials of the Reports instances, the tests never request a token
+CONFIG = {"iss": "XYZ@AdobeOrg", "sub": "XYZ@techacct.adobe.com", "aud": "https://ims-na1.adobelogin.com/c/XYZ",
+          "privateKeyPath": "/path/to/private/key", "clientSecret": "XYZ", "companyId": "memory"}
+
+# peak traced memory / DataFrame memory
+CEILINGS = {
+    'Reports.get_dataframe': 3,
+    'Reports.get_dataframe[projection]': 2.5,
+    'getReport': 12,
+    'getReport[projection]': 3.5,
+}
+ANOMALY_CEILINGS = {
+    'Reports.get_dataframe': 5,
+    'Reports.get_dataframe[projection]': 3.5,
+    'getReport': 12,
+    'getReport[projection]': 4.5,
+}
+
+
+def make_payload(anomaly):
+    return {
+        'rsid': 'memory',
+        'globalFilters': [],
+        'metricContainer': {
+            'metrics': [{'columnId': str(i), 'id': f'metrics/event{i + 1}', 'filters': []} for i in range(N_METRICS)]
+        },
+        'dimension': 'variables/page',
+        'settings': {'limit': PAGE_SIZE, 'page': 0, 'includeAnomalyDetection': anomaly}
+    }
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeAnalytics:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def reports(self, payload):
+        return FakeResponse(self.pages[payload['settings']['page']])
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['plain', 'anomaly'])
+def pages(request):
+    payload = make_payload(request.param)
+    pages = []
+    while True:
+        page = report_page(payload, N_ROWS)
+        pages.append(json.dumps(page).encode('utf8'))
+        if page['lastPage']:
+            return request.param, pages
+        payload['settings']['page'] += 1
+
+
+def reports_dataframe(pages, anomaly, projection):
+    reports = Reports(CONFIG)
+    reports.analytics_client = FakeAnalytics(pages)
+    return reports.get_dataframe(make_payload(anomaly), projection=projection)
+
+
+def get_report(pages, anomaly, projection):
+    client = aanalytics2.Client(companyid='memory')
+
+    def post_data(endpoint, data=None, projection=False, anomaly=False, **kwargs):
+        page = codec.decode(FakeResponse(pages[data['settings']['page']]))
+        return codec.project_report(page, anomaly=anomaly) if projection else page
+
+    client._postData = post_data
+    return client.getReport(make_payload(anomaly), n_result='inf', projection=projection)['data']
+
+
+RUNS = {
+    'Reports.get_dataframe': lambda pages, anomaly: reports_dataframe(pages, anomaly, False),
+    'Reports.get_dataframe[projection]': lambda pages, anomaly: reports_dataframe(pages, anomaly, True),
+    'getReport': lambda pages, anomaly: get_report(pages, anomaly, False),
+    'getReport[projection]': lambda pages, anomaly: get_report(pages, anomaly, True),
+}
+
+
+@pytest.mark.parametrize('name', list(RUNS))
+def test_peak_memory_ceiling(pages, name):
+    anomaly, raw_pages = pages
+    tracemalloc.start()
+    try:
+        df = RUNS[name](raw_pages, anomaly)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(df) == N_ROWS
+    ratio = peak / df.memory_usage(deep=True).sum()
+    ceiling = (ANOMALY_CEILINGS if anomaly else CEILINGS)[name]
+    print(f'{name} anomaly={anomaly} peak/frame={ratio:.2f} ceiling={ceiling}')
+    assert ratio <= ceiling
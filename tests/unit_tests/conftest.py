@@ -0,0 +1,66 @@
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from marketingcloud import aanalytics2
+from marketingcloud.analytics_reports import Reports
+from marketingcloud.fakeserver import FakeAnalyticsServer
+from marketingcloud.jwt import JWTAuth
+from marketingcloud.quota import QuotaTracker
+
+
+@pytest.fixture(scope='session')
+def private_key_path(tmp_path_factory):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    path = tmp_path_factory.mktemp('keys') / 'private.key'
+    path.write_bytes(key.private_bytes(serialization.Encoding.PEM,
+                                       serialization.PrivateFormat.TraditionalOpenSSL,
+                                       serialization.NoEncryption()))
+    return str(path)
+
+
+@pytest.fixture
+def server():
+    with FakeAnalyticsServer(report_rows=95, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def make_auth(private_key_path):
+    """JWTAuth factory for a fake server, the keyword arguments are passed to JWTAuth"""
+    def make_auth(server, **kwargs):
+        config = {
+            "iss": "XYZ@AdobeOrg",
+            "sub": "XYZ@techacct.adobe.com",
+            "aud": "https://ims-na1.adobelogin.com/c/XYZ",
+            "privateKeyPath": private_key_path,
+            "clientSecret": "XYZ",
+            "companyId": FakeAnalyticsServer.COMPANY_ID
+        }
+        return JWTAuth(config, endpoint=server.token_endpoint, quota=QuotaTracker(), **kwargs)
+    return make_auth
+
+
+@pytest.fixture
+def reports(server, make_auth):
+    return Reports(make_auth(server), base_url=server.base_url)
+
+
+@pytest.fixture
+def client(server, private_key_path):
+    return aanalytics2.Client(org_id='XYZ@AdobeOrg', api_key='XYZ', tech_id='XYZ@techacct.adobe.com',
+                              secret='XYZ', pathToKey=private_key_path, host=server.url,
+                              tokenEndpoint=server.token_endpoint, companyid=FakeAnalyticsServer.COMPANY_ID)
+
+
+@pytest.fixture
+def payload():
+    """Visits by page over the 95 fake items, add metrics or change the settings as needed"""
+    return {
+        'rsid': 'fakersid',
+        'globalFilters': [],
+        'metricContainer': {'metrics': [{'columnId': '0', 'id': 'metrics/visits', 'filters': []}]},
+        'dimension': 'variables/page',
+        'settings': {'limit': 50, 'page': 0}
+    }
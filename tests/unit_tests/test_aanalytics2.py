@@ -0,0 +1,168 @@
+import json
+import time
+import threading
+import pytest
+
+from marketingcloud import aanalytics2
+from marketingcloud.transport import Transport
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.content = json.dumps(body).encode('utf8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RecordingTransport(Transport):
+    def __init__(self, responder):
+        self.calls = []
+        self.responder = responder
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return FakeResponse(self.responder(method, url, kwargs))
+
+    def update_headers(self, headers):
+        pass
+
+
+def make_client(companyid, transport):
+    client = aanalytics2.Client(org_id='XYZ@AdobeOrg', api_key='key', tech_id='XYZ@techacct.adobe.com',
+                                secret='secret', pathToKey='/path/to/key', companyid=companyid,
+                                transport=transport)
+    client.updateHeader(token='token')
+    client.date_limit = time.time() + 86400
+    return client
+
+
+@pytest.fixture
+def transport():
+    def responder(method, url, kwargs):
+        return {'content': [{'id': 'dr1', 'url': url}], 'lastPage': True, 'totalPages': 1}
+    return RecordingTransport(responder)
+
+
+def test_clients_keep_their_company(transport):
+    first = make_client('companyA', transport)
+    second = make_client('companyB', transport)
+    first.getDateRanges()
+    second.getDateRanges()
+    (_, url_a, kwargs_a), (_, url_b, kwargs_b) = transport.calls
+    assert url_a == 'https://analytics.adobe.io/api/companyA/dateranges'
+    assert url_b == 'https://analytics.adobe.io/api/companyB/dateranges'
+    assert kwargs_a['headers']['x-proxy-global-company-id'] == 'companyA'
+    assert kwargs_b['headers']['x-proxy-global-company-id'] == 'companyB'
+
+
+def test_update_header_switches_company(transport):
+    client = make_client('companyA', transport)
+    client.updateHeader(companyid='companyB')
+    assert client.endpoint_company == 'https://analytics.adobe.io/api/companyB'
+    assert client.header['Authorization'] == 'Bearer token'
+
+
+def test_module_functions_use_module_client(monkeypatch, transport):
+    client = make_client('companyA', transport)
+    monkeypatch.setattr(aanalytics2, '_client', client)
+    df = aanalytics2.getDateRanges()
+    assert df['id'].tolist() == ['dr1']
+    assert 'Get the list of date ranges' in aanalytics2.getDateRanges.__doc__
+    response = aanalytics2._getData(client.endpoint_company + '/dateranges', params={'limit': 1})
+    assert response['content'][0]['id'] == 'dr1'
+    assert transport.calls[-1][2]['params'] == {'limit': 1}
+
+
+def test_set_transport_keeps_the_previous_transport_open(monkeypatch, transport):
+    class ClosingTransport(RecordingTransport):
+        closed = False
+
+        def close(self):
+            self.closed = True
+    first, second = ClosingTransport(transport.responder), ClosingTransport(transport.responder)
+    monkeypatch.setattr(aanalytics2, '_transport', aanalytics2._transport)
+    monkeypatch.setattr(aanalytics2._client, 'transport', aanalytics2._client.transport)
+    aanalytics2.setTransport(first)
+    client = aanalytics2.Client(companyid='companyA')
+    aanalytics2.setTransport(second)
+    assert client.transport is first and not first.closed
+    assert aanalytics2._client.transport is second
+
+
+def test_module_client_emits_module_hooks():
+    assert aanalytics2._client.hooks is aanalytics2.hooks
+
+
+def test_concurrent_identical_gets_share_one_request(transport):
+    client = make_client('companyA', transport)
+    release = threading.Event()
+    responder = transport.responder
+
+    def slow(method, url, kwargs):
+        release.wait(5)
+        return responder(method, url, kwargs)
+    transport.responder = slow
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client._getData(client.endpoint_company + '/dateranges')))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while not client._singleFlight._calls or next(iter(client._singleFlight._calls.values())).waiters < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(transport.calls) == 1
+    assert len(results) == 3 and results[0] == results[1] == results[2]
+    # every caller decodes its own copy
+    assert results[0] is not results[1]
+
+
+def test_post_data_reports_bodies_that_are_not_json_and_raises_projection_errors():
+    class Transport(RecordingTransport):
+        def request(self, method, url, **kwargs):
+            response = super().request(method, url, **kwargs)
+            if kwargs['data'] == '"html"':
+                response.content = b'<html>Gateway Timeout</html>'
+            return response
+    transport = Transport(lambda method, url, kwargs: {'rows': [{'value': 'a'}], 'lastPage': True})
+    client = make_client('companyA', transport)
+    assert client._postData(client.endpoint_company + '/reports', data='html') == {'error': ['Request Error']}
+    with pytest.raises(KeyError):
+        client._postData(client.endpoint_company + '/reports', data={'settings': {}}, projection=True)
+
+
+def test_get_report_stops_at_n_result(server, client, payload):
+    payload['settings']['limit'] = 10
+    assert len(client.getReport(payload, n_result=30)['data']) == 30
+    assert sum(request[1].endswith('/reports') for request in server.requests) == 3
+
+
+def test_verbose_report_without_elements(capsys, client, payload):
+    client._postData = lambda *args, **kwargs: {'rows': [], 'numberOfElements': 0, 'totalElements': 0, 'lastPage': True}
+    data = client.getReport(payload, verbose=True)['data']
+    assert data.empty and data.columns.tolist() == ['variables/page', 'metrics/visits']
+    assert 'Report contains 100% ofthe available dimensions' in capsys.readouterr().out
+
+
+def test_calls_are_sent_through_send_and_retried(monkeypatch, server, client):
+    monkeypatch.setattr(aanalytics2._time, 'sleep', lambda seconds: None)
+    client.maxRetries = 1
+    starts, retries = [], []
+    client.hooks.register('request_start', lambda event: starts.append(event['endpoint']))
+
+    def on_retry(event):
+        retries.append(event)
+        server.rate_limit = None
+
+    client.hooks.register('retry', on_retry)
+    client.retrieveToken()
+    server.rate_limit = 1
+    assert client.getCompanyId('first') == 'FAKECOMPANY'
+    assert client.getDateRanges() is not None
+    dateranges = '/api/FAKECOMPANY/dateranges'
+    assert starts == ['/discovery/me', dateranges, dateranges]
+    assert [(r['status'], r['attempt'], r['endpoint']) for r in retries] == [(429, 1, dateranges)]
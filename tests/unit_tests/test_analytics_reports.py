@@ -1,9 +1,10 @@
 import os
 import pytest
+import numpy
 import pandas
 from unittest.mock import mock_open, patch
 
-from marketingcloud.analytics_reports import Reports
+from marketingcloud.analytics_reports import Reports, _Table, _TableRegistry
 
 
 payloads = (
@@ -526,6 +527,15 @@ def reports_client():
         return Reports("")
 
 
+def fake_reports(analytics_client=None):
+    """Reports requesting its pages from ``analytics_client`` instead of the API"""
+    reports = Reports({"iss": "XYZ@AdobeOrg", "sub": "XYZ@techacct.adobe.com",
+                       "aud": "https://ims-na1.adobelogin.com/c/XYZ", "privateKeyPath": "/path/to/private/key",
+                       "clientSecret": "XYZ", "companyId": "XYZ"})
+    reports.analytics_client = analytics_client
+    return reports
+
+
 @pytest.fixture
 def test_payload():
     return payloads[0]
@@ -541,15 +551,11 @@ def test_response_chunk():
                           (payloads[1], 'metrics/visits|metrics/pageviews'),
                           (payloads[2], 'cm1214_5aec40c4373fa864abcbe786')])
 def test_correct_table_columns(monkeypatch, test_response_chunk, payload, expected):
-    def fake_get(self, payload):
+    def fake_get(self, payload, **kwargs):
         return test_response_chunk
 
-    def fake_init(self):
-        self.analytics_client = None
-
     monkeypatch.setattr(Reports, '_get', fake_get)
-    monkeypatch.setattr(Reports, '__init__', fake_init)
-    reports_client = Reports()
+    reports_client = fake_reports()
     table = reports_client._create_table(payload, False)
     assert "|".join(table.columns) == expected
 
@@ -559,15 +565,11 @@ def test_correct_table_columns(monkeypatch, test_response_chunk, payload, expect
                           (chunks[1], 1),
                           (chunks[2], 12)])
 def test_correct_table_columns(monkeypatch, chunk, expected):
-    def fake_get(self, payload):
+    def fake_get(self, payload, **kwargs):
         yield chunk
 
-    def fake_init(self):
-        self.analytics_client = None
-
     monkeypatch.setattr(Reports, '_get', fake_get)
-    monkeypatch.setattr(Reports, '__init__', fake_init)
-    reports_client = Reports()
+    reports_client = fake_reports()
     table = reports_client._create_table(payloads[0], False)
     assert len(table.rows) == expected
 
@@ -579,15 +581,160 @@ def test_correct_table_columns(monkeypatch, chunk, expected):
                              (payloads[2], chunks[2], ['cm1214_5aec40c4373fa864abcbe786']),
                          ])
 def test_get_pandas_dataframe(monkeypatch, payload, chunk, columns):
-    def fake_get(self, payload):
+    def fake_get(self, payload, **kwargs):
         yield chunk
 
-    def fake_init(self):
-        self.analytics_client = None
-
     monkeypatch.setattr(Reports, '_get', fake_get)
-    monkeypatch.setattr(Reports, '__init__', fake_init)
-    reports_client = Reports()
+    reports_client = fake_reports()
     df = reports_client.get_dataframe(payload, False)
     assert all(df.columns == columns)
-    assert isinstance(df, pandas.DataFrame)
\ No newline at end of file
+    assert isinstance(df, pandas.DataFrame)
+
+def test_get_dataframe_profile(monkeypatch):
+    class FakeResponse:
+        def json(self):
+            return chunks[0]
+
+    class FakeAnalytics:
+        def reports(self, payload):
+            return FakeResponse()
+
+    reports_client = fake_reports(FakeAnalytics())
+    df, profile = reports_client.get_dataframe(payloads[0], profile=True)
+    assert isinstance(df, pandas.DataFrame)
+    assert set(profile['pages'][0]) == {'request', 'decode', 'accumulate'}
+    assert set(profile['total']) == {'request', 'decode', 'accumulate', 'frame'}
+
+
+def test_table_grows_over_pages():
+    table = _Table(1, None)
+    table.process_payload(payloads[1])
+    table.INITIAL_CAPACITY = 2
+    table.append(['a', 'b'], [[1, 2], [3, 4]])
+    table.append(['c'], numpy.array([[5.0, 6.0]]))
+    assert len(table) == 3
+    assert table.rows == [('a', [1.0, 2.0]), ('b', [3.0, 4.0]), ('c', [5.0, 6.0])]
+    assert table.to_numpy().shape == (3, 2)
+
+
+def test_table_rejects_metric_count_change():
+    table = _Table(1, None)
+    table.append(['a'], [[1, 2]])
+    with pytest.raises(ValueError):
+        table.append(['b'], [[1, 2, 3]])
+
+
+def test_table_to_dataframe_shares_memory():
+    table = _Table(1, None)
+    table.process_payload(payloads[1])
+    table.process_response(chunks[1])
+    df = table.to_dataframe()
+    assert list(df.columns) == ['metrics/visits', 'metrics/pageviews']
+    assert numpy.shares_memory(df.to_numpy(), table.to_numpy())
+
+
+def test_table_to_arrow():
+    pyarrow = pytest.importorskip('pyarrow')
+    table = _Table(1, None)
+    table.process_payload(payloads[1])
+    table.append(['a', 'b'], [[1, 2], [3, 4]])
+    arrow = table.to_arrow()
+    assert arrow.column_names == ['dimension', 'metrics/visits', 'metrics/pageviews']
+    assert arrow.column('metrics/pageviews').to_pylist() == [2.0, 4.0]
+
+
+def make_table(id, n_rows):
+    table = _Table(id, None)
+    table.process_payload(payloads[1])
+    table.append([f'value {i}' for i in range(n_rows)], [[i, 2 * i] for i in range(n_rows)])
+    return table
+
+
+def test_table_save_load(tmp_path):
+    table = make_table(3, 5)
+    table.append(['value 5'], [[5, 10]], ['1000005'])
+    table.dimension = 'variables/page'
+    table.save(str(tmp_path / 'table.npz'))
+    loaded = _Table.load(3, str(tmp_path / 'table.npz'))
+    assert loaded.rows == table.rows
+    assert loaded.item_ids.tolist() == [None] * 5 + ['1000005']
+    assert loaded.columns == table.columns
+    assert loaded.dimension == 'variables/page'
+
+
+def test_registry_spills_least_recently_used(tmp_path):
+    registry = _TableRegistry(max_tables=2, max_bytes=None, spill_dir=str(tmp_path))
+    for id in (1, 2, 3):
+        registry.append(make_table(id, 10))
+    assert registry.spilled == [1]
+    registry[2]
+    registry.append(make_table(4, 10))
+    assert registry.spilled == [1, 3]
+    assert registry[1].rows == make_table(1, 10).rows
+    assert registry.spilled == [2, 3]
+    assert len(registry) == 4
+    registry.clear()
+    assert len(registry) == 0
+    assert not list(tmp_path.iterdir())
+
+
+def test_registry_byte_cap(tmp_path):
+    size = make_table(1, 100).nbytes
+    registry = _TableRegistry(max_tables=10, max_bytes=2 * size, spill_dir=str(tmp_path))
+    for id in range(1, 5):
+        registry.append(make_table(id, 100))
+    assert registry.spilled == [1, 2]
+    assert registry.nbytes <= 2 * size
+
+
+def test_registry_deletes_the_oldest_spilled_tables(tmp_path):
+    table = make_table(1, 100)
+    table.save(str(tmp_path / 'size.npz'))
+    size = (tmp_path / 'size.npz').stat().st_size
+    (tmp_path / 'size.npz').unlink()
+    registry = _TableRegistry(max_tables=1, max_bytes=None, spill_dir=str(tmp_path), max_spill_bytes=2 * size)
+    for id in range(1, 6):
+        registry.append(make_table(id, 100))
+    assert registry.spilled == [3, 4]
+    assert registry.spilled_bytes <= 2 * size
+    assert 1 not in registry
+    assert len(list(next(tmp_path.iterdir()).iterdir())) == 2
+
+
+def test_tables_are_per_instance(monkeypatch):
+    def fake_get(self, payload, **kwargs):
+        yield chunks[0]
+
+    monkeypatch.setattr(Reports, '_get', fake_get)
+    first, second = fake_reports(), fake_reports()
+    table = first._create_table(payloads[0], False)
+    assert first.tables[table.id] is table
+    assert table.id not in second.tables
+
+
+def test_totals_cost_one_tiny_request(server, reports, client, payload):
+    payload['metricContainer']['metrics'].append({'columnId': '1', 'id': 'metrics/pageviews', 'filters': []})
+    payload['settings']['limit'] = 10
+    df = reports.get_dataframe(payload, totals=True)
+    assert list(df.index) == ['totals', 'filteredTotals', 'col-max', 'col-min']
+    assert list(df.columns) == ['metrics/visits', 'metrics/pageviews']
+    assert df.loc['col-max'].tolist() == [1000.0, 1000.0]
+    report = client.getReport(payload, totals=True, integer_metrics=True)
+    assert report['data'].loc['totals'].tolist() == df.loc['totals'].tolist()
+    assert payload['settings'] == {'limit': 10, 'page': 0}
+    assert sum(request[1].endswith('/reports') for request in server.requests) == 2
+
+
+def test_totals_without_summary_data_raise(client, payload):
+    class FakeResponse:
+        content = b'{"rows": [], "lastPage": true}'
+
+    class FakeAnalytics:
+        def reports(self, payload):
+            return FakeResponse()
+
+    with pytest.raises(ValueError, match='summaryData'):
+        fake_reports(FakeAnalytics()).get_dataframe(payload, totals=True)
+    client._postData = lambda *args, **kwargs: {'rows': [], 'lastPage': True}
+    with pytest.raises(ValueError, match='summaryData'):
+        client.getReport(payload, totals=True)
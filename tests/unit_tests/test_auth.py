@@ -1,10 +1,16 @@
 import os
 import pytest
 import requests
+import time
 import datetime
+import threading
 from unittest.mock import mock_open, patch
 
-from marketingcloud.jwt import JWTAuth, AuthenticationError, InvalidMethodInvocation
+from marketingcloud.jwt import JWTAuth, JWTAuthPool, AuthenticationError, InvalidMethodInvocation
+from marketingcloud.analytics import Analytics
+from marketingcloud.httpcache import HTTPCache
+from marketingcloud.quota import QuotaTracker, Budget, call_priority
+from marketingcloud.transport import Transport as BaseTransport
 
 
 @pytest.fixture
@@ -118,3 +124,206 @@ def test_wrong_method_invocation(monkeypatch, auth_client, fake_private_key, suc
     with patch('marketingcloud.jwt.open', mock_open(read_data=fake_private_key)):
         with pytest.raises(InvalidMethodInvocation):
             auth_client.request("wrong_method", "fake_url")
+
+
+@pytest.fixture
+def fake_transport():
+    class Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.content = b'{"content": []}'
+            self.headers = {'Retry-After': '0'}
+
+    class Transport(BaseTransport):
+        def __init__(self, statuses):
+            self.headers = {}
+            self.sent_headers = []
+            self.statuses = list(statuses)
+
+        def request(self, method, url, **kwargs):
+            self.sent_headers.append(kwargs.get('headers'))
+            return Response(self.statuses.pop(0))
+
+        def update_headers(self, headers):
+            self.headers.update(headers)
+
+    return Transport
+
+
+def test_request_emits_lifecycle_events(monkeypatch, auth_client, successful_token_response, fake_transport):
+    monkeypatch.setattr(auth_client, 'get_token', lambda: successful_token_response.json())
+    auth_client.transport = fake_transport([200])
+    events = []
+    for event in auth_client.hooks.EVENTS:
+        auth_client.hooks.register(event, events.append)
+    auth_client.request('get', 'https://analytics.adobe.io/api/{company_id}/users', params={'page': 2})
+    assert [e['event'] for e in events] == ['token_refresh', 'request_start', 'request_end']
+    assert events[-1]['endpoint'] == '/api/XYZ/users'
+    assert events[-1]['method'] == 'GET'
+    assert events[-1]['page'] == 2
+    assert events[-1]['status'] == 200
+    assert events[-1]['response_bytes'] == 15
+    assert events[-1]['latency'] >= 0
+
+
+def test_request_retries_and_emits_retry(monkeypatch, auth_client, successful_token_response, fake_transport):
+    monkeypatch.setattr(auth_client, 'get_token', lambda: successful_token_response.json())
+    auth_client.transport = fake_transport([429, 503, 200])
+    auth_client.max_retries = 2
+    retries = []
+    auth_client.hooks.register('retry', retries.append)
+    response = auth_client.request('get', 'fake_url')
+    assert response.status_code == 200
+    assert [(r['status'], r['attempt']) for r in retries] == [(429, 1), (503, 2)]
+
+
+def test_request_uses_transport_with_auth_headers(monkeypatch, auth_client, successful_token_response,
+                                                  fake_transport):
+    monkeypatch.setattr(auth_client, 'get_token', lambda: successful_token_response.json())
+    auth_client.transport = fake_transport([200])
+    auth_client.request('get', 'fake_url')
+    assert auth_client.transport.sent_headers[0]['Authorization'] == 'Bearer test_token'
+    assert auth_client.transport.sent_headers[0]['x-proxy-global-company-id'] == 'XYZ'
+    assert auth_client.transport.headers == {}
+
+
+def test_clients_sharing_a_transport_keep_their_credentials(monkeypatch, fake_transport):
+    transport = fake_transport([200] * 3)
+    clients = [JWTAuth(pool_config(client), transport=transport) for client in ('client1', 'client2')]
+    for client, token in zip(clients, ('token1', 'token2')):
+        monkeypatch.setattr(client, 'get_token', lambda token=token: {'access_token': token, 'expires_in': 86400000})
+    for client in (clients[0], clients[1], clients[0]):
+        client.request('post', 'fake_url')
+    assert [(headers['x-api-key'], headers['Authorization']) for headers in transport.sent_headers] == \
+        [('client1', 'Bearer token1'), ('client2', 'Bearer token2'), ('client1', 'Bearer token1')]
+
+
+def test_concurrent_requests_refresh_the_token_once(monkeypatch, auth_client, successful_token_response,
+                                                    fake_transport):
+    refreshes = []
+
+    def get_token():
+        refreshes.append(1)
+        time.sleep(0.05)
+        return successful_token_response.json()
+    monkeypatch.setattr(auth_client, 'get_token', get_token)
+    auth_client.transport = fake_transport([200] * 4)
+    threads = [threading.Thread(target=auth_client.request, args=('post', 'fake_url')) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(refreshes) == 1
+    assert auth_client.transport.statuses == []
+
+
+def pool_config(client):
+    return {
+        "iss": "XYZ@AdobeOrg",
+        "sub": "XYZ@techacct.adobe.com",
+        "aud": f"https://ims-na1.adobelogin.com/c/{client}",
+        "privateKeyPath": "/path/to/private/key",
+        "clientSecret": "XYZ",
+        "companyId": "XYZ"
+    }
+
+
+def test_pool_prefers_credentials_with_quota(monkeypatch, successful_token_response, fake_transport):
+    tracker = QuotaTracker()
+    pool = JWTAuthPool([pool_config('A'), pool_config('B')], quota=tracker)
+    for member in pool.members:
+        monkeypatch.setattr(member, 'get_token', lambda: successful_token_response.json())
+        member.transport = fake_transport([200] * 5)
+    tracker.set_budget('A', Budget(per_minute=1, policy='reject'))
+    for _ in range(4):
+        pool.request('get', 'fake_url')
+    assert tracker.usage('A')['minute'] == 1
+    assert tracker.usage('B')['minute'] == 3
+    assert tracker.usage('XYZ')['minute'] == 4
+
+
+def test_pool_uses_the_call_priority(monkeypatch, successful_token_response, fake_transport):
+    tracker = QuotaTracker()
+    pool = JWTAuthPool([pool_config('A'), pool_config('B')], quota=tracker)
+    for member in pool.members:
+        monkeypatch.setattr(member, 'get_token', lambda: successful_token_response.json())
+        member.transport = fake_transport([200])
+    tracker.set_budget('A', Budget(per_minute=1, reserved=1, policy='reject'))
+    with call_priority('high'):
+        pool.request('post', 'fake_url')
+    assert tracker.usage('A')['minute'] == 1
+    assert tracker.usage('B')['minute'] == 0
+
+
+def test_pool_members_get_their_own_transport(fake_transport):
+    pool = JWTAuthPool([pool_config('A'), pool_config('B')], transport_factory=lambda: fake_transport([]))
+    assert pool.members[0].transport is not pool.members[1].transport
+    with pytest.raises(TypeError):
+        JWTAuthPool([pool_config('A'), pool_config('B')], transport=fake_transport([]))
+
+
+def test_analytics_accepts_pool():
+    pool = JWTAuthPool([pool_config('A'), pool_config('B')])
+    assert Analytics(pool).session is pool
+
+
+def test_concurrent_identical_gets_share_one_request(monkeypatch, auth_client, successful_token_response,
+                                                     fake_transport):
+    monkeypatch.setattr(auth_client, 'get_token', lambda: successful_token_response.json())
+    transport = auth_client.transport = fake_transport([200] * 3)
+    auth_client.request('get', 'fake_url')
+    release = threading.Event()
+    send = transport.request
+
+    def slow_request(method, url, **kwargs):
+        release.wait(5)
+        return send(method, url, **kwargs)
+    transport.request = slow_request
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(
+        auth_client.request('get', 'fake_url', params={'limit': 10}))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while not auth_client.single_flight._calls or \
+            next(iter(auth_client.single_flight._calls.values())).waiters < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(responses) == 4 and all(response is responses[0] for response in responses)
+    assert transport.statuses == [200]
+    auth_client.request('post', 'fake_url')
+    assert transport.statuses == []
+
+
+def test_shared_cache_keeps_companies_apart(monkeypatch, successful_token_response):
+    class Response:
+        status_code = 200
+
+        def __init__(self, url):
+            self.content = url.encode('utf8')
+            self.headers = {'ETag': '"v1"', 'Cache-Control': 'max-age=60'}
+
+    class Transport(BaseTransport):
+        def __init__(self):
+            self.urls = []
+
+        def request(self, method, url, **kwargs):
+            self.urls.append(url)
+            return Response(url)
+
+        def update_headers(self, headers):
+            pass
+
+    cache = HTTPCache()
+    transport = Transport()
+    clients = [JWTAuth(dict(pool_config('A'), companyId=company), cache=cache, transport=transport)
+               for company in ('companyA', 'companyB')]
+    for client in clients:
+        monkeypatch.setattr(client, 'get_token', lambda: successful_token_response.json())
+    url = 'https://analytics.adobe.io/api/{company_id}/dimensions'
+    first, second = (client.request('get', url) for client in clients)
+    assert first.content == b'https://analytics.adobe.io/api/companyA/dimensions'
+    assert second.content == b'https://analytics.adobe.io/api/companyB/dimensions'
+    assert clients[0].request('get', url) is first
+    assert len(transport.urls) == 2
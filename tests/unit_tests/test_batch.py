@@ -0,0 +1,164 @@
+import time
+import threading
+
+import pytest
+
+from marketingcloud.batch import BatchExecutor, DeadlineExceededError, canonical
+from marketingcloud.quota import QuotaTracker, Budget, QuotaExceededError, current_priority
+
+
+def payload(rsid, page=0):
+    return {'rsid': rsid, 'dimension': 'variables/page',
+            'metricContainer': {'metrics': [{'columnId': '0', 'id': 'metrics/visits'}]},
+            'settings': {'limit': 50, 'page': page}}
+
+
+class Gate:
+    """Blocks the first report until released so the following ones queue up"""
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.order = []
+        self.calls = 0
+
+    def __call__(self, report):
+        self.calls += 1
+        if report['rsid'] == 'blocker':
+            self.started.set()
+            self.release.wait(5)
+        self.order.append(report['rsid'])
+        return report['rsid']
+
+
+def test_canonical_ignores_key_order_and_page():
+    reordered = {'settings': {'page': 3, 'limit': 50}, 'metricContainer': payload('a')['metricContainer'],
+                 'dimension': 'variables/page', 'rsid': 'a'}
+    assert canonical(payload('a')) == canonical(reordered)
+    assert canonical(payload('a')) != canonical(payload('b'))
+
+
+def test_high_priority_jumps_ahead_of_backfill():
+    gate = Gate()
+    with BatchExecutor(gate, max_workers=1) as executor:
+        executor.submit(payload('blocker'))
+        assert gate.started.wait(5)
+        backfill = executor.map([payload(f'backfill{i}') for i in range(3)], priority='low')
+        interactive = executor.submit(payload('interactive'), priority='high')
+        gate.release.set()
+        assert interactive.result(5) == 'interactive'
+        assert [future.result(5) for future in backfill] == ['backfill0', 'backfill1', 'backfill2']
+    assert gate.order == ['blocker', 'interactive', 'backfill0', 'backfill1', 'backfill2']
+
+
+def test_earlier_deadline_goes_first_within_a_priority():
+    gate = Gate()
+    with BatchExecutor(gate, max_workers=1) as executor:
+        executor.submit(payload('blocker'))
+        assert gate.started.wait(5)
+        executor.submit(payload('late'), deadline=60)
+        executor.submit(payload('soon'), deadline=10)
+        gate.release.set()
+    assert gate.order == ['blocker', 'soon', 'late']
+
+
+def test_identical_payloads_share_one_run():
+    gate = Gate()
+    with BatchExecutor(gate, max_workers=1) as executor:
+        executor.submit(payload('blocker'))
+        assert gate.started.wait(5)
+        first = executor.submit(payload('a'), priority='low')
+        second = executor.submit(payload('a', page=2), priority='high')
+        other = executor.submit(payload('b'))
+        assert first is second
+        assert len(executor) == 3
+        gate.release.set()
+        assert first.result(5) == 'a'
+        other.result(5)
+    assert gate.calls == 3
+    # the resubmission with priority 'high' moved the queued job ahead of 'b'
+    assert gate.order == ['blocker', 'a', 'b']
+
+
+def test_job_queued_twice_is_handed_out_once():
+    executor = BatchExecutor(lambda report: None, max_workers=0)
+    future = executor.submit(payload('a'))
+    with executor._condition:
+        executor._push(executor._jobs[canonical(payload('a'))])
+    assert executor._next().future is future
+    assert future.running()
+    executor.shutdown()
+    assert executor._next() is None
+
+
+def test_cancelled_job_is_skipped_and_can_be_resubmitted():
+    gate = Gate()
+    with BatchExecutor(gate, max_workers=1) as executor:
+        executor.submit(payload('blocker'))
+        assert gate.started.wait(5)
+        cancelled = executor.submit(payload('a'), priority='low')
+        assert cancelled.cancel()
+        resubmitted = executor.submit(payload('a'), priority='high')
+        assert resubmitted is not cancelled
+        gate.release.set()
+        assert resubmitted.result(5) == 'a'
+        assert executor.submit(payload('b')).result(5) == 'b'
+    assert gate.order == ['blocker', 'a', 'b']
+
+
+def test_missed_deadline_fails_the_future():
+    gate = Gate()
+    with BatchExecutor(gate, max_workers=1) as executor:
+        executor.submit(payload('blocker'))
+        assert gate.started.wait(5)
+        future = executor.submit(payload('a'), deadline=0.01)
+        time.sleep(0.05)
+        gate.release.set()
+        with pytest.raises(DeadlineExceededError):
+            future.result(5)
+    assert 'a' not in gate.order
+
+
+def test_stream_yields_every_payload_and_raises_failures():
+    def run(report):
+        if report['rsid'] == 'broken':
+            raise ValueError('broken')
+        return report['rsid'].upper()
+    with BatchExecutor(run, max_workers=2) as executor:
+        results = dict((report['rsid'], result) for report, result in
+                       executor.stream([payload('a'), payload('b'), payload('a')]))
+        assert results == {'a': 'A', 'b': 'B'}
+        with pytest.raises(ValueError):
+            list(executor.stream([payload('broken')]))
+
+
+def test_runs_get_a_copy_of_the_payload():
+    def run(report):
+        report['settings']['page'] = 99
+        return report
+    original = payload('a')
+    with BatchExecutor(run) as executor:
+        executor.submit(original).result(5)
+    assert original['settings']['page'] == 0
+
+
+def test_workers_call_with_the_job_priority():
+    tracker = QuotaTracker()
+    tracker.set_budget('XYZ', Budget(per_minute=2, reserved=2, policy='reject'))
+
+    def run(report):
+        tracker.acquire('XYZ', priority=current_priority())
+        return current_priority()
+    with BatchExecutor(run, max_workers=1) as executor:
+        assert executor.submit(payload('a'), priority='high').result(5) == 'high'
+        with pytest.raises(QuotaExceededError):
+            executor.submit(payload('b')).result(5)
+    assert current_priority() == 'normal'
+
+
+def test_submit_validates_priority_and_shutdown():
+    executor = BatchExecutor(lambda report: None)
+    with pytest.raises(ValueError):
+        executor.submit(payload('a'), priority='urgent')
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(payload('a'))
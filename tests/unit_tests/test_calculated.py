@@ -0,0 +1,129 @@
+import numpy
+import pandas
+import pytest
+
+from marketingcloud import aanalytics2, calculated
+
+PAGEVIEWS_PER_VISIT = {
+    'id': 'cm1_pv',
+    'definition': {
+        'func': 'calc-metric',
+        'version': [1, 0, 0],
+        'formula': {'func': 'divide',
+                    'col1': {'func': 'metric', 'name': 'metrics/pageviews'},
+                    'col2': {'func': 'metric', 'name': 'metrics/visits'}}
+    }
+}
+ORDERS_PLUS_TEN_PERCENT = {'func': 'multiply',
+                           'col1': {'func': 'add',
+                                    'col1': {'func': 'metric', 'name': 'metrics/orders'},
+                                    'col2': {'func': 'number', 'val': 1}},
+                           'col2': {'func': 'number', 'val': 1.1}}
+SEGMENTED = {'func': 'segment', 'segment_id': 's1', 'metric': {'func': 'metric', 'name': 'metrics/visits'}}
+
+
+@pytest.fixture
+def df():
+    return pandas.DataFrame({'metrics/pageviews': [10, 5, 0], 'metrics/visits': [5, 0, 0], 'metrics/orders': [1, 2, 3]},
+                            index=['a', 'b', 'c'])
+
+
+def test_operands():
+    assert calculated.operands(PAGEVIEWS_PER_VISIT) == {'metrics/pageviews', 'metrics/visits'}
+    with pytest.raises(calculated.UnsupportedFormulaError):
+        calculated.operands(SEGMENTED)
+
+
+def test_divide_by_zero_is_zero(df):
+    assert calculated.evaluate(PAGEVIEWS_PER_VISIT, df).tolist() == [2.0, 0.0, 0.0]
+
+
+def test_nested_formula(df):
+    numpy.testing.assert_allclose(calculated.evaluate(ORDERS_PLUS_TEN_PERCENT, df), [2.2, 3.3, 4.4])
+
+
+def test_add_calculated_metrics_reports_missing(df):
+    df, missing = calculated.add_calculated_metrics(df, {'cm1_pv': PAGEVIEWS_PER_VISIT, 'cm2': SEGMENTED,
+                                                         'cm3': None, 'cm4': {'func': 'metric', 'name': 'metrics/revenue'}})
+    assert df['cm1_pv'].tolist() == [2.0, 0.0, 0.0]
+    assert missing == ['cm2', 'cm3', 'cm4']
+
+
+def test_definitions_from_catalog():
+    catalog = pandas.DataFrame([PAGEVIEWS_PER_VISIT, {'id': 'cm2', 'definition': None}])
+    assert calculated.definitions(catalog) == {'cm1_pv': PAGEVIEWS_PER_VISIT['definition']}
+
+
+def test_calculated_metrics_against_fake(server, reports, client, payload):
+    payload['metricContainer']['metrics'].append({'columnId': '1', 'id': 'metrics/pageviews', 'filters': []})
+    df = reports.get_dataframe(dict(payload, settings=dict(payload['settings'])))
+    calls = len([r for r in server.requests if r[1].endswith('/reports')])
+    ratio = {'formula': {'func': 'divide', 'col1': {'func': 'metric', 'name': 'metrics/pageviews'},
+                         'col2': {'func': 'metric', 'name': 'metrics/visits'}}}
+    df = reports.add_calculated_metrics(df, payload, ['cm1_ratio', 'cm2_unknown'], definitions={'cm1_ratio': ratio})
+    assert ('GET', '/api/FAKECOMPANY/calculatedmetrics/cm2_unknown') in server.requests
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == calls + 2
+    assert list(df.columns) == ['metrics/visits', 'metrics/pageviews', 'cm1_ratio', 'cm2_unknown']
+    row = df.iloc[1]
+    assert row['cm1_ratio'] == pytest.approx(row['metrics/pageviews'] / row['metrics/visits'])
+
+    data = client.getReport(payload, n_result='inf')['data']
+    data = client.addCalculatedMetrics(data, payload, ['cm1_ratio'], definitions={'cm1_ratio': ratio})
+    assert data['cm1_ratio'].tolist() == df['cm1_ratio'].tolist()
+
+
+def test_requested_metrics_only_fetch_the_items_of_df(server, reports, client, payload):
+    payload['settings']['limit'] = 10
+    df = reports.get_dataframe(dict(payload, settings=dict(payload['settings'])), all_pages=False, item_ids=True)
+    calls = len([r for r in server.requests if r[1].endswith('/reports')])
+    df = reports.add_calculated_metrics(df, payload, ['cm2_unknown'])
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == calls + 1
+    assert df['cm2_unknown'].tolist() == df['metrics/visits'].tolist()
+
+    data = client.getReport(payload, n_result=10, item_ids=True)['data']
+    calls = len([r for r in server.requests if r[1].endswith('/reports')])
+    data = client.addCalculatedMetrics(data, payload, ['cm2_unknown'])
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == calls + 1
+    assert data['cm2_unknown'].tolist() == df['cm2_unknown'].tolist()
+
+
+def test_requested_metrics_align_on_item_ids(reports):
+    pages = {'metrics/visits': [{'itemId': '1', 'value': 'Home', 'data': [10.0]},
+                                {'itemId': '2', 'value': 'Home', 'data': [20.0]},
+                                {'itemId': '3', 'value': 'Cart', 'data': [30.0]}],
+             'cm_unknown': [{'itemId': '3', 'value': 'Cart', 'data': [0.3]},
+                            {'itemId': '2', 'value': 'Home', 'data': [0.2]},
+                            {'itemId': '1', 'value': 'Home', 'data': [0.1]}]}
+    client = aanalytics2.Client(companyid='XYZ')
+    client._calcDefinitions['cm_unknown'] = None
+
+    def post_data(endpoint, data=None, **kwargs):
+        rows = pages[data['metricContainer']['metrics'][0]['id']]
+        return {'rows': rows, 'numberOfElements': 3, 'totalElements': 3, 'lastPage': True}
+    client._postData = post_data
+    payload = {'rsid': 'rs1', 'globalFilters': [], 'dimension': 'variables/page', 'settings': {'limit': 50, 'page': 0},
+               'metricContainer': {'metrics': [{'columnId': '0', 'id': 'metrics/visits', 'filters': []}]}}
+    df = client.getReport(payload, item_ids=True)['data']
+    assert df.columns.tolist() == ['variables/page', 'itemId', 'metrics/visits']
+    df = client.addCalculatedMetrics(df, payload, ['cm_unknown'])
+    assert df['cm_unknown'].tolist() == [0.1, 0.2, 0.3]
+    with pytest.raises(ValueError):
+        client.addCalculatedMetrics(client.getReport(payload)['data'], payload, ['cm_unknown'])
+
+    class FakeResponse:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def json(self):
+            rows = pages[self.payload['metricContainer']['metrics'][0]['id']]
+            return {'rows': rows, 'numberOfElements': 3, 'totalElements': 3, 'lastPage': True,
+                    'columns': {'dimension': {'id': 'variables/page'}}}
+    reports.analytics_client.reports = FakeResponse
+    reports._calculated_definitions['cm_unknown'] = None
+    for projection in (False, True):
+        df = reports.get_dataframe(payload, projection=projection, item_ids=True)
+        assert df.columns.tolist() == ['itemId', 'metrics/visits']
+        df = reports.add_calculated_metrics(df, payload, ['cm_unknown'])
+        assert df['cm_unknown'].tolist() == [0.1, 0.2, 0.3]
+    with pytest.raises(ValueError):
+        reports.add_calculated_metrics(reports.get_dataframe(payload), payload, ['cm_unknown'])
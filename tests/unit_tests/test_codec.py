@@ -0,0 +1,72 @@
+import json
+import numpy
+import pytest
+
+from marketingcloud import codec
+
+
+page = {
+    'totalPages': 2,
+    'firstPage': True,
+    'lastPage': False,
+    'numberOfElements': 2,
+    'number': 0,
+    'totalElements': 4,
+    'columns': {'dimension': {'id': 'variables/daterangeday', 'type': 'time'}, 'columnIds': ['0', '1']},
+    'rows': [
+        {'itemId': '1191101', 'value': 'Nov 1, 2019', 'data': [10, 20], 'dataExpected': [9, 19]},
+        {'itemId': '1191102', 'value': 'Nov 2, 2019', 'data': [11.5, 21]}
+    ]
+}
+
+
+@pytest.fixture
+def restore_decoder():
+    yield
+    codec.set_decoder()
+
+
+def test_decode_uses_raw_content():
+    class Response:
+        content = json.dumps(page).encode('utf8')
+
+        def json(self):
+            raise AssertionError('json() must not be called')
+
+    assert codec.decode(Response()) == page
+
+
+def test_set_decoder(restore_decoder):
+    calls = []
+
+    def loads(data):
+        calls.append(data)
+        return json.loads(data)
+
+    codec.set_decoder(loads)
+    codec.loads(b'{}')
+    assert calls == [b'{}']
+
+
+def test_project_report_keeps_item_ids_values_data_and_paging():
+    projection = codec.project_report(json.dumps(page).encode('utf8'))
+    assert projection['itemIds'] == ['1191101', '1191102']
+    assert projection['values'] == ['Nov 1, 2019', 'Nov 2, 2019']
+    assert projection['data'].dtype == numpy.float64
+    assert projection['data'].tolist() == [[10, 20], [11.5, 21]]
+    assert set(projection) == {'itemIds', 'values', 'data', *codec.PAGING_FIELDS}
+
+
+def test_project_report_anomaly_fields_default_to_zero():
+    projection = codec.project_report(page, anomaly=True)
+    assert projection['dataExpected'].tolist() == [[9, 19], [0, 0]]
+    assert projection['dataLowerBound'].shape == (2, 2)
+
+
+def test_project_summary_reads_totals_and_statistics():
+    summary = codec.project_summary(dict(page, summaryData={
+        'totals': [21.5, 41], 'statistics': {'col-max': [11.5, 21], 'col-min': [10, 20]}}))
+    assert list(summary) == ['totals', 'col-max', 'col-min']
+    assert summary['totals'].dtype == numpy.float64
+    assert summary['col-min'].tolist() == [10, 20]
+    assert codec.project_summary(page) == {}
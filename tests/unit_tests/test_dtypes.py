@@ -0,0 +1,91 @@
+import numpy
+import pandas
+import pytest
+
+from marketingcloud import dtypes
+
+
+def test_string_pool_shares_codes():
+    pool = dtypes.StringPool()
+    assert pool.encode(['a', 'b', 'a']).tolist() == [0, 1, 0]
+    assert pool.encode(['c', 'b']).tolist() == [2, 1]
+    categorical = pool.categorical(['b', 'c'])
+    assert list(categorical) == ['b', 'c']
+    assert list(categorical.categories) == ['b', 'c']
+    assert categorical.codes.tolist() == [0, 1]
+    # frames using every value of the pool share its categories
+    assert pool.categorical(['c', 'a', 'b']).categories is pool.categorical(['b', 'a', 'c']).categories
+    assert list(pool.categorical([]).categories) == []
+
+
+def test_integer_metrics_from_catalog():
+    catalog = pandas.DataFrame([
+        {'id': 'metrics/visits', 'type': 'int', 'precision': 0},
+        {'id': 'metrics/revenue', 'type': 'currency', 'precision': 2},
+        {'id': 'metrics/orders', 'type': 'INT', 'precision': None},
+        {'id': 'metrics/bouncerate', 'type': 'percent', 'precision': 0},
+    ])
+    assert dtypes.integer_metrics(catalog) == {'metrics/visits', 'metrics/orders'}
+
+
+@pytest.mark.parametrize('values, dtype', [
+    ([1.0, 2.0, 127.0], numpy.int8),
+    ([-1.0, 40000.0], numpy.int32),
+    ([1.0, 2.5], numpy.float64),
+    ([1.0, numpy.nan], numpy.float64),
+])
+def test_downcast_integers(values, dtype):
+    assert dtypes.downcast_integers(numpy.array(values)).dtype == dtype
+
+
+def test_compact_index_and_duplicate_columns():
+    df = pandas.DataFrame([[1.0, 2.0, 0.5], [3.0, 4.0, 1.5]], columns=['metrics/visits', 'metrics/visits', 'cm1'],
+                          index=['x', 'y'])
+    df = dtypes.compact(df, pool=dtypes.StringPool(), integer_columns={'metrics/visits'})
+    assert isinstance(df.index, pandas.CategoricalIndex)
+    assert df.dtypes.tolist() == [numpy.int8, numpy.int8, numpy.float64]
+
+
+@pytest.mark.parametrize('dimension, values, expected', [
+    ('variables/daterangeday', ['Jan 1, 2019', 'Dec 31, 2019'], ['2019-01-01', '2019-12-31']),
+    ('variables/daterangemonth', ['Jan 2019', 'Feb 2019'], ['2019-01-01', '2019-02-01']),
+    ('variables/daterangequarter', ['Q1 2019', 'Q4 2019'], ['2019-01-01', '2019-10-01']),
+    ('variables/daterangehour', ['00:00 2019-01-01', '13:00 2019-01-01'], ['2019-01-01 00:00', '2019-01-01 13:00']),
+])
+def test_parse_time_dimension(dimension, values, expected):
+    index = dtypes.parse_time_dimension(values, dimension)
+    assert index.equals(pandas.DatetimeIndex(expected))
+    assert index.name == dimension
+
+
+def test_parse_time_dimension_timezone():
+    index = dtypes.parse_time_dimension(['Mar 10, 2019', 'Nov 3, 2019'], 'variables/daterangeday', timezone='US/Pacific')
+    assert str(index.tz) == 'US/Pacific'
+    assert [stamp.utcoffset().total_seconds() / 3600 for stamp in index] == [-8, -7]
+
+
+def test_parse_time_dimension_ignores_other_dimensions():
+    assert dtypes.parse_time_dimension(['page 1'], 'variables/page') is None
+    assert dtypes.parse_time_dimension(['not a date'], 'variables/daterangeday') is None
+
+
+def test_compact_dtypes_against_fake(reports, client, payload):
+    payload['metricContainer']['metrics'].append({'columnId': '1', 'id': 'metrics/revenue', 'filters': []})
+    df = reports.get_dataframe(payload, categorical=True, integer_metrics=True)
+    assert isinstance(df.index, pandas.CategoricalIndex)
+    assert df['metrics/visits'].dtype.kind == 'i'
+    assert df['metrics/revenue'].dtype == 'float64'
+    report = client.getReport(payload, n_result='inf', categorical=True, integer_metrics=True)
+    assert report['data']['variables/page'].dtype == 'category'
+    assert report['data']['metrics/visits'].dtype.kind == 'i'
+
+
+def test_parse_dates_against_fake(reports, client, payload):
+    payload['dimension'] = 'variables/daterangeday'
+    df = reports.get_dataframe(dict(payload, settings=dict(payload['settings'])), parse_dates=True)
+    assert isinstance(df.index, pandas.DatetimeIndex)
+    assert str(df.index.tz) == 'US/Pacific'
+    assert df.index[0] == pandas.Timestamp('2019-01-01', tz='US/Pacific')
+    report = client.getReport(payload, n_result='inf', parse_dates=True, timezone='Europe/Berlin')
+    assert str(report['data']['variables/daterangeday'].dt.tz) == 'Europe/Berlin'
+    assert client.getTimezone('fakersid') == 'US/Pacific'
@@ -0,0 +1,78 @@
+import pytest
+
+from marketingcloud.estimate import estimate, probe_payload, pages_needed, API_RATE_LIMIT
+from marketingcloud.fakeserver import report_page
+from marketingcloud.quota import QuotaTracker, Budget
+
+PAYLOAD = {
+    'rsid': 'fakersid',
+    'metricContainer': {'metrics': [{'columnId': '0', 'id': 'metrics/visits'}]},
+    'dimension': 'variables/page',
+    'settings': {'limit': 1000, 'page': 3, 'includeAnomalyDetection': True}
+}
+
+
+class Probe:
+    def __init__(self, total_rows):
+        self.total_rows = total_rows
+        self.payloads = []
+
+    def __call__(self, payload):
+        self.payloads.append(payload)
+        return report_page(payload, self.total_rows)
+
+
+def test_probe_payload_requests_one_row():
+    probe = probe_payload(PAYLOAD)
+    assert probe['settings'] == {'limit': 1, 'page': 0}
+    assert PAYLOAD['settings']['limit'] == 1000
+
+
+def test_pages_needed():
+    assert pages_needed(0, 50) == 1
+    assert pages_needed(100, 50) == 2
+    assert pages_needed(101, 50) == 3
+
+
+def test_single_probe_and_page_size_of_the_payload():
+    probe = Probe(10500)
+    result = estimate(probe, PAYLOAD, latency=0.5)
+    assert len(probe.payloads) == 1 and probe.payloads[0]['settings']['limit'] == 1
+    assert result.total_rows == 10500
+    assert result.pages == 11
+    assert result.calls == 12
+    assert result.quota_minutes == pytest.approx(11 / API_RATE_LIMIT)
+    assert result.wall_time == pytest.approx(11 * 0.5)
+
+
+def test_plan_applies_shards_breakdowns_rsids_and_max_rows():
+    result = estimate(Probe(10500), PAYLOAD, page_size=5000, shards=4, breakdowns=10, breakdown_rows=6000,
+                      rsids=['a', 'b', 'c'], latency=0)
+    # 4 shards of 2625 rows, one page each, and 10 breakdowns of 2 pages, for 3 report suites
+    assert result.pages == 3 * (4 + 20)
+    capped = estimate(Probe(10500), PAYLOAD, max_rows=2500, latency=0)
+    assert capped.rows == 2500
+    assert capped.pages == 3
+
+
+def test_rate_comes_from_the_company_budget():
+    tracker = QuotaTracker()
+    tracker.set_budget('XYZ', Budget(per_minute=60, reserved=20))
+    result = estimate(Probe(100000), PAYLOAD, company_id='XYZ', quota=tracker, concurrency=4, latency=0.2)
+    assert result.per_minute == 40
+    assert result.quota_minutes == pytest.approx(100 / 40)
+    assert result.wall_time == pytest.approx(150)
+    assert estimate(Probe(100000), PAYLOAD, company_id='XYZ', quota=tracker, priority='high').per_minute == 60
+
+
+def test_failed_probe_raises():
+    with pytest.raises(ValueError):
+        estimate(lambda payload: {'errorCode': 'invalid'}, PAYLOAD)
+
+
+def test_estimate_costs_one_request(server, reports, client, payload):
+    payload['settings']['limit'] = 10
+    assert reports.estimate(payload).pages == 10
+    estimate = client.estimateReport(payload, n_result=40, rsids=['a', 'b'])
+    assert (estimate.total_rows, estimate.pages) == (95, 8)
+    assert sum(request[1].endswith('/reports') for request in server.requests) == 2
@@ -0,0 +1,71 @@
+import pandas
+
+from marketingcloud import aanalytics2
+from marketingcloud.analytics import Analytics
+from marketingcloud.fakeserver import FakeAnalyticsServer
+
+
+def test_paged_collections(server, make_auth):
+    analytics = Analytics(make_auth(server), base_url=server.base_url)
+    response = analytics.get_segments(limit=10, page=2).json()
+    assert response['totalPages'] == 3
+    assert response['lastPage']
+    assert len(response['content']) == 5
+    assert ('POST', '/ims/exchange/jwt') in server.requests
+
+
+def test_reports_walk_all_pages(server, reports, payload):
+    payload['metricContainer']['metrics'].append({'columnId': '1', 'id': 'metrics/pageviews'})
+    payload['dimension'] = 'variables/daterangeday'
+    payload['settings'] = {'limit': 10, 'page': 0, 'includeAnomalyDetection': True}
+    df = reports.get_dataframe(payload)
+    assert isinstance(df, pandas.DataFrame)
+    assert df.shape == (95, 2)
+    assert df.index[0] == 'Jan 1, 2019'
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == 10
+
+
+def test_rate_limit_is_retried(monkeypatch, server, make_auth):
+    monkeypatch.setattr('marketingcloud.jwt.time.sleep', lambda seconds: None)
+    server.rate_limit = 1
+    auth = make_auth(server, max_retries=1)
+    retries = []
+
+    def on_retry(event):
+        retries.append(event)
+        server.rate_limit = None
+
+    auth.hooks.register('retry', on_retry)
+    analytics = Analytics(auth, base_url=server.base_url)
+    assert analytics.users().status_code == 200
+    assert analytics.users().status_code == 200
+    assert [(r['status'], r['attempt']) for r in retries] == [(429, 1)]
+    assert 0 < retries[0]['wait'] <= 60
+
+
+def test_injected_errors(make_auth):
+    with FakeAnalyticsServer(error_rate=1.0) as server:
+        analytics = Analytics(make_auth(server), base_url=server.base_url)
+        response = analytics.session.request('get', server.base_url + '/users')
+        assert response.status_code == 500
+        assert response.json()['errorCode'] == 'internal_error'
+
+
+def test_aanalytics2_client_against_fake(server, private_key_path, payload):
+    client = aanalytics2.Client(org_id='XYZ@AdobeOrg', api_key='XYZ', tech_id='XYZ@techacct.adobe.com',
+                                secret='XYZ', pathToKey=private_key_path, host=server.url,
+                                tokenEndpoint=server.token_endpoint)
+    assert client.getCompanyId('first') == FakeAnalyticsServer.COMPANY_ID
+    payload['globalFilters'] = [{'type': 'dateRange',
+                                 'dateRange': '2019-01-01T00:00:00.000/2019-12-31T00:00:00.000'}]
+    report = client.getReport(payload, n_result='inf')
+    assert report['data'].shape == (95, 2)
+
+
+def test_request_recording_is_bounded(make_auth):
+    for max_requests, recorded in ((2, 2), (0, 0)):
+        with FakeAnalyticsServer(max_requests=max_requests) as server:
+            analytics = Analytics(make_auth(server), base_url=server.base_url)
+            for _ in range(3):
+                analytics.users()
+            assert list(server.requests) == [('GET', f'/api/{FakeAnalyticsServer.COMPANY_ID}/users')] * recorded
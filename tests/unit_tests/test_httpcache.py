@@ -0,0 +1,130 @@
+import pytest
+
+from marketingcloud.analytics import Analytics
+from marketingcloud.fakeserver import FakeAnalyticsServer
+from marketingcloud.httpcache import HTTPCache, max_age
+
+
+class Response:
+    def __init__(self, status_code=200, headers=None, content=b'{}'):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+
+class Server:
+    """Answers like an origin server, recording the request headers it receives"""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, headers):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+URL = 'https://analytics.adobe.io/api/XYZ/dimensions'
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    return HTTPCache(clock=clock)
+
+
+def test_max_age():
+    assert max_age({'Cache-Control': 'private, max-age=60'}) == 60
+    assert max_age({'Cache-Control': 'no-cache'}) == 0
+    assert max_age({'Cache-Control': 'no-store'}) is None
+    assert max_age({}) == 0
+
+
+def test_cacheable_paths(cache):
+    assert cache.cacheable(URL)
+    assert cache.cacheable('https://analytics.adobe.io/api/XYZ/collections/suites/rsid')
+    assert cache.cacheable('https://analytics.adobe.io/api/XYZ/metrics/metrics%2Fvisits')
+    assert not cache.cacheable('https://analytics.adobe.io/api/XYZ/segments')
+    assert not cache.cacheable('https://analytics.adobe.io/api/XYZ/reports')
+
+
+def test_etag_revalidation_serves_the_stored_body(cache):
+    first = Response(headers={'ETag': '"v1"'}, content=b'[1]')
+    server = Server(first, Response(304, {'ETag': '"v1"'}, b''))
+    assert cache.fetch('key', URL, server) is first
+    assert cache.fetch('key', URL, server, headers={'Accept': 'application/json'}) is first
+    assert server.requests[1] == {'Accept': 'application/json', 'If-None-Match': '"v1"'}
+
+
+def test_changed_resource_replaces_the_entry(cache):
+    changed = Response(headers={'Last-Modified': 'Tue, 01 Jan 2019 00:00:00 GMT'}, content=b'[2]')
+    server = Server(Response(headers={'ETag': '"v1"'}), changed, Response(304))
+    cache.fetch('key', URL, server)
+    assert cache.fetch('key', URL, server) is changed
+    assert cache.fetch('key', URL, server) is changed
+    assert server.requests[2] == {'If-Modified-Since': 'Tue, 01 Jan 2019 00:00:00 GMT'}
+
+
+def test_fresh_responses_cost_no_request(cache, clock):
+    fresh = Response(headers={'Cache-Control': 'max-age=60', 'ETag': '"v1"'})
+    server = Server(fresh, Response(304, {'Cache-Control': 'max-age=60'}))
+    cache.fetch('key', URL, server)
+    clock.now += 30
+    assert cache.fetch('key', URL, server) is fresh
+    assert len(server.requests) == 1
+    clock.now += 31
+    assert cache.fetch('key', URL, server) is fresh
+    assert len(server.requests) == 2
+
+
+def test_uncacheable_responses_are_not_stored(cache):
+    server = Server(Response(), Response(headers={'ETag': '"v1"', 'Cache-Control': 'no-store'}),
+                    Response(500, {'ETag': '"v1"'}), Response(headers={'ETag': '"v1"'}))
+    for _ in range(3):
+        cache.fetch('key', URL, server)
+    assert len(cache) == 0
+    cache.fetch('key', 'https://analytics.adobe.io/api/XYZ/segments', server)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = HTTPCache(max_entries=2, clock=clock)
+    for key in ('a', 'b', 'a', 'c'):
+        cache.fetch(key, URL, lambda headers: Response(headers={'ETag': '"v1"'}))
+    assert len(cache) == 2
+    assert set(cache._entries) == {'a', 'c'}
+
+
+def test_metadata_revalidated_with_etag(server, make_auth):
+    analytics = Analytics(make_auth(server), base_url=server.base_url)
+    events = []
+    analytics.session.hooks.register('request_end', events.append)
+    first = analytics.get_dimensions('fakersid').json()
+    second = analytics.get_dimensions('fakersid').json()
+    assert first == second
+    assert [request for request in server.requests if request[1].endswith('/dimensions')] == \
+        [('GET', f'/api/{FakeAnalyticsServer.COMPANY_ID}/dimensions')] * 2
+    assert [event['status'] for event in events] == [200, 304]
+    assert events[-1]['response_bytes'] == 0
+    analytics.get_segments()
+    analytics.get_segments()
+    assert len(analytics.session.cache) == 1
+
+
+def test_metadata_served_from_cache_while_fresh(make_auth):
+    with FakeAnalyticsServer(max_age=60) as server:
+        analytics = Analytics(make_auth(server), base_url=server.base_url)
+        for _ in range(3):
+            analytics.get_metrics('fakersid')
+        assert sum(request[1].endswith('/metrics') for request in server.requests) == 1
@@ -0,0 +1,82 @@
+import pytest
+
+from marketingcloud import aanalytics2
+from marketingcloud.analytics_reports import Reports
+from marketingcloud.dtypes import StringPool
+from marketingcloud.fakeserver import FakeAnalyticsServer, report_page
+from marketingcloud.items import ItemDictionary
+
+PAYLOAD = {
+    'rsid': 'fakersid',
+    'metricContainer': {'metrics': [{'columnId': '0', 'id': 'metrics/visits', 'filters': []}]},
+    'dimension': 'variables/page',
+    'settings': {'limit': 10, 'page': 0}
+}
+
+
+def test_record_page_and_lookups():
+    items = ItemDictionary()
+    items.record_page(PAYLOAD, report_page(PAYLOAD, 25))
+    assert len(items) == 10
+    assert items.value('fakersid', 'variables/page', '1000003') == 'page 3'
+    assert items.values('fakersid', 'variables/page', ['1000000', 'unknown']) == ['page 0', None]
+    assert items.item_ids('fakersid', 'variables/page', 'page 9') == ['1000009']
+    assert ('fakersid', 'variables/page', '1000001') in items
+    assert ('otherrsid', 'variables/page', '1000001') not in items
+    assert items.value('otherrsid', 'variables/page', '1000001', default='?') == '?'
+
+
+def test_shared_values_are_stored_once_and_kept_apart():
+    pool = StringPool()
+    items = ItemDictionary(pool)
+    items.record('rs1', 'variables/page', ['1', '2'], ['Home', 'Home'])
+    items.record('rs2', 'variables/evar1', ['9'], ['Home'])
+    assert len(pool) == 1
+    assert items.item_ids('rs1', 'variables/page', 'Home') == ['1', '2']
+    assert items.breakdown_filters('rs1', 'variables/page', 'Home') == [
+        {'type': 'breakdown', 'dimension': 'variables/page', 'itemId': '1'},
+        {'type': 'breakdown', 'dimension': 'variables/page', 'itemId': '2'}]
+    with pytest.raises(KeyError):
+        items.breakdown_filters('rs1', 'variables/page', 'Checkout')
+
+
+def test_renamed_item_moves_to_its_new_value():
+    items = ItemDictionary()
+    items.record('rs1', 'variables/page', ['1', '2'], ['Home', 'Home'])
+    items.record('rs1', 'variables/page', ['1', '3'], ['Start', 'Home'])
+    assert items.item_ids('rs1', 'variables/page', 'Home') == ['2', '3']
+    assert items.item_ids('rs1', 'variables/page', 'Start') == ['1']
+    assert items.item_ids('rs1', 'variables/page', 'Cart') == []
+    items.clear()
+    assert items.item_ids('rs1', 'variables/page', 'Home') == []
+
+
+def test_pages_without_item_ids_are_ignored():
+    items = ItemDictionary()
+    items.record_page(PAYLOAD, {'rows': [], 'lastPage': True})
+    items.record_page(PAYLOAD, {'values': ['page 0'], 'data': [[1.0]]})
+    assert len(items) == 0
+
+
+def test_read_data_keys_rows_by_item_id():
+    rows = [{'itemId': '1', 'value': 'Home', 'data': [1.0]},
+            {'itemId': '2', 'value': 'Home', 'data': [2.0]},
+            {'itemId': '3', 'value': 'Cart', 'data': [3.0]}]
+    df = aanalytics2._readData(rows, cols=['variables/page', 'metrics/visits'])
+    assert df['variables/page'].tolist() == ['Home', 'Home', 'Cart']
+    assert df['metrics/visits'].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_report_pages_fill_the_item_dictionary(server, make_auth, private_key_path, payload):
+    items = ItemDictionary()
+    reports = Reports(make_auth(server), base_url=server.base_url, items=items)
+    reports.get_dataframe(dict(payload, settings=dict(payload['settings'])), projection=True)
+    assert len(items) == 95
+    client = aanalytics2.Client(org_id='XYZ@AdobeOrg', api_key='XYZ', tech_id='XYZ@techacct.adobe.com',
+                                secret='XYZ', pathToKey=private_key_path, host=server.url,
+                                tokenEndpoint=server.token_endpoint, companyid=FakeAnalyticsServer.COMPANY_ID,
+                                items=items)
+    client.getReport(dict(payload, dimension='variables/evar1'), n_result='inf', projection=True)
+    assert items.value('fakersid', 'variables/evar1', '1000042') == 'evar1 42'
+    assert items.item_ids('fakersid', 'variables/page', 'page 42') == ['1000042']
+    assert len(items) == 190
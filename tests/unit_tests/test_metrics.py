@@ -0,0 +1,55 @@
+import pytest
+
+from marketingcloud.hooks import Hooks
+from marketingcloud.metrics import (MetricsRegistry, endpoint_template, render_openmetrics, instrument,
+                                    observe_cache, cache_hit_ratio)
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.mark.parametrize('path, expected',
+                         [('/api/XYZ/reports', '/reports'),
+                          ('/api/XYZ/segments/s1234_5aec40c4373fa864abcbe786', '/segments/{id}'),
+                          ('/api/XYZ/collections/suites/dhlglobalrolloutprod', '/collections/suites/{id}'),
+                          ('/api/XYZ/calculatedmetrics/functions/cm1214', '/calculatedmetrics/functions/{id}'),
+                          ('/api/XYZ/users/me', '/users/me'),
+                          ('/discovery/me', '/discovery/me')])
+def test_endpoint_template(path, expected):
+    assert endpoint_template(path) == expected
+
+
+def test_instrumented_hooks_feed_registry(registry):
+    hooks = instrument(Hooks(), registry)
+    event = {'endpoint': '/api/XYZ/reports', 'method': 'POST', 'page': 0, 'request_bytes': 10}
+    hooks.emit('request_end', status=200, latency=0.2, response_bytes=100, **event)
+    hooks.emit('request_end', status=429, latency=0.01, response_bytes=10, **event)
+    hooks.emit('retry', status=429, attempt=1, wait=0, **event)
+    hooks.emit('token_refresh', latency=0.1, expires_in=1000)
+    assert registry.counter('adobe_pages_fetched').value(endpoint='/reports') == 2
+    assert registry.counter('adobe_rate_limited').value(endpoint='/reports') == 1
+    assert registry.counter('adobe_retries').value(endpoint='/reports', status=429) == 1
+    assert registry.counter('adobe_token_refreshes').value() == 1
+    assert registry.histogram('adobe_request_duration_seconds').count(endpoint='/reports', method='POST') == 2
+
+
+def test_render_openmetrics(registry):
+    hooks = instrument(Hooks(), registry)
+    hooks.emit('request_end', endpoint='/api/XYZ/users', method='GET', page=None, request_bytes=0,
+               status=200, latency=0.03, response_bytes=100)
+    text = render_openmetrics(registry)
+    assert '# TYPE adobe_requests counter' in text
+    assert 'adobe_requests_total{endpoint="/users",method="GET",status="200"} 1' in text
+    assert 'adobe_request_duration_seconds_bucket{endpoint="/users",method="GET",le="0.05"} 1' in text
+    assert 'adobe_request_duration_seconds_bucket{endpoint="/users",method="GET",le="+Inf"} 1' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_cache_hit_ratio(registry):
+    observe_cache('metadata', True, registry)
+    observe_cache('metadata', True, registry)
+    observe_cache('metadata', False, registry)
+    assert cache_hit_ratio('metadata', registry) == pytest.approx(2 / 3)
+    assert cache_hit_ratio('unknown', registry) == 0.0
@@ -0,0 +1,40 @@
+import tracemalloc
+
+import pytest
+
+from marketingcloud.profiler import Profiler
+
+
+def test_report_aggregates_pages_and_phases():
+    profiler = Profiler()
+    for page in range(3):
+        with profiler.phase('request', page):
+            pass
+        with profiler.phase('accumulate', page):
+            [0] * 10000
+    with profiler.phase('frame'):
+        pass
+    profiler.stop()
+    report = profiler.report()
+    assert sorted(report['pages']) == [0, 1, 2]
+    assert set(report['pages'][0]) == {'request', 'accumulate'}
+    assert report['total']['request']['calls'] == 3
+    assert report['total']['frame']['calls'] == 1
+    assert report['total']['accumulate']['memory_peak'] > 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.phase('request', 0):
+        pass
+    assert profiler.report() == {'pages': {}, 'total': {}}
+
+
+def test_get_report_stops_tracing_when_it_fails(client, payload):
+    def fail(rsid):
+        raise ConnectionError('network down')
+    client.getTimezone = fail
+    with pytest.raises(ConnectionError):
+        client.getReport(dict(payload, dimension='variables/daterangeday'), profile=True, parse_dates=True)
+    assert not tracemalloc.is_tracing()
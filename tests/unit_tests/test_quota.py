@@ -0,0 +1,81 @@
+import pytest
+
+from marketingcloud.quota import QuotaTracker, Budget, QuotaExceededError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def tracker(clock):
+    return QuotaTracker(clock=clock)
+
+
+def test_usage_rolls_over_minute_and_day(tracker, clock):
+    for _ in range(3):
+        tracker.acquire('XYZ')
+    clock.now += 61
+    tracker.acquire('XYZ')
+    assert tracker.usage('XYZ') == {'minute': 1, 'day': 4}
+    clock.now += 86400
+    assert tracker.usage('XYZ') == {'minute': 0, 'day': 0}
+
+
+def test_reject_policy_raises_when_exhausted(tracker):
+    tracker.set_budget('XYZ', Budget(per_minute=2, policy='reject'))
+    tracker.acquire('XYZ')
+    tracker.acquire('XYZ')
+    with pytest.raises(QuotaExceededError):
+        tracker.acquire('XYZ')
+    tracker.acquire('ABC')
+
+
+def test_acquire_records_every_key_or_none(tracker):
+    tracker.set_budget('client', Budget(per_minute=1, policy='reject'))
+    tracker.acquire('XYZ', 'client')
+    with pytest.raises(QuotaExceededError):
+        tracker.acquire('XYZ', 'client')
+    assert tracker.usage('XYZ')['minute'] == 1
+    assert tracker.usage('client')['minute'] == 1
+
+
+def test_reserved_share_only_for_high_priority(tracker):
+    tracker.set_budget('XYZ', Budget(per_minute=3, policy='reject', reserved=1))
+    tracker.acquire('XYZ')
+    tracker.acquire('XYZ')
+    with pytest.raises(QuotaExceededError):
+        tracker.acquire('XYZ')
+    tracker.acquire('XYZ', priority='high')
+    assert tracker.remaining('XYZ', priority='high') == 0
+
+
+def test_queue_policy_times_out(tracker):
+    tracker.set_budget('XYZ', Budget(per_day=1, policy='queue', timeout=0.01))
+    tracker.acquire('XYZ')
+    with pytest.raises(QuotaExceededError):
+        tracker.acquire('XYZ')
+
+
+def test_queue_policy_waits_for_window(monkeypatch):
+    tracker = QuotaTracker()
+    tracker.set_budget('XYZ', Budget(per_minute=1, policy='queue'))
+    tracker.acquire('XYZ')
+    waits = []
+
+    def fake_wait(timeout=None):
+        waits.append(timeout)
+        tracker.reset('XYZ')
+
+    monkeypatch.setattr(tracker._condition, 'wait', fake_wait)
+    tracker.acquire('XYZ')
+    assert 0 < waits[0] <= 60
@@ -0,0 +1,115 @@
+import pandas
+import pytest
+
+from marketingcloud.rollup import Rollup, additive_metrics, format_time_values
+
+
+def make_payload(dimension, date_range, metrics):
+    return {
+        'rsid': 'rsid',
+        'globalFilters': [{'type': 'dateRange', 'dateRange': date_range}],
+        'metricContainer': {'metrics': [{'columnId': str(i), 'id': metric, 'filters': []}
+                                        for i, metric in enumerate(metrics)]},
+        'dimension': dimension,
+        'settings': {'limit': 50, 'page': 0}
+    }
+
+
+@pytest.fixture
+def rollup():
+    rollup = Rollup()
+    days = pandas.date_range('2019-01-01', '2019-03-31')
+    daily = pandas.DataFrame({'metrics/visits': range(len(days)), 'metrics/visitors': [1] * len(days)},
+                             index=format_time_values(days, 'variables/daterangeday'))
+    rollup.store(make_payload('variables/daterangeday', '2019-01-01T00:00:00.000/2019-04-01T00:00:00.000',
+                              ['metrics/visits', 'metrics/visitors']), daily)
+    return rollup
+
+
+def test_additive_metrics():
+    catalog = [{'id': 'metrics/visits', 'type': 'int'}, {'id': 'metrics/visitors', 'type': 'int'},
+               {'id': 'metrics/revenue', 'type': 'currency'}, {'id': 'metrics/bouncerate', 'type': 'percent'}]
+    assert additive_metrics(catalog) == {'metrics/visits', 'metrics/revenue'}
+
+
+def test_month_from_days(rollup):
+    def fetch(payload):
+        raise AssertionError('nothing to fetch')
+
+    payload = make_payload('variables/daterangemonth', '2019-01-01T00:00:00.000/2019-04-01T00:00:00.000',
+                           ['metrics/visits'])
+    df = rollup.report(payload, {'metrics/visits'}, fetch)
+    assert df.index.tolist() == [pandas.Timestamp('2019-01-01'), pandas.Timestamp('2019-02-01'),
+                                 pandas.Timestamp('2019-03-01')]
+    assert df['metrics/visits'].tolist() == [sum(range(31)), sum(range(31, 59)), sum(range(59, 90))]
+
+
+def test_non_additive_metrics_are_fetched(rollup):
+    fetched = []
+
+    def fetch(payload):
+        fetched.append([metric['id'] for metric in payload['metricContainer']['metrics']])
+        return pandas.DataFrame({'metrics/visitors': [10, 20]}, index=['Q1 2019', 'Q2 2019'])
+
+    payload = make_payload('variables/daterangequarter', '2019-01-01T00:00:00.000/2019-04-01T00:00:00.000',
+                           ['metrics/visitors', 'metrics/visits'])
+    df = rollup.report(payload, {'metrics/visits'}, fetch)
+    assert fetched == [['metrics/visitors']]
+    assert df.columns.tolist() == ['metrics/visitors', 'metrics/visits']
+    assert df.values.tolist() == [[10, sum(range(90))]]
+
+
+def test_uncovered_range_is_not_served(rollup):
+    payload = make_payload('variables/daterangeweek', '2019-03-01T00:00:00.000/2019-05-01T00:00:00.000',
+                           ['metrics/visits'])
+    assert rollup.report(payload, {'metrics/visits'}, None) is None
+
+
+def test_weeks_start_on_sunday(rollup):
+    payload = make_payload('variables/daterangeweek', '2019-01-06T00:00:00.000/2019-01-20T00:00:00.000',
+                           ['metrics/visits'])
+    df = rollup.report(payload, {'metrics/visits'}, None)
+    assert format_time_values(df.index, 'variables/daterangeweek').tolist() == ['Jan 6, 2019', 'Jan 13, 2019']
+    assert df['metrics/visits'].tolist() == [sum(range(5, 12)), sum(range(12, 19))]
+
+
+def test_end_of_day_bound_includes_the_last_day():
+    rollup = Rollup()
+    days = pandas.date_range('2019-10-01', '2019-10-31')
+    daily = pandas.DataFrame({'metrics/pageviews': [1.0] * len(days)},
+                             index=format_time_values(days, 'variables/daterangeday'))
+    rollup.store(make_payload('variables/daterangeday', '2019-10-01T00:00:00.000/2019-10-31T23:59:59.999',
+                              ['metrics/pageviews']), daily)
+    df = rollup.report(make_payload('variables/daterangemonth', '2019-10-01T00:00:00.000/2019-10-31T23:59:59.999',
+                                    ['metrics/pageviews']), {'metrics/pageviews'}, fetch=None)
+    assert df['metrics/pageviews'].tolist() == [31.0]
+
+
+def test_rollup_against_fake(server, reports, client, payload):
+    rollup = Rollup()
+
+    def report(dimension, date_range, metrics):
+        return dict(payload, dimension=dimension, settings=dict(payload['settings']),
+                    globalFilters=[{'type': 'dateRange', 'dateRange': date_range}],
+                    metricContainer={'metrics': [{'columnId': str(i), 'id': metric, 'filters': []}
+                                                 for i, metric in enumerate(metrics)]})
+
+    daily = reports.get_dataframe(report('variables/daterangeday', '2019-01-01T00:00:00.000/2019-04-06T00:00:00.000',
+                                         ['metrics/visits', 'metrics/visitors']), rollup=rollup)
+    calls = len([r for r in server.requests if r[1].endswith('/reports')])
+    monthly = reports.get_dataframe(report('variables/daterangemonth',
+                                           '2019-01-01T00:00:00.000/2019-04-01T00:00:00.000',
+                                           ['metrics/visits']), rollup=rollup)
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == calls
+    assert monthly.index.tolist() == ['Jan 2019', 'Feb 2019', 'Mar 2019']
+    assert monthly['metrics/visits'].tolist()[0] == daily['metrics/visits'].iloc[:31].sum()
+
+    result = client.getReport(report('variables/daterangemonth', '2019-01-01T00:00:00.000/2019-04-01T00:00:00.000',
+                                     ['metrics/visits', 'metrics/visitors']), n_result='inf', rollup=rollup, profile=True)
+    data = result['data']
+    # fetching the restricted report is accounted as a request, not as building the frame
+    assert 'request' in result['profile']['total']
+    # only visitors is requested, the fake server pages its 95 items by 50
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == calls + 2
+    assert data['variables/daterangemonth'].tolist() == ['Jan 2019', 'Feb 2019', 'Mar 2019']
+    assert data['metrics/visits'].tolist() == monthly['metrics/visits'].tolist()
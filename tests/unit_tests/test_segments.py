@@ -0,0 +1,70 @@
+import pandas
+import pytest
+
+from marketingcloud import aanalytics2, segments
+
+PAYLOAD = {
+    'rsid': 'rsid',
+    'globalFilters': [{'type': 'dateRange', 'dateRange': '2019-01-01T00:00:00.000/2019-02-01T00:00:00.000'}],
+    'metricContainer': {
+        'metrics': [{'columnId': 'visits', 'id': 'metrics/visits', 'filters': []},
+                    {'columnId': 'orders', 'id': 'metrics/orders', 'filters': ['f1']}],
+        'metricFilters': [{'id': 'f1', 'type': 'breakdown', 'dimension': 'variables/evar1', 'itemId': '1'}]
+    },
+    'dimension': 'variables/page',
+    'settings': {'limit': 50, 'page': 0}
+}
+
+
+def test_pack_respects_column_limit():
+    packed = segments.pack(PAYLOAD, [f's{i}' for i in range(7)], column_limit=6)
+    assert [ids for _, ids in packed] == [['s0', 's1', 's2'], ['s3', 's4', 's5'], ['s6']]
+    assert len(packed) == segments.requests_needed(7, 2, column_limit=6)
+    request = packed[0][0]
+    metrics = request['metricContainer']['metrics']
+    assert [metric['columnId'] for metric in metrics] == ['0', '1', '2', '3', '4', '5']
+    assert metrics[1]['filters'] == ['0', '1']
+    assert metrics[3]['filters'] == ['0', '2']
+    assert request['metricContainer']['metricFilters'][2] == {'id': '2', 'type': 'segment', 'segmentId': 's1'}
+    assert PAYLOAD['metricContainer']['metrics'][1]['filters'] == ['f1']
+
+
+def test_pack_keeps_the_metrics_of_a_segment_together():
+    payload = dict(PAYLOAD, metricContainer={'metrics': [{'columnId': str(i), 'id': f'metrics/event{i}', 'filters': []}
+                                                          for i in range(7)]})
+    packed = segments.pack(payload, [f's{i}' for i in range(50)])
+    assert len(packed) == segments.requests_needed(50, 7) == 8
+    assert all(len(request['metricContainer']['metrics']) == 7 * len(ids) for request, ids in packed)
+
+
+def test_packed_payload_is_described():
+    request, _ = segments.pack(PAYLOAD, ['s0', 's1'])[0]
+    descriptor = aanalytics2._dataDescriptor(request)
+    assert descriptor['metrics'] == ['metrics/visits', 'metrics/orders'] * 2
+    assert descriptor['filters']['metricsFilters']['metrics/visits'] == ['s1']
+
+
+def test_pack_rejects_too_many_metrics():
+    with pytest.raises(ValueError):
+        segments.pack(PAYLOAD, ['s0'], column_limit=1)
+
+
+def test_unpack_long_format():
+    df = pandas.DataFrame([[1, 2, 3, 4], [5, 6, 7, 8]], index=pandas.Index(['a', 'b'], name='variables/page'),
+                          columns=['metrics/visits', 'metrics/orders'] * 2)
+    long = segments.unpack(df, ['s0', 's1'], ['metrics/visits', 'metrics/orders'])
+    assert long.columns.tolist() == ['variables/page', 'segment', 'metrics/visits', 'metrics/orders']
+    assert long.values.tolist() == [['a', 's0', 1, 2], ['b', 's0', 5, 6], ['a', 's1', 3, 4], ['b', 's1', 7, 8]]
+
+
+def test_compare_segments_against_fake(server, reports, client, payload):
+    payload['metricContainer']['metrics'].append({'columnId': '1', 'id': 'metrics/pageviews', 'filters': []})
+    payload['settings']['limit'] = 100
+    segment_ids = [f's{i}' for i in range(5)]
+    df = reports.compare_segments(payload, segment_ids, column_limit=4)
+    assert len([r for r in server.requests if r[1].endswith('/reports')]) == 3
+    assert df.shape == (95 * 5, 4)
+    assert df['segment'].unique().tolist() == segment_ids
+    long = client.compareSegments(payload, segment_ids, column_limit=4)
+    assert long.columns.tolist() == ['variables/page', 'segment', 'metrics/visits', 'metrics/pageviews']
+    assert long.shape == (95 * 5, 4)
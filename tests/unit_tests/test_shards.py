@@ -0,0 +1,121 @@
+import json
+
+import numpy
+import pytest
+
+from marketingcloud import shards
+from marketingcloud.fakeserver import report_page, search_matcher
+from marketingcloud.shards import Shard
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+PAYLOAD = {
+    'rsid': 'fakersid',
+    'metricContainer': {'metrics': [{'columnId': '0', 'id': 'metrics/visits'},
+                                    {'columnId': '1', 'id': 'metrics/pageviews'}]},
+    'dimension': 'variables/page',
+    'settings': {'limit': 10, 'page': 0}
+}
+
+
+class Fetch:
+    """Serves report_page for a dimension of total_rows items, optionally failing after some calls"""
+    def __init__(self, total_rows=95, fail_after=None):
+        self.total_rows = total_rows
+        self.fail_after = fail_after
+        self.payloads = []
+
+    def __call__(self, payload):
+        if self.fail_after is not None and len(self.payloads) >= self.fail_after:
+            raise ConnectionError('interrupted')
+        self.payloads.append(json.loads(json.dumps(payload)))
+        return report_page(payload, self.total_rows)
+
+
+def test_split_is_disjoint_and_complete():
+    children = Shard('pa').split('ab')
+    assert [child.clause for child in children] == [
+        "BEGINS-WITH 'paa'", "BEGINS-WITH 'pab'", "BEGINS-WITH 'pa' AND NOT ( BEGINS-WITH 'paa' OR BEGINS-WITH 'pab' )"]
+    values = ['paa', 'PAB', 'pac', 'pa', 'pb']
+    matches = [[value for value in values if search_matcher(child.clause)(value)] for child in children]
+    assert matches == [['paa'], ['PAB'], ['pac', 'pa']]
+    assert Shard().clause is None
+    assert Shard("it's").clause == "BEGINS-WITH 'it\\'s'"
+
+
+def test_shard_payload_keeps_the_search_clause():
+    payload = dict(PAYLOAD, search={'clause': "CONTAINS 'home'"}, settings={'limit': 10, 'page': 4})
+    request = Shard('a').payload(payload)
+    assert request['search']['clause'] == "( CONTAINS 'home' ) AND ( BEGINS-WITH 'a' )"
+    assert request['settings']['page'] == 0
+    assert payload['search']['clause'] == "CONTAINS 'home'"
+
+
+def test_plan_splits_large_shards_and_drops_empty_ones():
+    fetch = Fetch()
+    planned = shards.plan(fetch, PAYLOAD, max_rows=20, alphabet=ALPHABET, max_depth=6)
+    sizes = [report_page(shard.payload(PAYLOAD), 95)['totalElements'] for shard in planned]
+    assert sum(sizes) == 95
+    assert max(sizes) <= 20
+    assert all(payload['settings']['limit'] == 1 for payload in fetch.payloads)
+
+
+def test_plan_follows_prefixes_shared_by_every_item():
+    urls = [f'https://www.example.com/{section}/{i}' for section in 'abcdefghij' for i in range(50)]
+
+    def probe(payload):
+        matches = search_matcher(payload['search']['clause']) if 'search' in payload else (lambda value: True)
+        return {'totalElements': sum(matches(url) for url in urls)}
+    planned = shards.plan(probe, PAYLOAD, max_rows=100, alphabet='abcdefghijklmnopqrstuvwxyz:/.')
+    assert [shard.prefix for shard in planned if not shard.exclude] == \
+        [f'https://www.example.com/{section}' for section in 'abcdefghij']
+    assert shards.plan(lambda payload: {'totalElements': 0}, PAYLOAD) == []
+
+
+def test_walk_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / 'shard.jsonl')
+    with pytest.raises(ConnectionError):
+        shards.walk(Fetch(fail_after=3), PAYLOAD, checkpoint)
+    with open(checkpoint, 'a') as fd:
+        fd.write('{"itemIds": ["trunc')
+    fetch = Fetch()
+    part = shards.walk(fetch, PAYLOAD, checkpoint)
+    assert [payload['settings']['page'] for payload in fetch.payloads] == list(range(3, 10))
+    assert len(part['values']) == 95 and part['data'].shape == (95, 2)
+    assert part['values'][:2] == ['page 0', 'page 1']
+    again = Fetch()
+    shards.walk(again, PAYLOAD, checkpoint)
+    assert not again.payloads
+
+
+def test_merge_drops_duplicated_item_ids_and_sorts():
+    parts = [{'itemIds': ['1', '2'], 'values': ['a', 'b'], 'data': numpy.array([[1.0], [5.0]])},
+             {'itemIds': ['2', '3'], 'values': ['b', 'B'], 'data': numpy.array([[5.0], [3.0]])}]
+    df = shards.merge(parts, ['metrics/visits'], 'variables/page')
+    assert list(df.index) == ['b', 'B', 'a']
+    assert df.index.name == 'variables/page'
+    assert df['metrics/visits'].tolist() == [5.0, 3.0, 1.0]
+
+
+def test_extract_matches_the_unsharded_report(tmp_path):
+    fetch = Fetch()
+    df = shards.extract(fetch, PAYLOAD, max_rows=20, alphabet=ALPHABET, max_depth=6, max_workers=3,
+                        checkpoint_dir=str(tmp_path))
+    assert df.shape == (95, 2)
+    assert df.index.is_unique
+    assert sorted(df.index) == sorted(f'page {i}' for i in range(95))
+    assert df['metrics/visits'].is_monotonic_decreasing
+    calls = len(fetch.payloads)
+    shards.extract(fetch, PAYLOAD, shards=[Shard(), Shard('x')], checkpoint_dir=str(tmp_path))
+    # the whole space and the empty 'x' shard were not walked before
+    assert len(fetch.payloads) == calls + 11
+
+
+def test_sharded_extraction_against_fake(reports, client, payload, tmp_path):
+    payload['settings']['limit'] = 10
+    # every fake value starts with 'page ', planning down to that prefix is covered by test_plan_*
+    options = {'shards': Shard('page ').split('0123456789')}
+    df = reports.extract(payload, checkpoint_dir=str(tmp_path), **options)
+    assert df.shape == (95, 1) and df.index.is_unique
+    sharded = client.getReportSharded(payload, max_workers=2, **options)
+    assert list(sharded.columns) == ['variables/page', 'metrics/visits']
+    assert sharded['variables/page'].tolist() == df.index.tolist()
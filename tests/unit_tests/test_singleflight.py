@@ -0,0 +1,77 @@
+import time
+import threading
+
+import pytest
+
+from marketingcloud import metrics
+from marketingcloud.singleflight import SingleFlight, request_key
+
+
+class SlowCall:
+    """Returns once release is set, counting how many times it ran"""
+    def __init__(self, result='body'):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def run_concurrently(flight, key, call, n=5):
+    results, errors = [], []
+
+    def target():
+        try:
+            results.append(flight.do(key, call))
+        except Exception as error:
+            errors.append(error)
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    threads[0].start()
+    assert call.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while flight._calls[key].waiters < n - 1:
+        time.sleep(0.001)
+    call.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_request_key_ignores_param_order():
+    assert request_key('GET', 'url', {'a': 1, 'b': 2}) == request_key('get', 'url', {'b': 2, 'a': 1})
+    assert request_key('get', 'url', {'a': 1}) != request_key('get', 'url', {'a': 2})
+
+
+def test_concurrent_identical_calls_share_one_call():
+    registry = metrics.REGISTRY
+    flight = SingleFlight(name='test_flight')
+    call = SlowCall()
+    results, errors = run_concurrently(flight, 'key', call)
+    assert results == ['body'] * 5 and not errors
+    assert call.calls == 1
+    assert len(flight) == 0
+    assert metrics.cache_hit_ratio('test_flight', registry) == pytest.approx(4 / 5)
+
+
+def test_followers_receive_the_exception():
+    flight = SingleFlight()
+    call = SlowCall(result=ValueError('failed'))
+    results, errors = run_concurrently(flight, 'key', call, n=3)
+    assert not results
+    assert len(errors) == 3 and all(isinstance(error, ValueError) for error in errors)
+    assert call.calls == 1
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    calls = []
+    assert flight.do('key', lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do('key', lambda: calls.append(1) or len(calls)) == 2
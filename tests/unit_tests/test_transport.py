@@ -0,0 +1,41 @@
+import pytest
+
+from marketingcloud.analytics import Analytics
+from marketingcloud.fakeserver import FakeAnalyticsServer
+from marketingcloud.transport import Transport, HTTP2Transport, keyword_arguments
+
+
+def test_transport_requires_request_and_update_headers():
+    class Incomplete(Transport):
+        def request(self, method, url, **kwargs):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_keyword_arguments_follow_the_requests_signatures():
+    assert keyword_arguments('get', ({'limit': 10},), {'headers': {}}) == {'params': {'limit': 10}, 'headers': {}}
+    assert keyword_arguments('POST', ('body', {'a': 1}), {}) == {'data': 'body', 'json': {'a': 1}}
+    with pytest.raises(TypeError):
+        keyword_arguments('delete', ('body',), {})
+    with pytest.raises(TypeError):
+        keyword_arguments('get', ({'limit': 10},), {'params': {}})
+
+
+def test_positional_params_reach_the_transport(server, make_auth):
+    auth = make_auth(server)
+    response = auth.request('get', server.base_url + '/segments', {'limit': 10, 'page': 2})
+    assert len(response.json()['content']) == 5
+
+
+def test_http2_transport_against_fake(server, make_auth):
+    pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    with HTTP2Transport() as transport:
+        analytics = Analytics(make_auth(server, transport=transport), base_url=server.base_url)
+        response = analytics.get_segments(limit=10, page=2)
+        assert response.status_code == 200
+        assert len(response.json()['content']) == 5
+        assert analytics.users().status_code == 200
+    assert ('GET', f'/api/{FakeAnalyticsServer.COMPANY_ID}/segments') in server.requests